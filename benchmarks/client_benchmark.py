@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hutoma import __version__  # noqa: E402
+from hutoma.hutoma import EasyHutoma  # noqa: E402
+from hutoma.stub_server import StubServer  # noqa: E402
+from hutoma.transport import FakeTransport  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+logger = logging.getLogger()
+logger.setLevel(logging.ERROR)
+
+SCENARIOS = ['chat', 'status', 'poll', 'upload', 'speak']
+
+# the chat query is sent in the url, longer queries are refused by http servers
+MAX_CHAT_QUERY = 8000
+
+
+def add_args():
+    parser = argparse.ArgumentParser(description='Benchmark EasyHutoma against a local stand-in server')
+    parser.add_argument('--scenarios',
+                        default=','.join(SCENARIOS),
+                        help='comma separated scenarios among {0} (default=%(default)r)'.format(SCENARIOS))
+    parser.add_argument('--concurrency',
+                        default='1,4,16',
+                        help='comma separated numbers of concurrent callers (default=%(default)r)')
+    parser.add_argument('--sizes',
+                        default='16,1024,65536',
+                        help='comma separated payload sizes in bytes: the chat query length, the uploaded file and '
+                             'the utterance size (default=%(default)r)')
+    parser.add_argument('--requests',
+                        type=int,
+                        default=200,
+                        help='requests per run (default=%(default)r)')
+    parser.add_argument('--latency',
+                        type=float,
+                        default=0.0,
+                        help='seconds of latency added by the server (default=%(default)r)')
+    parser.add_argument('--transport',
+                        default='requests',
+                        choices=['requests', 'urllib3', 'fake'],
+                        help='the client transport, fake answers in-process to measure only the client overhead '
+                             '(default=%(default)r)')
+    parser.add_argument('--output',
+                        default=None,
+                        help='write the results to this JSON file')
+    parser.add_argument('--compare',
+                        default=None,
+                        help='a JSON file of a previous run to compare with')
+    args = parser.parse_args()
+    return args
+
+
+def _serve(latency, ready, stop):
+    """ Run the stand-in server in a child process, so that its CPU time is not counted as client CPU time
+    """
+    server = StubServer(latency=latency, training_seconds=3600)
+    ready.put(server.start())
+    stop.wait()
+    server.stop()
+
+
+def _percentile(values, percent):
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def _cpu_seconds():
+    """ Return the CPU time (user and system) of this process, with a sub-millisecond resolution where available:
+    os.times() counts in 10 ms ticks, far more than the cost of one request
+    """
+    if hasattr(time, 'process_time'):
+        return time.process_time()
+    if resource is not None:  # python 2
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+    times = os.times()
+    return times[0] + times[1]
+
+
+def _max_rss_kb():
+    """ Return the peak resident memory of this process in KB, None if unknown
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss  # bytes on mac os, KB elsewhere
+
+
+def _call(scenario, hutoma, size):
+    """ Return a function running one request of a scenario on an AI
+    """
+    if scenario == 'chat':
+        q = ('x' * size)[:size]
+        return lambda aiid, index: hutoma.chat(aiid, index, q)
+    if scenario == 'status':
+        return lambda aiid, index: hutoma.current_status(aiid, fresh=True)
+    if scenario == 'poll':  # a status polling loop: mostly cached reads of one field
+        return lambda aiid, index: hutoma.current_status(aiid).training_status
+    if scenario == 'upload':
+        payload = bytearray(b'q\n' * (size // 2))
+        return lambda aiid, index: hutoma.training_upload_source(aiid, payload)
+    if scenario == 'speak':
+        payload = bytearray(size)
+        return lambda aiid, index: hutoma.speak(aiid, index, payload)
+    raise ValueError('unknown scenario {0}'.format(scenario))
+
+
+def run(base_url, transport, scenario, concurrency, size, requests, directory, latency=0.0):
+    """
+    Run requests calls of a scenario from concurrency threads. Every thread calls its own AI: identical concurrent
+    GETs would be coalesced by the client and never reach the server
+    :return: a dictionary with the throughput, the latency percentiles, the client CPU time and memory, and the
+             number of requests the server received
+    """
+    if transport == 'fake':
+        transport = FakeTransport(StubServer(latency=latency, training_seconds=3600))
+    # status and upload calls are BACKGROUND calls: with the default background_share only half of the pool would
+    # run them, background_share=1 runs every scenario at the reported concurrency
+    hutoma = EasyHutoma('benchmark', base_url=base_url, pool_size=concurrency, background_share=1,
+                        transport=transport, manifest_path=os.path.join(directory, 'manifest.json'))
+    existing = set(hutoma.list_ai(fresh=True))
+    for _ in range(concurrency):
+        created = hutoma.create_ai()
+    aiids = sorted(set(created) - existing)
+    for aiid in aiids:
+        hutoma.change_status(aiid, 'start')
+    function = _call(scenario, hutoma, size)
+    pool = ThreadPool(concurrency)
+    worker = threading.local()
+    workers = itertools.count()
+
+    def call(index):
+        """ Run one request, return its error or None
+        """
+        if not hasattr(worker, 'aiid'):
+            worker.aiid = aiids[next(workers) % len(aiids)]
+        try:
+            function(worker.aiid, index)
+        except Exception as e:
+            return e
+
+    def timed(index):
+        started = time.time()
+        error = call(index)
+        return time.time() - started, error
+
+    pool.map(call, range(min(requests, concurrency * 2)))  # warm up the connections
+    cpu_before = _cpu_seconds()
+    calls_before = hutoma.api_calls_count()
+    started = time.time()
+    timings = pool.map(timed, range(requests))
+    elapsed = time.time() - started
+    server_calls = hutoma.api_calls_count() - calls_before
+    cpu = _cpu_seconds() - cpu_before
+
+    # a second pass traces the allocations of one request at a time, from this thread: tracing slows down the calls
+    # and is not part of the timed pass
+    alloc_bytes_per_request = retained_bytes_per_request = None
+    if tracemalloc is not None and hasattr(tracemalloc, 'reset_peak'):  # python 3.9+
+        samples = min(requests, 1000)
+        allocated = 0
+        tracemalloc.start()
+        started_size = tracemalloc.get_traced_memory()[0]
+        for index in range(samples):
+            tracemalloc.reset_peak()
+            traced = tracemalloc.get_traced_memory()[0]
+            call(index)
+            allocated += tracemalloc.get_traced_memory()[1] - traced
+        retained = tracemalloc.get_traced_memory()[0] - started_size
+        tracemalloc.stop()
+        alloc_bytes_per_request = float(allocated) / samples
+        retained_bytes_per_request = float(retained) / samples
+    pool.close()
+    pool.join()
+    for aiid in aiids:
+        hutoma.delete_ai(aiid)
+    hutoma.close()
+
+    latencies = sorted(latency for latency, _ in timings)
+    return {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'size': size,
+        'requests': requests,
+        'errors': sum(1 for _, error in timings if error is not None),
+        'server_calls': server_calls,
+        'throughput': requests / elapsed,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'cpu_ms_per_request': cpu * 1000 / requests,
+        'max_rss_kb': _max_rss_kb(),
+        'alloc_bytes_per_request': alloc_bytes_per_request,
+        'retained_bytes_per_request': retained_bytes_per_request,
+    }
+
+
+def compare(results, previous):
+    """ Print the throughput and p95 ratios against a previous run, for the runs present in both
+    """
+    previous = dict(((result['scenario'], result['concurrency'], result['size']), result)
+                    for result in previous['results'])
+    for result in results:
+        old = previous.get((result['scenario'], result['concurrency'], result['size']))
+        if old is None:
+            continue
+        print('{0:>6} c={1:<3} size={2:<6} throughput x{3:.2f}  p95 x{4:.2f}  cpu/request x{5:.2f}'.format(
+                result['scenario'], result['concurrency'], result['size'],
+                result['throughput'] / old['throughput'],
+                result['p95_ms'] / old['p95_ms'] if old['p95_ms'] else float('nan'),
+                result['cpu_ms_per_request'] / old['cpu_ms_per_request'] if old['cpu_ms_per_request']
+                else float('nan')))
+
+
+def main():
+    args = add_args()
+    scenarios = args.scenarios.split(',')
+    concurrency_levels = [int(value) for value in args.concurrency.split(',')]
+    sizes = [int(value) for value in args.sizes.split(',')]
+
+    server = None
+    if args.transport == 'fake':
+        base_url = 'http://localhost/api/v1/'
+    else:
+        ready = multiprocessing.Queue()
+        stop = multiprocessing.Event()
+        server = multiprocessing.Process(target=_serve, args=(args.latency, ready, stop))
+        server.daemon = True
+        server.start()
+        base_url = ready.get(timeout=30)
+    directory = tempfile.mkdtemp(prefix='hutoma_benchmark_')
+
+    results = []
+    try:
+        for scenario in scenarios:
+            # the status requests have no payload
+            for size in sizes if scenario not in ('status', 'poll') else [0]:
+                if scenario == 'chat' and size > MAX_CHAT_QUERY:
+                    continue
+                for concurrency in concurrency_levels:
+                    result = run(base_url, args.transport, scenario, concurrency, size, args.requests, directory,
+                                 args.latency)
+                    results.append(result)
+                    line = '{scenario:>6} c={concurrency:<3} size={size:<6} {throughput:8.1f} req/s  ' \
+                           'p50 {p50_ms:7.2f} ms  p95 {p95_ms:7.2f} ms  p99 {p99_ms:7.2f} ms  ' \
+                           'cpu {cpu_ms_per_request:6.3f} ms/req  server calls {server_calls}  errors {errors}'
+                    if result['alloc_bytes_per_request'] is not None:
+                        line += '  alloc {alloc_bytes_per_request:8.0f} B/req  retained {retained_bytes_per_request:6.0f} B/req'
+                    print(line.format(**result))
+    finally:
+        if server is not None:
+            stop.set()
+            server.join()
+        shutil.rmtree(directory)
+
+    report = {
+        'meta': {
+            'easy_hutoma': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': multiprocessing.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'server_latency': args.latency,
+            'transport': args.transport,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file_object:
+            json.dump(report, file_object, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as file_object:
+            compare(results, json.load(file_object))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+
+# An asyncio client for the Hutoma API, it requires python 3.5+ and aiohttp.
+# It is not imported by the hutoma package, use:
+#
+#   from hutoma.async_hutoma import AsyncEasyHutoma
+
+import asyncio
+import functools
+import logging
+
+import aiohttp
+
+from hutoma.hutoma import BaseHutoma, HutomaException
+from hutoma.results import AIStatus, SpeakResult, TrainingStatus
+from hutoma.upload import MultipartUpload
+
+
+class _UploadStream(object):
+    """ An async iterable over the body of a MultipartUpload, aiohttp streams it as the request body. Every chunk is
+    read in an executor to not block the event loop on a file
+    """
+
+    def __init__(self, upload, chunk_size=64 * 1024):
+        self._upload = upload
+        self._chunk_size = chunk_size
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_event_loop()
+        chunk = await loop.run_in_executor(None, self._upload.read, self._chunk_size)
+        if not chunk:
+            raise StopAsyncIteration
+        return chunk
+
+
+class AsyncEasyHutoma(BaseHutoma):
+    """ A class to interact with Hutoma API from asyncio code, it mirrors EasyHutoma
+    """
+
+    def __init__(self, user_key, base_url='https://api-2445581341197.apicast.io:443/api/v1/', pool_size=100,
+                 debug_sampling=None):
+        """
+        Create a AsyncEasyHutoma object, the underlying session is opened with the first request
+        :param user_key: is your api key
+        :param base_url: is the main api url
+        :param pool_size: (optional) max number of connections kept open towards the api host
+        :param debug_sampling: (optional) fraction of the calls logged at DEBUG level by end point, '*' is the
+                               default for every end point, for example {'*': 0.01}
+        """
+        super(AsyncEasyHutoma, self).__init__(user_key, base_url, pool_size, debug_sampling)
+        self._session = None
+        self._closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _get_session(self):
+        """ Return the session shared by every request of this object, creating it if needed
+        """
+        if self._closed:
+            raise HutomaException(
+                    message='the session has been closed',
+                    sender='_request'
+            )
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._pool_size, limit_per_host=self._pool_size)
+            self._session = aiohttp.ClientSession(connector=connector, headers={'user_key': self._user_key})
+        return self._session
+
+    async def close(self):
+        """ Close the session and every pooled connection
+        """
+        self._closed = True
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method, end_point_url, params={}, upload=None):
+        """
+        Run requests for this sessions
+        :param method: can be one in [GET, POST, DELETE, PUT]
+        :param end_point_url: the end point name
+        :param params: (optional) additional parameters for the url
+        :param upload: (optional) a MultipartUpload streamed as the request body
+        :return: a response (a dictionary) or raise an HutomaException
+        """
+        session = self._get_session()
+        path, url = self._build_url(end_point_url, params)
+        method = method.upper()
+
+        end_point = self._end_point_name(end_point_url)
+        debug = self._debug_sampled(end_point)
+        if debug:
+            logging.debug('API call %s: %s', method, path)
+        data = None
+        headers = None
+        if upload is not None:
+            data = _UploadStream(upload)
+            headers = {'Content-Type': upload.content_type}
+            if hasattr(upload, 'len'):
+                headers['Content-Length'] = str(upload.len)
+        async with session.request(method, url, data=data, headers=headers) as response:
+            content = await response.read()
+            status_code = response.status
+
+        self._count_api_call()
+        if debug:
+            logging.debug('  Response %s %s: %s %s', method, path, status_code, self._debug_body(end_point, content))
+
+        return self._parse_response(method, path, status_code, content)
+
+    async def _upload(self, method, end_point_url, params, source, filename=None):
+        """ Send source as a multipart upload, opened in an executor. The file is closed (if opened here) whatever
+        the outcome
+        """
+        loop = asyncio.get_event_loop()
+        upload = await loop.run_in_executor(None, functools.partial(MultipartUpload, source, filename=filename))
+        try:
+            return await self._request(method, end_point_url, params=params, upload=upload)
+        finally:
+            upload.close()
+
+    async def list_ai(self):
+        """
+        Enumerate all active AI
+        :return: a list of available AIs
+        """
+        try:
+            response = await self._request(
+                    'GET',
+                    'ai/'
+            )
+        except HutomaException as e:
+            logging.warning('list_ai: ' + e.message)
+            raise
+        return response['AIs']
+
+    async def create_ai(self):
+        """
+        Create a new AI
+        :return: a list of available AIs
+        """
+        try:
+            response = await self._request(
+                    'POST',
+                    'ai/'
+            )
+        except HutomaException as e:
+            logging.warning('create_ai: ' + e.message)
+            raise
+        return response['AIs']
+
+    async def delete_ai(self, aiid):
+        """
+        Delete an AI and every file associated to it
+        :param aiid: the AI id
+        :return: a list of available AIs
+        """
+        self._check_aiid(aiid)
+        try:
+            response = await self._request(
+                    'DELETE',
+                    'ai/{aiid:s}/',
+                    params={'aiid': aiid}
+            )
+        except HutomaException as e:
+            logging.warning('delete_ai: ' + e.message)
+            raise
+        return response['AIs']
+
+    async def current_status(self, aiid):
+        """
+        Returns an object summarizing the overall AI runtime status, see EasyHutoma.current_status
+        :param aiid: the AI id
+        :return: (neuralnetwork status, aiml status)
+        """
+        self._check_aiid(aiid)
+        try:
+            response = await self._request(
+                    'GET',
+                    'ai/{aiid:s}/',
+                    params={'aiid': aiid}
+            )
+        except HutomaException as e:
+            logging.warning('current_status: ' + e.message)
+            raise
+        return AIStatus(response['neuralnetwork'], response['aiml'])
+
+    async def change_status(self, aiid, status):
+        """
+        Loads/Unloads an AI in memory or verifies that the AI compiles correctly, see EasyHutoma.change_status
+        :param aiid: the AI id
+        :param status: on of the AI_STATUSES
+        :return: (neuralnetwork status, aiml status)
+        """
+        self._check_aiid(aiid)
+        self._check_status(status)
+        try:
+            response = await self._request(
+                    'GET',
+                    'ai/{aiid:s}?action={status:s}',
+                    params={'aiid': aiid, 'status': status}
+            )
+        except HutomaException as e:
+            logging.warning('change_status: ' + e.message)
+            raise
+        return AIStatus(response['neuralnetwork'], response['aiml'])
+
+    async def files_in_folder(self, aiid, folder):
+        """
+        List file in a folder
+        :param aiid: the AI id
+        :param folder: folder name
+        :return: a list of filenames in the folder
+        """
+        self._check_aiid(aiid)
+        self._check_folder(folder)
+        try:
+            response = await self._request(
+                    'GET',
+                    'ai/{aiid:s}/{folder:s}/',
+                    params={'aiid': aiid, 'folder': folder}
+            )
+        except HutomaException as e:
+            logging.warning('files_in_folder: ' + e.message)
+            raise
+        return response['files']
+
+    async def upload_file_in_folder(self, aiid, folder, file_path, filename=None):
+        """
+        Upload file to a folder, the file is streamed without blocking the event loop
+        :param aiid: the AI id
+        :param folder: folder name
+        :param file_path: path to the file to upload, or an open file object, bytes or an iterable of bytes
+        :param filename: (optional) the name of the uploaded file, default is the basename of the file
+        :return: True or HutomaException
+        """
+        self._check_aiid(aiid)
+        self._check_folder(folder)
+        try:
+            await self._upload(
+                    'POST',
+                    'ai/{aiid:s}/{folder:s}/',
+                    {'aiid': aiid, 'folder': folder},
+                    file_path,
+                    filename
+            )
+        except HutomaException as e:
+            logging.warning('upload_file_in_folder: ' + e.message)
+            raise
+        return True
+
+    async def delete_folder(self, aiid, folder):
+        """
+        Delete the content of a folder
+        :param aiid: the AI id
+        :param folder: folder name
+        :return: True or HutomaException
+        """
+        self._check_aiid(aiid)
+        self._check_folder(folder)
+        try:
+            await self._request(
+                    'DELETE',
+                    'ai/{aiid:s}/{folder:s}/',
+                    params={'aiid': aiid, 'folder': folder}
+            )
+        except HutomaException as e:
+            logging.warning('delete_folder: ' + e.message)
+            raise
+        return True
+
+    async def chat(self, aiid, uid, q, debug=False):
+        """
+        Text with an AI
+        :param aiid: the AI id
+        :param uid: (integer) a unique identifier associated to the user talking to the AI
+        :param q: a sentent or query for the AI
+        :param debug: If set to True, the response returned by the AI will return useful debug information
+        :return: a string containing the AI answer
+        """
+        self._check_aiid(aiid)
+        try:
+            response = await self._request(
+                    'GET',
+                    'ai/{aiid:s}/chat?debug={debug:s}&q={q:s}&uid={uid:d}',
+                    params={'aiid': aiid, 'debug': 'true' if debug else 'false', 'q': q, 'uid': uid}
+            )
+        except HutomaException as e:
+            logging.warning('chat: ' + e.message)
+            raise
+        return response['output']
+
+    async def speak(self, aiid, uid, utterance_file_path, voice=0, debug=False):
+        """
+        Speak with an AI, see EasyHutoma.speak
+        :param aiid: the AI id
+        :param uid: (integer) a unique identifier associated to the user talking to the AI
+        :param utterance_file_path: a wave/mp3 file containing an utterance, a path, an open file object, bytes or
+                                    an iterable of bytes
+        :param voice: Set voice =0 to hear a response with a female voice. Set voice=1 to use a male voice.
+        :param debug: If set to True, the response returned by the AI will return useful debug information
+        :return: {input, confidence, output, tts}
+        """
+        self._check_aiid(aiid)
+        if voice > 0:
+            voice = 1  # male voice
+        try:
+            response = await self._upload(
+                    'GET',
+                    'ai/{aiid:s}/speak?debug={debug:s}&voice={voice:d}&uid={uid:d}',
+                    {'aiid': aiid, 'debug': 'true' if debug else 'false', 'voice': voice, 'uid': uid},
+                    utterance_file_path
+            )
+        except HutomaException as e:
+            logging.warning('speak: ' + e.message)
+            raise
+        # the speak envelope is flat (code and message next to the fields), _parse_response wraps it in 'status'
+        response = dict(response.pop('status'), **response)
+        response.pop('code', None)
+        response.pop('message', None)
+        return SpeakResult(response)
+
+    async def training_start(self, aiid):
+        """
+        Start training
+        :param aiid: the AI id
+        :return: (neuralnetwork status, aiml status)
+        """
+        self._check_aiid(aiid)
+        try:
+            response = await self._request(
+                    'PUT',
+                    'ai/{aiid:s}/training?action=start',
+                    params={'aiid': aiid}
+            )
+        except HutomaException as e:
+            logging.warning('training_start: ' + e.message)
+            raise
+        return TrainingStatus(response['neuralnetwork'], response['aiml'])
+
+    async def training_stop(self, aiid):
+        """
+        Stop training
+        :param aiid: the AI id
+        :return: (neuralnetwork status, aiml status)
+        """
+        self._check_aiid(aiid)
+        try:
+            response = await self._request(
+                    'PUT',
+                    'ai/{aiid:s}/training?action=stop',
+                    params={'aiid': aiid}
+            )
+        except HutomaException as e:
+            logging.warning('training_stop: ' + e.message)
+            raise
+        return TrainingStatus(response['neuralnetwork'], response['aiml'])
+
+    async def training_delete(self, aiid):
+        """
+        Delete a training
+        :param aiid: the AI id
+        :return: True or HutomaException
+        """
+        self._check_aiid(aiid)
+        try:
+            await self._request(
+                    'DELETE',
+                    'ai/{aiid:s}/training',
+                    params={'aiid': aiid}
+            )
+        except HutomaException as e:
+            logging.warning('training_delete: ' + e.message)
+            raise
+        return True
+
+    async def training_upload_source(self, aiid, file_path):
+        """
+        Upload the source.txt file
+        :param aiid: the AI id
+        :param file_path: path to the source.txt, or an open file object, bytes or an iterable of bytes
+        :return: True or HutomaException
+        """
+        self._check_aiid(aiid)
+        filename = self._check_training_file(file_path, 'source.txt')
+        try:
+            await self._upload(
+                    'POST',
+                    'ai/{aiid:s}/training',
+                    {'aiid': aiid},
+                    file_path,
+                    filename
+            )
+        except HutomaException as e:
+            logging.warning('training_upload_source: ' + e.message)
+            raise
+        return True
+
+    async def training_upload_target(self, aiid, file_path):
+        """
+        Upload the target.txt file
+        :param aiid: the AI id
+        :param file_path: path to the target.txt, or an open file object, bytes or an iterable of bytes
+        :return: True or HutomaException
+        """
+        self._check_aiid(aiid)
+        filename = self._check_training_file(file_path, 'target.txt')
+        try:
+            await self._upload(
+                    'POST',
+                    'ai/{aiid:s}/training',
+                    {'aiid': aiid},
+                    file_path,
+                    filename
+            )
+        except HutomaException as e:
+            logging.warning('training_upload_target: ' + e.message)
+            raise
+        return True
+
+    async def training_upload_files(self, aiid, source_file_path, target_file_path):
+        """
+        Upload the source and target files
+        :param aiid: the AI id
+        :param source_file_path: path to the source.txt (or a file object, bytes or an iterable of bytes)
+        :param target_file_path: path to the target.txt (or a file object, bytes or an iterable of bytes)
+        :return: True if both uploads were fine or HutomaException
+        """
+        await self.training_upload_source(aiid, source_file_path)
+        await self.training_upload_target(aiid, target_file_path)
+        return True
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """ A thread-safe, size bounded, least recently used cache whose entries expire after a time to live
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.time):
+        """
+        Create a LRUCache object
+        :param maxsize: max number of entries, the least recently used is evicted first
+        :param ttl: (optional) default seconds an entry is valid, None means forever
+        :param timer: (optional) the clock used for the expiration
+        """
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._timer = timer
+        self._entries = OrderedDict()  # key -> (expiration time, value)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """ Return the value stored for key or default if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or (entry[0] is not None and entry[0] <= self._timer()):
+                self._misses += 1
+                return default
+            self._entries[key] = entry  # move to the most recently used end
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value
+        :param key: the key
+        :param value: the value
+        :param ttl: (optional) seconds the entry is valid, default is the cache ttl
+        """
+        ttl = self._ttl if ttl is None else ttl
+        expiration = None if ttl is None else self._timer() + ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expiration, value)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """ Remove an entry, if present
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, predicate=None):
+        """
+        Remove entries
+        :param predicate: (optional) a function of the key, matching entries are removed. None removes everything
+        :return: the number of removed entries
+        """
+        with self._lock:
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self):
+        """ Return a dictionary with hits, misses, size and maxsize of the cache
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'size': len(self._entries),
+                'maxsize': self._maxsize,
+            }
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+PY2 = sys.version_info[0] == 2
+
+# the signed 64 bit array type: 'q' is missing on python 2, where 'l' is 64 bit (32 bit on windows, where the hashes
+# are 32 bit too)
+try:
+    _HASH_TYPECODE = array('q').typecode
+except ValueError:  # python 2
+    _HASH_TYPECODE = 'l'
+_HASH_FORMAT = '<q' if array(_HASH_TYPECODE).itemsize == 8 else '<i'
+
+
+def _text(value, encoding='utf-8'):
+    """ Return value as a unicode string (None stays None)
+    """
+    if value is None or not isinstance(value, bytes):
+        return value
+    return value.decode(encoding)
+
+
+def csv_pairs(path, question=0, answer=1, delimiter=',', skip_header=False, encoding='utf-8'):
+    """
+    Read (question, answer) pairs from a CSV file, one row at a time
+    :param path: path of the CSV file
+    :param question: the question column, an index or a header name
+    :param answer: the answer column, an index or a header name
+    :param delimiter: (optional) the CSV delimiter
+    :param skip_header: (optional) if True the first row is skipped (it is always skipped with header names)
+    :param encoding: (optional) the file encoding
+    :return: a generator of (line number, question, answer), question and answer are None for malformed rows
+    """
+    if PY2:
+        file_object = open(path, 'rb')
+        rows = csv.reader(file_object, delimiter=delimiter.encode(encoding))
+    else:
+        file_object = io.open(path, encoding=encoding, newline='')
+        rows = csv.reader(file_object, delimiter=delimiter)
+    with file_object:
+        by_name = not isinstance(question, int) or not isinstance(answer, int)
+        if by_name or skip_header:
+            header = [_text(cell, encoding) for cell in next(rows, [])]
+            if by_name:
+                question = header.index(question) if not isinstance(question, int) else question
+                answer = header.index(answer) if not isinstance(answer, int) else answer
+        for row in rows:
+            line_number = rows.line_num
+            if len(row) <= max(question, answer):
+                yield line_number, None, None
+            else:
+                yield line_number, _text(row[question], encoding), _text(row[answer], encoding)
+
+
+def jsonl_pairs(path, question='question', answer='answer', encoding='utf-8'):
+    """
+    Read (question, answer) pairs from a JSON lines file, one line at a time
+    :param path: path of the JSONL file
+    :param question: the key of the question
+    :param answer: the key of the answer
+    :param encoding: (optional) the file encoding
+    :return: a generator of (line number, question, answer), question and answer are None for malformed lines
+    """
+    with io.open(path, encoding=encoding) as file_object:
+        for line_number, line in enumerate(file_object, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                yield line_number, item[question], item[answer]
+            except (ValueError, KeyError, TypeError):
+                yield line_number, None, None
+
+
+class HashSet(object):
+    """ A set of non zero integer hashes in an open addressing table backed by an array: about 16 bytes per hash
+    (8 bytes at most half full) where a Python set of ints takes 60-70
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Create a HashSet object
+        :param capacity: (optional) initial number of slots, a power of 2
+        """
+        self._table = array(_HASH_TYPECODE, [0]) * capacity
+        self._mask = capacity - 1
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key):
+        """ Add a non zero key, return False if it was already in the set
+        """
+        table, mask = self._table, self._mask
+        index = key & mask
+        while True:
+            value = table[index]
+            if value == 0:
+                table[index] = key
+                self._size += 1
+                if self._size * 2 > len(table):
+                    self._grow()
+                return True
+            if value == key:
+                return False
+            index = (index + 1) & mask
+
+    def _grow(self):
+        old = self._table
+        self._table = array(_HASH_TYPECODE, [0]) * (len(old) * 2)
+        self._mask = len(self._table) - 1
+        self._size = 0
+        for key in old:
+            if key:
+                self.add(key)
+
+
+class CorpusReport(object):
+    """ The counts of a corpus build and the first rejected lines
+    """
+
+    def __init__(self, max_rejected=1000):
+        self.read = 0
+        self.written = 0
+        self.duplicates = 0
+        self.rejected_count = 0
+        self.rejected = []  # (line number, reason), at most max_rejected
+        self._max_rejected = max_rejected
+
+    def reject(self, line_number, reason):
+        self.rejected_count += 1
+        if len(self.rejected) < self._max_rejected:
+            self.rejected.append((line_number, reason))
+
+    def __repr__(self):
+        return 'CorpusReport(read={0}, written={1}, duplicates={2}, rejected={3})'.format(
+                self.read, self.written, self.duplicates, self.rejected_count)
+
+
+class CorpusBuilder(object):
+    """ Write aligned source.txt/target.txt training files from a stream of (question, answer) pairs, one pair at a
+    time: pairs are normalized on the fly and duplicates are detected with a HashSet of 64 bit hashes, so memory
+    grows by about 16 bytes per unique pair whatever the length of the texts
+    """
+
+    def __init__(self, lowercase=False, deduplicate=True, max_length=None, max_rejected=1000):
+        """
+        Create a CorpusBuilder object
+        :param lowercase: (optional) if True questions and answers are lowercased
+        :param deduplicate: (optional) if True a (question, answer) pair is written only once
+        :param max_length: (optional) pairs with a longer question or answer are rejected
+        :param max_rejected: (optional) max number of rejected lines kept in the report
+        """
+        self._lowercase = lowercase
+        self._deduplicate = deduplicate
+        self._max_length = max_length
+        self._max_rejected = max_rejected
+
+    def normalize(self, text):
+        """ Collapse every whitespace (new lines included, they would break the alignment) and strip
+        """
+        text = _text(text)
+        if not isinstance(text, type(u'')):
+            text = u'{0}'.format(text)  # numbers in JSON lines
+        text = u' '.join(text.split())
+        return text.lower() if self._lowercase else text
+
+    def _hash(self, question, answer):
+        digest = hashlib.md5(u'{0}\t{1}'.format(question, answer).encode('utf-8')).digest()
+        return struct.unpack(_HASH_FORMAT, digest[:struct.calcsize(_HASH_FORMAT)])[0] or 1  # 0 is an empty slot
+
+    def build(self, pairs, source_path, target_path):
+        """
+        Write the training files
+        :param pairs: an iterable of (question, answer) or (line number, question, answer), like csv_pairs
+                      and jsonl_pairs return
+        :param source_path: path of the source.txt to write
+        :param target_path: path of the target.txt to write
+        :return: a CorpusReport
+        """
+        report = CorpusReport(self._max_rejected)
+        seen = HashSet()
+        with io.open(source_path, 'w', encoding='utf-8', newline='\n') as source, \
+                io.open(target_path, 'w', encoding='utf-8', newline='\n') as target:
+            for index, pair in enumerate(pairs, 1):
+                line_number, question, answer = pair if len(pair) == 3 else (index, pair[0], pair[1])
+                report.read += 1
+                if question is None or answer is None:
+                    report.reject(line_number, 'malformed')
+                    continue
+                question, answer = self.normalize(question), self.normalize(answer)
+                if not question or not answer:
+                    report.reject(line_number, 'empty')
+                    continue
+                if self._max_length and (len(question) > self._max_length or len(answer) > self._max_length):
+                    report.reject(line_number, 'too long')
+                    continue
+                if self._deduplicate:
+                    if not seen.add(self._hash(question, answer)):
+                        report.duplicates += 1
+                        continue
+                source.write(question + u'\n')
+                target.write(answer + u'\n')
+                report.written += 1
+        return report
+
+
+def upload_corpus(hutoma, aiid, pairs, builder=None):
+    """
+    Build the training files from a stream of pairs in a temporary directory and upload them. The files are
+    streamed from disk, so memory stays constant whatever the corpus size
+    :param hutoma: an EasyHutoma object
+    :param aiid: the AI id
+    :param pairs: an iterable of pairs, see CorpusBuilder.build
+    :param builder: (optional) a CorpusBuilder, default normalizes and deduplicates
+    :return: a CorpusReport
+    """
+    builder = builder or CorpusBuilder()
+    directory = tempfile.mkdtemp(prefix='hutoma_corpus_')
+    try:
+        source_path = os.path.join(directory, 'source.txt')
+        target_path = os.path.join(directory, 'target.txt')
+        report = builder.build(pairs, source_path, target_path)
+        hutoma.training_upload_files(aiid, source_path, target_path)
+        return report
+    finally:
+        shutil.rmtree(directory)
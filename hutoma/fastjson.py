@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+# The JSON decoder used for the api responses: orjson, ujson or simplejson when they are installed, the standard json
+# module otherwise. Another decoder can be plugged with use()
+
+import json
+
+try:
+    import orjson as _backend
+except ImportError:
+    try:
+        import ujson as _backend
+    except ImportError:
+        try:
+            import simplejson as _backend
+        except ImportError:
+            _backend = json
+
+loads = _backend.loads
+backend = _backend.__name__  # the name of the decoder in use
+
+
+def use(decoder):
+    """
+    Replace the JSON decoder
+    :param decoder: a module name ('orjson', 'ujson', 'simplejson', 'json') or a function decoding a str/bytes body
+    """
+    global loads, backend
+    if callable(decoder):
+        loads, backend = decoder, getattr(decoder, '__module__', None) or repr(decoder)
+    else:
+        module = __import__(decoder)
+        loads, backend = module.loads, module.__name__
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from requests.exceptions import RequestException
+
+from .hutoma import HutomaException
+
+# a change of an AI state between two sweeps: previous/current are (neuralnetwork, aiml) status tuples, previous is
+# None for a new AI, current is None for a removed AI or when the status could not be read (error is set). A failing
+# status is reported when it starts failing and when it is read again, not at every sweep
+FleetChange = namedtuple('FleetChange', ['aiid', 'previous', 'current', 'error'])
+
+# the outcome of the provisioning of a corpus: status is the last (neuralnetwork, aiml) status, error is the
+# exception that stopped the pipeline (aiid is set if the AI was created before the error)
+ProvisionResult = namedtuple('ProvisionResult', ['name', 'aiid', 'status', 'error'])
+
+
+class FleetMonitor(object):
+    """ Poll the status of many AIs concurrently and report only what changed since the previous sweep
+    """
+
+    def __init__(self, hutoma, aiids=None, max_in_flight=8, fields=None):
+        """
+        Create a FleetMonitor object
+        :param hutoma: an EasyHutoma object
+        :param aiids: (optional) the AIs to monitor, default is every AI returned by list_ai at each sweep
+        :param max_in_flight: (optional) max number of status requests running at the same time
+        :param fields: (optional) the status fields compared between sweeps (for example trainingStatus and
+                       runtimeStatus), default compares every field
+        """
+        self._hutoma = hutoma
+        self._aiids = list(aiids) if aiids is not None else None
+        self._fields = fields
+        self._pool = ThreadPool(max_in_flight)
+        self._snapshot = {}  # aiid -> (neuralnetwork, aiml)
+        self._errors = {}  # aiid -> exception, the AIs whose status can not be read
+        self._lock = threading.Lock()  # protects the snapshot and the errors
+        self._sweep_lock = threading.Lock()  # one sweep at a time
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Stop the polling threads
+        """
+        self._pool.close()
+        self._pool.join()
+
+    def _status(self, aiid):
+        try:
+            return aiid, self._hutoma.current_status(aiid, fresh=True), None
+        except (HutomaException, RequestException) as e:
+            return aiid, None, e
+
+    def _state(self, status):
+        """ Return the part of a status compared between sweeps
+        """
+        if status is None or self._fields is None:
+            return status
+        return tuple(dict((field, part.get(field)) for field in self._fields) for part in status)
+
+    def sweep(self):
+        """
+        Read the status of every AI and update the snapshot. If the AIs can not be listed the snapshot is kept and
+        nothing is reported
+        :return: a list of FleetChange, empty if nothing changed
+        """
+        with self._sweep_lock:
+            if self._aiids is not None:
+                aiids = self._aiids
+            else:
+                try:
+                    aiids = self._hutoma.list_ai(fresh=True)
+                except (HutomaException, RequestException) as e:
+                    logging.warn('FleetMonitor: list_ai failed, snapshot kept: {0}'.format(e))
+                    return []
+            # the statuses are read without holding the snapshot lock
+            outcomes = self._pool.map(self._status, aiids)
+            changes = []
+            with self._lock:
+                for aiid, status, error in outcomes:
+                    previous = self._snapshot.get(aiid)
+                    if error is not None:
+                        if aiid not in self._errors:  # reported once, until the status can be read again
+                            logging.warn('FleetMonitor: {0} status failed: {1}'.format(aiid, error))
+                            changes.append(FleetChange(aiid, previous, None, error))
+                        self._errors[aiid] = error
+                        continue
+                    recovered = self._errors.pop(aiid, None) is not None
+                    if recovered or previous is None or self._state(previous) != self._state(status):
+                        changes.append(FleetChange(aiid, previous, status, None))
+                    self._snapshot[aiid] = status
+                for aiid in (set(self._snapshot) | set(self._errors)) - set(aiids):
+                    self._errors.pop(aiid, None)
+                    changes.append(FleetChange(aiid, self._snapshot.pop(aiid, None), None, None))
+            return changes
+
+    def snapshot(self):
+        """ Return the last known (neuralnetwork, aiml) status of every AI
+        """
+        with self._lock:
+            return dict(self._snapshot)
+
+    def errors(self):
+        """ Return the exception of every AI whose status could not be read at the last sweep
+        """
+        with self._lock:
+            return dict(self._errors)
+
+    def watch(self, on_changes, interval=60, stop=None):
+        """
+        Sweep forever (or until stop is set), calling on_changes with the non empty lists of changes
+        :param on_changes: a function receiving a list of FleetChange
+        :param interval: (optional) seconds between two sweeps
+        :param stop: (optional) a threading.Event that ends the loop
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            changes = self.sweep()
+            if changes:
+                on_changes(changes)
+            stop.wait(interval)
+
+
+def _run_pool(function, items, max_workers):
+    """ Map function over items on a ThreadPool, in input order
+    """
+    pool = ThreadPool(max(1, min(max_workers, len(items))))
+    try:
+        return pool.map(function, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def provision(hutoma, corpora, max_workers=4, wait=True, timeout=None, on_progress=None):
+    """
+    Create (or reuse), upload and train many AIs concurrently: every corpus runs create_ai, training_deploy and
+    wait_for_training as a pipeline, up to max_workers pipelines at the same time
+    :param hutoma: an EasyHutoma object
+    :param corpora: an iterable of (name, source_file_path, target_file_path) or
+                    (name, source_file_path, target_file_path, aiid) to retrain an existing AI
+    :param max_workers: (optional) number of pipelines running at the same time
+    :param wait: (optional) if True wait for every training to end
+    :param timeout: (optional) max seconds to wait for each training
+    :param on_progress: (optional) called with (name, aiid, step) where step is one of 'creating', 'uploading',
+                        'training', 'done' or 'failed'
+    :return: a list of ProvisionResult, in the corpora order
+    """
+    create_lock = threading.Lock()
+
+    def progress(name, aiid, step):
+        if on_progress is not None:
+            on_progress(name, aiid, step)
+
+    def create():
+        # create_ai returns every AI: the new one is found by difference, so creations must not overlap
+        with create_lock:
+            before = set(hutoma.list_ai(fresh=True))
+            created = [aiid for aiid in hutoma.create_ai() if aiid not in before]
+        if len(created) != 1:
+            raise HutomaException(
+                    message='can not tell the new AI from {0}'.format(created),
+                    sender='provision'
+            )
+        return created[0]
+
+    def run(corpus):
+        name, source_file_path, target_file_path = corpus[:3]
+        aiid = corpus[3] if len(corpus) > 3 else None
+        try:
+            if aiid is None:
+                progress(name, None, 'creating')
+                aiid = create()
+            progress(name, aiid, 'uploading')
+            status = hutoma.training_deploy(aiid, source_file_path, target_file_path)
+            if wait:
+                progress(name, aiid, 'training')
+                status = hutoma.wait_for_training(aiid, timeout=timeout)
+            progress(name, aiid, 'done')
+            return ProvisionResult(name, aiid, status, None)
+        except (HutomaException, RequestException, IOError) as e:
+            logging.warn('provision: {0} failed: {1}'.format(name, e))
+            progress(name, aiid, 'failed')
+            return ProvisionResult(name, aiid, None, e)
+
+    return _run_pool(run, list(corpora), max_workers)
+
+
+def delete_all(hutoma, aiids, max_workers=8):
+    """
+    Delete many AIs concurrently
+    :param hutoma: an EasyHutoma object
+    :param aiids: the AIs to delete
+    :param max_workers: (optional) number of deletions running at the same time
+    :return: a dictionary aiid -> None if deleted, or the exception raised
+    """
+    def run(aiid):
+        try:
+            hutoma.delete_ai(aiid)
+            return aiid, None
+        except (HutomaException, RequestException) as e:
+            logging.warn('delete_all: {0} failed: {1}'.format(aiid, e))
+            return aiid, e
+
+    return dict(_run_pool(run, list(aiids), max_workers))
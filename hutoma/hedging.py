@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import deque
+
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
+
+
+class LatencyTracker(object):
+    """ A thread-safe sliding window of latencies to compute percentiles
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        """
+        Create a LatencyTracker object
+        :param window: number of recent latencies kept
+        :param min_samples: percentile returns None until this many latencies are recorded
+        """
+        self._latencies = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, percent):
+        """ Return the latency below which percent of the recorded calls fall, or None with too few samples
+        """
+        with self._lock:
+            if len(self._latencies) < self._min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * percent / 100.0))
+        return latencies[index]
+
+
+def hedged_call(function, delay, allow_hedge=None, failed=None):
+    """
+    Run function and, if it did not return after delay seconds, run it a second time in parallel. The first
+    successful outcome wins: when a call fails (it raises, or failed returns True for its result) the other one is
+    waited for, the first failure is returned (or raised) only if both calls failed
+    :param function: the function to run, without arguments
+    :param delay: seconds to wait before hedging
+    :param allow_hedge: (optional) a function returning False if the second call must not be sent
+    :param failed: (optional) a function returning True if a result is a failure, for example an error response
+    :return: (result, True if the second call was sent, True if the second call won)
+    """
+    outcomes = queue.Queue()
+
+    def run(index):
+        try:
+            outcomes.put((index, function(), None))
+        except Exception as e:
+            outcomes.put((index, None, e))
+
+    def start(index):
+        thread = threading.Thread(target=run, args=(index,))
+        thread.daemon = True
+        thread.start()
+
+    def is_failure(outcome):
+        return outcome[2] is not None or (failed is not None and failed(outcome[1]))
+
+    start(0)
+    try:
+        outcome = outcomes.get(timeout=delay)
+        hedged = False
+    except queue.Empty:
+        hedged = allow_hedge is None or allow_hedge()
+        if hedged:
+            start(1)
+        outcome = outcomes.get()
+        if hedged and is_failure(outcome):
+            other = outcomes.get()
+            if not is_failure(other):
+                outcome = other
+    index, result, error = outcome
+    if error is not None:
+        raise error
+    return result, hedged, index == 1
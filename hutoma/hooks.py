@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import threading
+import time
+from collections import defaultdict
+
+
+class CallInfo(object):
+    """ What is known about an api call when the hooks run
+    """
+
+    def __init__(self, method, end_point, path, params):
+        self.method = method
+        self.end_point = end_point  # the end point template, for example 'ai/{aiid:s}/chat'
+        self.path = path
+        self.params = params
+        self.started = time.time()
+        self.elapsed = None  # seconds, set when the call ends (it includes the rate limiter and scheduler waits)
+        self.status_code = None  # None if no http response was received
+        self.bytes_out = 0  # request body bytes
+        self.bytes_in = 0  # response body bytes
+        self.content = None  # the raw response body
+        self.hedged = False  # True if the call was sent a second time
+        self.error = None  # the error code (or error type) of a failed call
+
+
+class Hook(object):
+    """ The base class of the hooks passed to EasyHutoma, every method is optional. Hooks run on the calling thread,
+    they must be fast and thread-safe, an exception raised by a hook is logged and ignored
+    """
+
+    def before_request(self, call):
+        """ Called with a CallInfo before the call waits for the rate limiter
+        """
+
+    def after_response(self, call):
+        """ Called with the CallInfo of a successful call
+        """
+
+    def on_error(self, call, exception):
+        """ Called with the CallInfo of a failed call and the exception raised to the caller
+        """
+
+
+class TraceRecorder(Hook):
+    """ A hook writing every call as a line of a JSONL trace file, for offline analysis (see analyze_trace) and
+    replay
+    """
+
+    def __init__(self, path, record_bodies=False):
+        """
+        Create a TraceRecorder object, the trace file is opened in append mode
+        :param path: path of the trace file
+        :param record_bodies: (optional) if True the response bodies are recorded too, needed to replay the trace
+        """
+        self._file = io.open(path, 'a', encoding='utf-8')
+        self._record_bodies = record_bodies
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _record(self, call):
+        record = {
+            't': round(call.started, 3),
+            'method': call.method,
+            'end_point': call.end_point,
+            'path': call.path,
+            'params': call.params,
+            'status': call.status_code,
+            'latency': round(call.elapsed, 4),
+            'bytes_out': call.bytes_out,
+            'bytes_in': call.bytes_in,
+        }
+        if call.hedged:
+            record['hedged'] = True
+        if call.error is not None:
+            record['error'] = call.error
+        if self._record_bodies and call.content is not None:
+            record['body'] = call.content.decode('utf-8', 'replace')
+        line = json.dumps(record, separators=(',', ':'), sort_keys=True)
+        if not isinstance(line, type(u'')):
+            line = line.decode('utf-8')
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + u'\n')
+
+    def after_response(self, call):
+        self._record(call)
+
+    def on_error(self, call, exception):
+        self._record(call)
+
+
+def read_trace(path):
+    """ Return a generator of the records of a trace file
+    """
+    with io.open(path, encoding='utf-8') as file_object:
+        for line in file_object:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _percentile(values, percent):
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def analyze_trace(records, repeat_window=10):
+    """
+    Summarize a trace by end point and find the calls repeated with the same parameters (retries, polling loops)
+    :param records: an iterable of trace records, for example read_trace(path)
+    :param repeat_window: (optional) seconds within which a call with the same method, end point and parameters as
+                          a previous one counts as a repeat
+    :return: {
+                end_points: {end point: {calls, errors, repeats, mean, p50, p95, p99, max, bytes_out, bytes_in}},
+                repeats: [(repeats, method, end point, params), ...] the most repeated calls first
+             }
+    """
+    latencies = defaultdict(list)
+    summary = defaultdict(lambda: {'calls': 0, 'errors': 0, 'repeats': 0, 'bytes_out': 0, 'bytes_in': 0})
+    last_seen = {}  # (method, end point, params) -> last start time
+    repeats = defaultdict(int)
+    for record in records:
+        end_point = record['end_point']
+        stats = summary[end_point]
+        stats['calls'] += 1
+        stats['errors'] += 'error' in record
+        stats['bytes_out'] += record.get('bytes_out', 0)
+        stats['bytes_in'] += record.get('bytes_in', 0)
+        latencies[end_point].append(record['latency'])
+        key = (record['method'], end_point, json.dumps(record.get('params'), sort_keys=True))
+        previous = last_seen.get(key)
+        if previous is not None and record['t'] - previous <= repeat_window:
+            stats['repeats'] += 1
+            repeats[key] += 1
+        last_seen[key] = record['t']
+    for end_point, values in latencies.items():
+        values.sort()
+        summary[end_point].update({
+            'mean': sum(values) / len(values),
+            'p50': _percentile(values, 50),
+            'p95': _percentile(values, 95),
+            'p99': _percentile(values, 99),
+            'max': values[-1],
+        })
+    return {
+        'end_points': dict(summary),
+        'repeats': sorted(((count, method, end_point, json.loads(params))
+                           for (method, end_point, params), count in repeats.items()),
+                          key=lambda item: -item[0]),
+    }
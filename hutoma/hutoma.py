@@ -1,11 +1,52 @@
 # -*- coding: utf-8 -*-
 
-import json
+import copy
 import logging
-from requests import Session
+import os
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+
+from requests.exceptions import RequestException, Timeout
+
+from . import fastjson
+from .cache import LRUCache
+from .hedging import LatencyTracker, hedged_call
+from .hooks import CallInfo
+from .manifest import Manifest, file_digest
+from .metrics import MetricsRegistry
+from .ratelimit import RateLimiter
+from .results import TRAINING_TERMINAL_STATUSES, AIStatus, SpeakResult, TrainingStatus
+from .scheduler import BACKGROUND, INTERACTIVE, PriorityScheduler
+from .singleflight import Expired, SingleFlight
+from .transport import FakeTransport, RequestsTransport, Urllib3Transport
+from .upload import MultipartUpload
+
+try:
+    basestring
+except NameError:  # python 3
+    basestring = str
 
 # Refer to Hutoma API: [ base url: /api/v1 , api version: 0.5.0 ]
 
+# serializes the re-initialization of the EasyHutoma objects used in a forked process
+_fork_lock = threading.Lock()
+
+
+def _reset_fork_lock():
+    """ A child process gets a new lock: the parent lock may have been held by another thread at fork time
+    """
+    global _fork_lock
+    _fork_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):  # python 3.7+
+    os.register_at_fork(after_in_child=_reset_fork_lock)
+
 
 class HutomaException(Exception):
     """ A class for Hutoma Exceptions
@@ -27,8 +68,12 @@ class HutomaException(Exception):
         return self.message
 
 
-class EasyHutoma(object):
-    """ A class to interact with Hutoma API
+# the outcome of a single chat of EasyHutoma.chat_many, error is None if output is valid
+ChatResult = namedtuple('ChatResult', ['index', 'uid', 'q', 'output', 'error'])
+
+
+class BaseHutoma(object):
+    """ The parts shared by the sync and async clients: arguments validation, url building and response parsing
     """
 
     AI_STATUSES = [
@@ -38,11 +83,21 @@ class EasyHutoma(object):
         'compile',  # ensure there are no errors in the files you provided
     ]
 
-    def __init__(self, user_key, base_url='https://api-2445581341197.apicast.io:443/api/v1/'):
+    # end points whose response bodies are never written in the debug log
+    REDACTED_END_POINTS = frozenset([
+        'ai/{aiid:s}/speak',  # tts audio
+    ])
+
+    # max characters of a response body written in the debug log
+    DEBUG_BODY_LIMIT = 512
+
+    def __init__(self, user_key, base_url, pool_size, debug_sampling=None):
         """
-        Create a EasyHutoma object
         :param user_key: is your api key
         :param base_url: is the main api url
+        :param pool_size: max number of keep-alive connections kept open towards the api host
+        :param debug_sampling: (optional) fraction of the calls logged at DEBUG level by end point, '*' is the default
+                               for every end point, for example {'*': 0.01, 'ai/{aiid:s}/chat': 0.1}
         """
         if not user_key:
             raise HutomaException(
@@ -51,44 +106,64 @@ class EasyHutoma(object):
             )
         self._user_key = user_key
         self._base_url = base_url
+        self._pool_size = pool_size
         self._api_calls = 0  # count how many api calls for this session
+        self._api_calls_lock = threading.Lock()
+        self._debug_sampling = debug_sampling or {}
 
-    def _request(self, method, end_point_url, params={}, files=None):
+    def _end_point_name(self, end_point_url):
+        """ Return the end point template without its query, for example 'ai/{aiid:s}/chat'
         """
-        Run requests for this sessions
-        :param method: can be one in [GET, POST, DELETE, PUT]
+        return end_point_url.split('?', 1)[0]
+
+    def _build_url(self, end_point_url, params):
+        """
+        Fill an end point template with its parameters
         :param end_point_url: the end point name
-        :param params: (optional) additional parameters for the url
-        :param files: (optional) files to be uploaded
-        :return: a response (a dictionary) or raise an HutomaException
+        :param params: parameters for the url
+        :return: (the end point path, the full url)
         """
-        session = Session()
-        session.headers['user_key'] = self._user_key
-        url = self._base_url + end_point_url.format(**params)
-        method = method.upper()
+        path = end_point_url.format(**params)
+        return path, self._base_url + path
 
-        logging.debug('API call {0}: {1}'.format(method, end_point_url.format(**params)))
-        response = session.request(method=method,
-                                   url=url,
-                                   files=files,
-                                   timeout=None)
-
-        logging.debug('  Response: {0}'.format(response.__dict__))
+    def _debug_sampled(self, end_point):
+        """ Return True if a call to the end point must be logged: DEBUG is enabled and the call is sampled
+        """
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return False
+        rate = self._debug_sampling.get(end_point, self._debug_sampling.get('*', 1))
+        return rate >= 1 or random.random() < rate
 
-        self._api_calls += 1
+    def _debug_body(self, end_point, content):
+        """ Return a response body as written in the debug log: redacted for REDACTED_END_POINTS, truncated after
+        DEBUG_BODY_LIMIT characters
+        """
+        if end_point in self.REDACTED_END_POINTS:
+            return '<{0} bytes redacted>'.format(len(content))
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
+        if len(content) > self.DEBUG_BODY_LIMIT:
+            return u'{0}... <{1} more characters>'.format(content[:self.DEBUG_BODY_LIMIT],
+                                                          len(content) - self.DEBUG_BODY_LIMIT)
+        return content
 
-        if response.status_code >= 400:
+    def _parse_response(self, method, path, status_code, content):
+        """
+        Turn a raw api response into a dictionary
+        :param method: the http method used
+        :param path: the end point path
+        :param status_code: the http status code
+        :param content: the response body
+        :return: a response (a dictionary) or raise an HutomaException
+        """
+        if status_code >= 400:
             raise HutomaException(
-                    error_code=response.status_code,
-                    error_details=response.raw,
-                    message=response._content,
-                    sender='_request {0} {1}'.format(method, end_point_url.format(**params))
+                    error_code=status_code,
+                    message=content,
+                    sender='_request {0} {1}'.format(method, path)
             )
 
-        response = json.loads(response.content)
-
-        logging.debug('  Response keys: {0}'.format(response.keys()))
-        logging.debug('  Response: {0}'.format(response))
+        response = fastjson.loads(content)
 
         if 'code' in response:
             response = {'status': response}
@@ -100,7 +175,7 @@ class EasyHutoma(object):
                 error_code=response['status']['code'],
                 error_type=response['status']['errorType'],
                 error_details=response['status']['errorDetails'],
-                sender='_request {0} {1}'.format(method, end_point_url.format(**params))
+                sender='_request {0} {1}'.format(method, path)
         )
 
     def _check_aiid(self, aiid):
@@ -121,24 +196,611 @@ class EasyHutoma(object):
                     sender='_check_status'
             )
 
+    def _check_folder(self, folder):
+        """ Raise an exception if the folder is not valid
+        """
+        if not folder:
+            raise HutomaException(
+                    message='folder: {0} is not a valid folder'.format(folder),
+                    sender='_check_folder'
+            )
+
+    def _check_training_file(self, file_path, name):
+        """ Raise an exception if a training file path is not named name, return the filename to upload
+        """
+        if not isinstance(file_path, basestring):
+            return name
+        if name not in file_path:
+            raise HutomaException(
+                    message='training filename: {0} should be {1}'.format(file_path, name),
+                    sender='_check_training_file'
+            )
+        return None
+
+    def _count_api_call(self):
+        with self._api_calls_lock:
+            self._api_calls += 1
+
     def api_calls_count(self):
         """ Return the number of APIs call for this session
         """
         return self._api_calls
 
-    def list_ai(self):
+
+class EasyHutoma(BaseHutoma):
+    """ A class to interact with Hutoma API
+    """
+
+    # default seconds list_ai and current_status responses are cached, 0 disables the cache of the end point
+    METADATA_TTL = {
+        'list_ai': 10,
+        'current_status': 2,
+    }
+
+    # priority classes of the calls, interactive calls are served first
+    INTERACTIVE = INTERACTIVE
+    BACKGROUND = BACKGROUND
+
+    # priority of the calls by end point, every other end point runs as BACKGROUND
+    END_POINT_PRIORITIES = {
+        'ai/{aiid:s}/chat': INTERACTIVE,
+        'ai/{aiid:s}/speak': INTERACTIVE,
+    }
+
+    # the options that can be set with call_options
+    CALL_OPTIONS = frozenset(['priority', 'timeout', 'deadline'])
+
+    # idempotent end points whose slow GET calls can be hedged
+    HEDGED_END_POINTS = frozenset([
+        'ai/{aiid:s}/chat',  # chat
+        'ai/{aiid:s}/',  # current_status
+    ])
+
+    # trainingStatus values after which a training is not running any more
+    TRAINING_TERMINAL_STATUSES = TRAINING_TERMINAL_STATUSES
+
+    # error codes that slow down the rate limiter
+    THROTTLING_ERROR_CODES = frozenset([429, 503])
+
+    # read-only GET end points: identical concurrent requests share a single api call
+    COALESCED_END_POINTS = frozenset([
+        'ai/',  # list_ai
+        'ai/{aiid:s}/',  # current_status
+        'ai/{aiid:s}/{folder:s}/',  # files_in_folder
+    ])
+
+    def __init__(self, user_key, base_url='https://api-2445581341197.apicast.io:443/api/v1/', pool_size=10,
+                 chat_cache_size=0, chat_cache_ttl=300, chat_cache_per_uid=False, metadata_ttl=None,
+                 rate_limits=None, rate_limit_block=True, background_share=0.5, connect_timeout=5, read_timeout=60,
+                 hedge=False, hedge_percentile=95, manifest_path=None, debug_sampling=None, hooks=None,
+                 transport=None):
+        """
+        Create a EasyHutoma object
+        :param user_key: is your api key
+        :param base_url: is the main api url
+        :param pool_size: (optional) max number of keep-alive connections kept open towards the api host
+        :param chat_cache_size: (optional) max number of chat answers cached, 0 disables the cache
+        :param chat_cache_ttl: (optional) seconds a cached chat answer is valid
+        :param chat_cache_per_uid: (optional) if True answers are cached per user, otherwise shared by every user
+        :param metadata_ttl: (optional) a dictionary overriding METADATA_TTL, for example {'current_status': 0}
+        :param rate_limits: (optional) calls per second by end point, '*' is shared by every call, for example
+                            {'*': 10, 'ai/{aiid:s}/chat': 5}. A value can be a (calls per second, burst size) tuple
+        :param rate_limit_block: (optional) if True calls over the rate limit wait, otherwise they raise HutomaException
+        :param background_share: (optional) fraction of the connection pool BACKGROUND calls can use at the same time
+        :param connect_timeout: (optional) seconds to wait for a connection, None waits forever
+        :param read_timeout: (optional) seconds to wait for the server to send data, None waits forever
+        :param hedge: (optional) if True a chat/current_status call slower than hedge_percentile of the recent calls
+                      is sent a second time and the first answer wins
+        :param hedge_percentile: (optional) the latency percentile after which a call is hedged
+        :param manifest_path: (optional) the JSON file with the hashes of the uploaded files, default is
+                              ~/.easy_hutoma/manifest.json
+        :param debug_sampling: (optional) fraction of the calls logged at DEBUG level by end point, '*' is the
+                               default for every end point, for example {'*': 0.01}
+        :param hooks: (optional) a list of hutoma.hooks.Hook called around every api call
+        :param transport: (optional) 'requests' (default), 'urllib3' (leaner, directly on a connection pool), 'fake'
+                          (in-process, no network) or a hutoma.transport.Transport
+        """
+        super(EasyHutoma, self).__init__(user_key, base_url, pool_size, debug_sampling)
+        self._chat_cache_size = chat_cache_size
+        self._chat_cache_ttl = chat_cache_ttl
+        self._chat_cache_per_uid = chat_cache_per_uid
+        self._metadata_ttl = dict(self.METADATA_TTL, **(metadata_ttl or {}))
+        self._rate_limits = rate_limits
+        self._rate_limit_block = rate_limit_block
+        self._background_share = background_share
+        self._timeout = (connect_timeout, read_timeout)
+        self._hedge = hedge
+        self._hedge_percentile = hedge_percentile
+        self._manifest_path = manifest_path or os.path.join(os.path.expanduser('~'), '.easy_hutoma', 'manifest.json')
+        self._hooks = tuple(hooks or ())  # replaced, never changed in place: calls iterate it without a lock
+        self._transport = self._create_transport(transport)
+        self._closed = False
+        self._init_process_state()
+
+    def _init_process_state(self):
+        """ Create the state that can not be shared with a forked process: locks (a lock held by another thread at
+        fork time stays held forever in the child), caches, counters and the connection pool
+        """
+        self._api_calls_lock = threading.Lock()
+        self._chat_cache = LRUCache(self._chat_cache_size, self._chat_cache_ttl) if self._chat_cache_size > 0 else None
+        self._chat_generations = {}  # aiid -> number of chat cache invalidations
+        self._chat_lock = threading.Lock()
+        self._metadata_cache = LRUCache(maxsize=1024)
+        self._metadata_generations = {}  # metadata cache key -> number of invalidations
+        self._metadata_lock = threading.Lock()
+        self._in_flight = SingleFlight()
+        self._rate_limiter = RateLimiter(self._rate_limits) if self._rate_limits else None
+        self._scheduler = PriorityScheduler(self._pool_size, self._background_share)
+        self._local = threading.local()
+        # end point -> LatencyTracker
+        self._latencies = dict((end_point, LatencyTracker()) for end_point in self.HEDGED_END_POINTS) \
+            if self._hedge else {}
+        self._hedge_lock = threading.Lock()
+        self._hedged_calls = 0
+        self._hedge_wins = 0
+        self._manifest = None
+        self._manifest_lock = threading.Lock()
+        self._metrics = MetricsRegistry()
+        self._hooks_lock = threading.Lock()
+        # set last: the other threads use the object as soon as its pid is the one of their process
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        """ Give a forked child process its own connection pool and locks, the first time it uses this object
+        """
+        if self._pid == os.getpid():
+            return
+        with _fork_lock:
+            if self._pid == os.getpid():
+                return  # another thread of the child process got here first
+            logging.debug('EasyHutoma used in the forked process %s, creating a new connection pool', os.getpid())
+            # the parent connections are dropped without being closed: closing them would shut down the parent
+            # sockets (a TLS close_notify is sent on the shared socket)
+            if not self._closed:
+                self._transport.reset()
+            self._api_calls = 0
+            self._init_process_state()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _create_transport(self, transport):
+        """ Create and open the long-lived transport shared by every request of this object
+        """
+        transports = {None: RequestsTransport, 'requests': RequestsTransport, 'urllib3': Urllib3Transport,
+                      'fake': FakeTransport}
+        if isinstance(transport, basestring) or transport is None:
+            if transport not in transports:
+                raise HutomaException(
+                        message='unknown transport: {0}'.format(transport),
+                        sender='__init__'
+                )
+            transport = transports[transport]()
+        transport.open({'user_key': self._user_key}, self._pool_size)
+        return transport
+
+    def preconnect(self, connections=1):
+        """
+        Open connections to the api host ahead of the first calls, so that they do not pay the TCP/TLS handshake
+        :param connections: number of pooled connections to open (at most pool_size)
+        :return: the number of connections opened
+        """
+        self._check_fork()
+        if self._closed:
+            raise HutomaException(
+                    message='the session has been closed',
+                    sender='preconnect'
+            )
+        return self._transport.preconnect(self._base_url, min(connections, self._pool_size))
+
+    def close(self):
+        """ Close the session and every pooled connection
+        """
+        self._check_fork()
+        if not self._closed:
+            self._closed = True
+            self._transport.close()
+
+    def add_hook(self, hook):
+        """ Add a hutoma.hooks.Hook called around every api call
+        """
+        self._check_fork()
+        with self._hooks_lock:
+            self._hooks = self._hooks + (hook,)
+
+    def remove_hook(self, hook):
+        """ Remove a hook added with add_hook or the constructor
+        """
+        self._check_fork()
+        with self._hooks_lock:
+            self._hooks = tuple(h for h in self._hooks if h is not hook)
+
+    def _run_hooks(self, name, *args):
+        """ Call a method of every hook, a failing hook does not fail the api call
+        """
+        for hook in self._hooks:
+            try:
+                getattr(hook, name)(*args)
+            except Exception as e:
+                logging.warn('hook {0}.{1} failed: {2}'.format(type(hook).__name__, name, e))
+
+    @contextmanager
+    def call_options(self, **options):
+        """
+        Set options for the calls made by this thread inside a with block, for example:
+            with hutoma.call_options(priority=EasyHutoma.INTERACTIVE):
+                hutoma.current_status(aiid)
+        :param options: priority (INTERACTIVE or BACKGROUND),
+                        timeout (seconds or a (connect seconds, read seconds) tuple, overrides the client timeouts),
+                        deadline (max seconds for each call, including the time spent waiting for the rate limiter
+                                  and the scheduler)
+        """
+        unknown = set(options) - self.CALL_OPTIONS
+        if unknown:
+            raise HutomaException(
+                    message='unknown call options: {0}'.format(', '.join(sorted(unknown))),
+                    sender='call_options'
+            )
+        self._check_fork()
+        previous = getattr(self._local, 'options', {})
+        self._local.options = dict(previous, **options)
+        try:
+            yield
+        finally:
+            self._local.options = previous
+
+    def _call_option(self, name, default=None):
+        """ Return an option set with call_options by this thread
+        """
+        return getattr(self._local, 'options', {}).get(name, default)
+
+    def _inherit_call_options(self, function):
+        """ Return function wrapped to run, on a worker thread, with the call options of the calling thread
+        """
+        self._check_fork()
+        options = getattr(self._local, 'options', {})
+
+        def run(*args):
+            with self.call_options(**options):
+                return function(*args)
+        return run
+
+    def _request(self, method, end_point_url, params={}, upload=None, generation=None):
+        """
+        Run requests for this sessions
+        :param method: can be one in [GET, POST, DELETE, PUT]
+        :param end_point_url: the end point name
+        :param params: (optional) additional parameters for the url
+        :param upload: (optional) a MultipartUpload streamed as the request body
+        :param generation: (optional) the metadata generation of a GET: a coalesced GET is shared only by calls of
+                           the same generation
+        :return: a response (a dictionary) or raise an HutomaException
+        """
+        self._check_fork()
+        if self._closed:
+            raise HutomaException(
+                    message='the session has been closed',
+                    sender='_request'
+            )
+        path, url = self._build_url(end_point_url, params)
+        method = method.upper()
+
+        if method == 'GET' and upload is None and end_point_url in self.COALESCED_END_POINTS:
+            # only calls with the same call options (priority, timeout, deadline) share a call, a waiter gives up
+            # when its own deadline expires
+            options = getattr(self._local, 'options', {})
+            try:
+                response, leader = self._in_flight.do((method, url, frozenset(options.items()), generation),
+                                                      lambda: self._send(method, end_point_url, path, url,
+                                                                         params=params),
+                                                      options.get('deadline'))
+            except Expired:
+                raise self._timeout_exception(method, path, 'deadline expired waiting for an identical call')
+            # every waiter gets its own copy of the shared response
+            return response if leader else copy.deepcopy(response)
+        return self._send(method, end_point_url, path, url, upload, params)
+
+    def _send(self, method, end_point_url, path, url, upload=None, params=None):
+        """
+        Send a request on the session, once the rate limiter and the scheduler allow it, parse its response,
+        record the call in the metrics and run the hooks
+        :param method: can be one in [GET, POST, DELETE, PUT]
+        :param end_point_url: the end point name
+        :param path: the end point path
+        :param url: the full url
+        :param upload: (optional) a MultipartUpload streamed as the request body
+        :param params: (optional) the parameters of the url, passed to the hooks
+        :return: a response (a dictionary) or raise an HutomaException
+        """
+        end_point = self._end_point_name(end_point_url)
+        call = CallInfo(method, end_point, path, params)
+        debug = self._debug_sampled(end_point)
+        if debug:
+            logging.debug('API call %s: %s', method, path)
+        if self._hooks:
+            self._run_hooks('before_request', call)
+        try:
+            response = self._send_once(call, url, upload)
+            call.status_code = response.status_code
+            call.content = response.content
+            call.bytes_in = len(response.content)
+            if debug:
+                logging.debug('  Response %s %s: %s %.3fs %s', method, path, response.status_code,
+                              time.time() - call.started, self._debug_body(end_point, response.content))
+            try:
+                response = self._parse_response(method, path, response.status_code, response.content)
+            except HutomaException as e:
+                if self._rate_limiter is not None and e.error_code in self.THROTTLING_ERROR_CODES:
+                    self._rate_limiter.penalize(end_point)
+                raise
+            if self._rate_limiter is not None:
+                self._rate_limiter.reward(end_point)
+        except HutomaException as e:
+            self._end_call(call, upload, e, e.error_code if e.error_code is not None else e.error_type)
+            raise
+        except Exception as e:  # connection errors, but also unexpected response bodies: every call is closed out
+            self._end_call(call, upload, e, type(e).__name__)
+            raise
+        self._end_call(call, upload)
+        return response
+
+    def _end_call(self, call, upload, exception=None, error=None):
+        """ Complete the CallInfo of an ended call, record it in the metrics and run the hooks
+        """
+        call.elapsed = time.time() - call.started
+        call.bytes_out = 0 if upload is None else upload.sent
+        call.error = error
+        self._metrics.observe(call.end_point, call.elapsed, call.bytes_out, call.bytes_in, error)
+        if self._hooks:
+            if exception is None:
+                self._run_hooks('after_response', call)
+            else:
+                self._run_hooks('on_error', call, exception)
+
+    def _send_once(self, call, url, upload):
+        """
+        Wait for the rate limiter and send a request, hedging it if it is slow
+        :param call: the CallInfo of the request
+        :param url: the full url
+        :param upload: a MultipartUpload streamed as the request body or None
+        :return: the http response
+        """
+        method, end_point, path = call.method, call.end_point, call.path
+        deadline = self._call_option('deadline')
+        expires = None if deadline is None else call.started + deadline
+        priority = self._call_option('priority', self.END_POINT_PRIORITIES.get(end_point, BACKGROUND))
+        timeout = self._call_option('timeout', self._timeout)
+
+        if self._rate_limiter is not None and not self._rate_limiter.acquire(end_point, self._rate_limit_block,
+                                                                             self._remaining(expires, method, path)):
+            if self._rate_limit_block:
+                raise self._timeout_exception(method, path, 'deadline expired waiting for the rate limiter')
+            raise HutomaException(
+                    error_code=429,
+                    error_type='RateLimited',
+                    message='client side rate limit exceeded',
+                    sender='_request {0} {1}'.format(method, path)
+            )
+
+        def transmit():
+            return self._transmit(method, path, url, upload, priority, timeout, expires)
+
+        # only GETs are hedged: other methods share some end point templates (DELETE ai/{aiid:s}/) but are not
+        # idempotent
+        hedgeable = method == 'GET' and upload is None
+        sent = time.time()
+        delay = self._hedge_delay(end_point) if hedgeable else None
+        if delay is not None and (expires is None or sent + delay < expires):
+            # an error response (4xx/5xx) does not win over a slower successful one
+            response, hedged, hedge_won = hedged_call(transmit, delay, lambda: self._allow_hedge(end_point),
+                                                      lambda response: response.status_code >= 400)
+            call.hedged = hedged
+            with self._hedge_lock:
+                self._hedged_calls += hedged
+                self._hedge_wins += hedge_won
+        else:
+            response = transmit()
+        if hedgeable and end_point in self._latencies:
+            self._latencies[end_point].record(time.time() - sent)
+        return response
+
+    def _transmit(self, method, path, url, upload, priority, timeout, expires):
+        """
+        Send a request on the session within a scheduler slot
+        :param method: can be one in [GET, POST, DELETE, PUT]
+        :param path: the end point path
+        :param url: the full url
+        :param upload: a MultipartUpload streamed as the request body or None
+        :param priority: INTERACTIVE or BACKGROUND
+        :param timeout: seconds or a (connect seconds, read seconds) tuple
+        :param expires: the time the deadline expires, or None
+        :return: the http response
+        """
+        if not self._scheduler.acquire(priority, self._remaining(expires, method, path)):
+            raise self._timeout_exception(method, path, 'deadline expired waiting for a connection slot')
+        try:
+            remaining = self._remaining(expires, method, path)
+            if remaining is not None:
+                connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+                timeout = (min(connect, remaining) if connect is not None else remaining,
+                           min(read, remaining) if read is not None else remaining)
+            headers = None if upload is None else {'Content-Type': upload.content_type}
+            response = self._transport.request(method, url, body=upload, headers=headers, timeout=timeout)
+        except Timeout as e:
+            raise self._timeout_exception(method, path, e)
+        finally:
+            self._scheduler.release(priority)
+        self._count_api_call()
+        return response
+
+    def _remaining(self, expires, method, path):
+        """ Return the seconds left before the deadline expires (None if there is no deadline)
+        """
+        if expires is None:
+            return None
+        remaining = expires - time.time()
+        if remaining <= 0:
+            raise self._timeout_exception(method, path, 'deadline expired')
+        return remaining
+
+    def _timeout_exception(self, method, path, message):
+        """ Return the HutomaException raised when a call times out
+        """
+        return HutomaException(
+                error_type='Timeout',
+                message=message,
+                sender='_request {0} {1}'.format(method, path)
+        )
+
+    def _hedge_delay(self, end_point):
+        """ Return the seconds after which a call to the end point is hedged, None if it must not be hedged
+        """
+        if end_point not in self._latencies:
+            return None
+        return self._latencies[end_point].percentile(self._hedge_percentile)
+
+    def _allow_hedge(self, end_point):
+        """ A hedged call is sent only if the rate limiter has a token for it right now
+        """
+        return self._rate_limiter is None or self._rate_limiter.acquire(end_point, block=False)
+
+    def _get_manifest(self):
+        """ Return the manifest of the uploaded files, loading it the first time
+        """
+        self._check_fork()
+        with self._manifest_lock:
+            if self._manifest is None:
+                self._manifest = Manifest(self._manifest_path)
+            return self._manifest
+
+    def _forget_uploads(self, aiid, section=None):
+        """ Drop the manifest hashes of an AI after the api changed its files. This is best effort: the api call has
+        already succeeded, an unwritable manifest is logged and ignored
+        """
+        try:
+            self._get_manifest().forget(aiid, section)
+        except (IOError, OSError) as e:
+            logging.warn('manifest {0} not updated: {1}'.format(self._manifest_path, e))
+
+    def api_calls_count(self):
+        """ Return the number of APIs call for this session (in this process)
+        """
+        self._check_fork()
+        return super(EasyHutoma, self).api_calls_count()
+
+    def hedge_stats(self):
+        """ Return how many calls have been hedged and how many times the second call answered first
+        """
+        self._check_fork()
+        with self._hedge_lock:
+            return {'hedged': self._hedged_calls, 'hedge_wins': self._hedge_wins}
+
+    def rate_limits(self):
+        """ Return the current (adapted) calls per second by end point, None if there is no rate limit
+        """
+        self._check_fork()
+        if self._rate_limiter is None:
+            return None
+        return self._rate_limiter.rates()
+
+    def metrics(self):
+        """ Return the calls, errors by error code, latency histogram and body bytes by end point, see
+        MetricsRegistry.snapshot
+        """
+        self._check_fork()
+        return self._metrics.snapshot()
+
+    def prometheus_metrics(self):
+        """ Return the metrics in the Prometheus text exposition format
+        """
+        self._check_fork()
+        return self._metrics.prometheus()
+
+    def chat_cache_stats(self):
+        """ Return hits, misses, size and maxsize of the chat cache (None if the cache is disabled)
+        """
+        self._check_fork()
+        if self._chat_cache is None:
+            return None
+        return self._chat_cache.stats()
+
+    def _invalidate_metadata(self, *keys):
+        """ Drop cached list_ai/current_status responses, keys are ('list_ai',) or ('current_status', aiid). The
+        generation of the keys changes: a read started before is not cached and is not joined by later reads
+        """
+        with self._metadata_lock:
+            for key in keys:
+                self._metadata_generations[key] = self._metadata_generations.get(key, 0) + 1
+                self._metadata_cache.delete(key)
+
+    def _metadata_generation(self, key):
+        """ Return the number of invalidations of a metadata cache key
+        """
+        with self._metadata_lock:
+            return self._metadata_generations.get(key, 0)
+
+    def _cache_metadata(self, key, generation, value, ttl):
+        """ Cache a list_ai/current_status response, unless the key has been invalidated since generation was read
+        """
+        with self._metadata_lock:
+            if self._metadata_generations.get(key, 0) == generation:
+                self._metadata_cache.set(key, value, ttl=ttl)
+
+    def _invalidate_chat_cache(self, aiid):
+        """ Drop every cached chat answer of an AI. The generation of the AI changes: a chat started before is not
+        cached
+        """
+        if self._chat_cache is not None:
+            with self._chat_lock:
+                self._chat_generations[aiid] = self._chat_generations.get(aiid, 0) + 1
+                self._chat_cache.invalidate(lambda key: key[0] == aiid)
+
+    def _chat_generation(self, aiid):
+        """ Return the number of chat cache invalidations of an AI
+        """
+        with self._chat_lock:
+            return self._chat_generations.get(aiid, 0)
+
+    def _cache_chat(self, key, generation, output):
+        """ Cache a chat answer, unless the chat cache of the AI has been invalidated since generation was read
+        """
+        with self._chat_lock:
+            if self._chat_generations.get(key[0], 0) == generation:
+                self._chat_cache.set(key, output)
+
+    def _chat_cache_key(self, aiid, uid, q):
+        """ Return the chat cache key: aiid, the query without punctuation, case and extra spaces and optionally uid
+        """
+        q = ' '.join(re.sub(r'[^\w\s]', ' ', q, flags=re.UNICODE).lower().split())
+        return aiid, q, uid if self._chat_cache_per_uid else None
+
+    def list_ai(self, fresh=False):
         """
         Enumerate all active AI
+        :param fresh: if True skip the metadata cache and always call the API
         :return: a list of available AIs
         """
+        self._check_fork()  # before the caches: a forked child must not read the parent ones nor wait on its locks
+        ttl = self._metadata_ttl.get('list_ai')
+        if ttl and not fresh:
+            ais = self._metadata_cache.get(('list_ai',))
+            if ais is not None:
+                return list(ais)
+        generation = self._metadata_generation(('list_ai',))
         try:
             response = self._request(
                     'GET',
-                    'ai/'
+                    'ai/',
+                    generation=generation
             )
         except HutomaException as e:
             logging.warn('list_ai: ' + e.message)
             raise
+        if ttl:
+            self._cache_metadata(('list_ai',), generation, list(response['AIs']), ttl)
         return response['AIs']
 
     def create_ai(self):
@@ -154,6 +816,7 @@ class EasyHutoma(object):
         except HutomaException as e:
             logging.warn('create_ai: ' + e.message)
             raise
+        self._invalidate_metadata(('list_ai',))
         return response['AIs']
 
     def delete_ai(self, aiid):
@@ -172,14 +835,17 @@ class EasyHutoma(object):
         except HutomaException as e:
             logging.warn('delete_ai: ' + e.message)
             raise
+        self._invalidate_metadata(('list_ai',), ('current_status', aiid))
+        self._forget_uploads(aiid)
         return response['AIs']
 
-    def current_status(self, aiid):
+    def current_status(self, aiid, fresh=False):
         """
         Returns an object summarizing the overall AI runtime status. If the AI is in training, it will also return
         usefull information about that.
         :param aiid: the AI id
-        :return: ({
+        :param fresh: if True skip the metadata cache and always call the API
+        :return: AIStatus({
                     trainingStatus (integer, optional): A numerical value indicating the status of the training
                                                         process 0 - request queued 1 - training in process 2 -
                                                         training completed 3 - stopping 4 - stopped 5 - max training
@@ -206,16 +872,28 @@ class EasyHutoma(object):
                 })
         """
         self._check_aiid(aiid)
+        self._check_fork()
+        ttl = self._metadata_ttl.get('current_status')
+        if ttl and not fresh:
+            status = self._metadata_cache.get(('current_status', aiid))
+            if status is not None:
+                return status.copy()  # copied on write: the caller may change the dictionaries, not the cached ones
+        generation = self._metadata_generation(('current_status', aiid))
         try:
             response = self._request(
                     'GET',
                     'ai/{aiid:s}/',
-                    params={'aiid': aiid}
+                    params={'aiid': aiid},
+                    generation=generation
             )
         except HutomaException as e:
             logging.warn('current_status: ' + e.message)
             raise
-        return response['neuralnetwork'], response['aiml']
+        status = AIStatus(response['neuralnetwork'], response['aiml'])
+        if ttl:
+            self._cache_metadata(('current_status', aiid), generation, status, ttl)
+            return status.copy()
+        return status
 
     def change_status(self, aiid, status):
         """
@@ -226,7 +904,7 @@ class EasyHutoma(object):
         supplied files to verify they are correct.
         :param aiid: the AI id
         :param status: on of the AI_STATUSES
-        :return: ({
+        :return: AIStatus({
                     trainingStatus (integer, optional): A numerical value indicating the status of the training
                                                         process 0 - request queued 1 - training in process 2 -
                                                         training completed 3 - stopping 4 - stopped 5 - max training
@@ -263,7 +941,10 @@ class EasyHutoma(object):
         except HutomaException as e:
             logging.warn('change_status: ' + e.message)
             raise
-        return response['neuralnetwork'], response['aiml']
+        self._invalidate_metadata(('current_status', aiid))
+        if status.lower() == 'reload':
+            self._invalidate_chat_cache(aiid)
+        return AIStatus(response['neuralnetwork'], response['aiml'])
 
     def files_in_folder(self, aiid, folder):
         """
@@ -273,8 +954,7 @@ class EasyHutoma(object):
         :return: a list of filenames in the folder
         """
         self._check_aiid(aiid)
-        if not folder:
-            raise HutomaException('folder: {0} is not a valid folder name'.format(folder))
+        self._check_folder(folder)
         try:
             response = self._request(
                     'GET',
@@ -286,30 +966,78 @@ class EasyHutoma(object):
             raise
         return response['files']
 
-    def upload_file_in_folder(self, aiid, folder, file_path):
+    def upload_file_in_folder(self, aiid, folder, file_path, filename=None):
         """
-        Upload file to a folder
+        Upload file to a folder, the file is streamed from disk
         :param aiid: the AI id
         :param folder: folder name
-        :param file_path: path to the file to upload
+        :param file_path: path to the file to upload, or an open file object, bytes or an iterable of bytes
+        :param filename: (optional) the name of the uploaded file, default is the basename of the file
         :return: True or HutomaException
         """
         self._check_aiid(aiid)
-        if not folder:
-            raise HutomaException('folder: {0} is not a valid folder'.format(folder))
-        files = {'file': open(file_path, 'rb')}
+        self._check_folder(folder)
         try:
-            response = self._request(
-                    'POST',
-                    'ai/{aiid:s}/{folder:s}/',
-                    params={'aiid': aiid, 'folder': folder},
-                    files=files
-            )
+            with MultipartUpload(file_path, filename=filename) as upload:
+                response = self._request(
+                        'POST',
+                        'ai/{aiid:s}/{folder:s}/',
+                        params={'aiid': aiid, 'folder': folder},
+                        upload=upload
+                )
         except HutomaException as e:
             logging.warn('upload_file_in_folder: ' + e.message)
             raise
         return True
 
+    def sync_folder(self, aiid, folder, local_dir, max_workers=None):
+        """
+        Upload to a folder only the files of local_dir that are new or changed since the last sync, concurrently.
+        A file is changed if its content hash differs from the one in the manifest
+        :param aiid: the AI id
+        :param folder: folder name
+        :param local_dir: the local directory (only its regular, not hidden, files are synced)
+        :param max_workers: (optional) number of concurrent uploads, default is the connection pool size
+        :return: {'uploaded': [filenames], 'skipped': [filenames], 'failed': {filename: exception}}
+        """
+        self._check_aiid(aiid)
+        self._check_folder(folder)
+        names = sorted(name for name in os.listdir(local_dir)
+                       if not name.startswith('.') and os.path.isfile(os.path.join(local_dir, name)))
+        remote = set(self.files_in_folder(aiid, folder))
+        manifest = self._get_manifest()
+        section = 'folder/{0}'.format(folder)
+        known = manifest.get(aiid, section)
+
+        def _sync(name):
+            path = os.path.join(local_dir, name)
+            try:
+                digest = file_digest(path)
+                if name in remote and known.get(name) == digest:
+                    return name, 'skipped', digest, None
+                self.upload_file_in_folder(aiid, folder, path)
+                return name, 'uploaded', digest, None
+            except (HutomaException, RequestException, IOError) as e:
+                return name, 'failed', None, e
+
+        pool = ThreadPool(max_workers or self._pool_size)
+        try:
+            outcomes = pool.map(self._inherit_call_options(_sync), names)
+        finally:
+            pool.close()
+            pool.join()
+
+        report = {'uploaded': [], 'skipped': [], 'failed': {}}
+        hashes = {}
+        for name, action, digest, error in outcomes:
+            if action == 'failed':
+                report['failed'][name] = error
+            else:
+                report[action].append(name)
+                hashes[name] = digest
+        manifest.update(aiid, section, hashes, replace=True)
+        return report
+
     def delete_folder(self, aiid, folder):
         """
         Delete the content of a folder
@@ -318,8 +1046,7 @@ class EasyHutoma(object):
         :return: True or HutomaException
         """
         self._check_aiid(aiid)
-        if not folder:
-            raise HutomaException('folder: {0} is not a valid folder'.format(folder))
+        self._check_folder(folder)
         try:
             response = self._request(
                     'DELETE',
@@ -329,6 +1056,7 @@ class EasyHutoma(object):
         except HutomaException as e:
             logging.warn('delete_folder: ' + e.message)
             raise
+        self._forget_uploads(aiid, 'folder/{0}'.format(folder))
         return True
 
     def chat(self, aiid, uid, q, debug=False):
@@ -341,6 +1069,14 @@ class EasyHutoma(object):
         :return: a string containing the AI answer
         """
         self._check_aiid(aiid)
+        self._check_fork()
+        cache_key = None
+        if self._chat_cache is not None and not debug:
+            cache_key = self._chat_cache_key(aiid, uid, q)
+            output = self._chat_cache.get(cache_key)
+            if output is not None:
+                return output
+            generation = self._chat_generation(aiid)
         try:
             response = self._request(
                     'GET',
@@ -350,8 +1086,55 @@ class EasyHutoma(object):
         except HutomaException as e:
             logging.warn('chat: ' + e.message)
             raise
+        if cache_key is not None:
+            self._cache_chat(cache_key, generation, response['output'])
         return response['output']
 
+    def chat_many(self, aiid, items, max_workers=None, ordered=True, debug=False):
+        """
+        Text with an AI many times concurrently, errors are reported per item and do not stop the batch
+        :param aiid: the AI id
+        :param items: an iterable of (uid, q) pairs
+        :param max_workers: (optional) number of concurrent chats, default is the connection pool size
+        :param ordered: if True return a list in input order, otherwise yield results as they complete
+        :param debug: If set to True, the response returned by the AI will return useful debug information
+        :return: a list (or a generator) of ChatResult
+        """
+        self._check_aiid(aiid)
+        items = list(enumerate(items))
+        max_workers = max_workers or self._pool_size
+
+        def _chat(item):
+            index, pair = item
+            uid, q = None, None
+            try:
+                uid, q = pair
+                return ChatResult(index, uid, q, self.chat(aiid, uid, q, debug=debug), None)
+            except Exception as e:  # a malformed item fails alone
+                return ChatResult(index, uid, q, None, e)
+
+        _chat = self._inherit_call_options(_chat)
+        if not ordered:
+            return self._iter_pool(max_workers, _chat, items)
+        pool = ThreadPool(max_workers)
+        try:
+            return pool.map(_chat, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _iter_pool(self, max_workers, function, items):
+        """ Yield the results of function over items as they complete. The ThreadPool is created when the iteration
+        starts and released when it ends or the generator is closed
+        """
+        pool = ThreadPool(max_workers)
+        try:
+            for result in pool.imap_unordered(function, items):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+
     def speak(self, aiid, uid, utterance_file_path, voice=0, debug=False):
         # TODO(pierluigi) this function needs to be tested
         """
@@ -359,40 +1142,43 @@ class EasyHutoma(object):
         :param aiid: the AI id
         :param uid: (integer) a unique identifier associated to the user talking to the AI
         :param utterance_file_path: A binary stream containing an utterance. The utterance can be either a
-                                    wave/mp3 file or a captured live from the microphone.
+                                    wave/mp3 file or a captured live from the microphone. It can be a path, an
+                                    open file object, bytes or an iterable of bytes.
         :param voice: Set voice =0 to hear a response with a female voice. Set voice=1 to use a male voice.
         :param debug: If set to True, the response returned by the AI will return useful debug information
-        :return: {
+        :return: SpeakResult({
                     input (string, optional): the input string
                     confidence (number, optional): a value indicating the confidence level for the recognized utterance
                     output (string, optional): the response to the input string. If the debug field is set,
                                                additional information will be provided
                     tts (string, optional): a binary stream containing the spoken version of the output field
-                }
+                })
         """
         self._check_aiid(aiid)
         if voice > 0:
             voice = 1  # male voice
-        files = {'file': open(utterance_file_path, 'rb')}
         try:
-            response = self._request(
-                    'GET',
-                    'ai/{aiid:s}/speak?debug={debug:s}&voice={voice:d}&uid={uid:d}',
-                    params={'aiid': aiid, 'debug': 'true' if debug else 'false', 'voice': voice, 'uid': uid},
-                    files=files
-            )
+            with MultipartUpload(utterance_file_path) as upload:
+                response = self._request(
+                        'GET',
+                        'ai/{aiid:s}/speak?debug={debug:s}&voice={voice:d}&uid={uid:d}',
+                        params={'aiid': aiid, 'debug': 'true' if debug else 'false', 'voice': voice, 'uid': uid},
+                        upload=upload
+                )
         except HutomaException as e:
             logging.warn('speak: ' + e.message)
             raise
-        del response['code']
-        del response['message']
-        return response
+        # the speak envelope is flat (code and message next to the fields), _parse_response wraps it in 'status'
+        response = dict(response.pop('status'), **response)
+        response.pop('code', None)
+        response.pop('message', None)
+        return SpeakResult(response)
 
     def training_start(self, aiid):
         """
         Start training
         :param aiid: the AI id
-        :return: ({
+        :return: TrainingStatus({
                     trainingStatus (integer, optional): A numerical value indicating the status of the training
                                                         process 0 - request queued 1 - training in process 2 -
                                                         training completed 3 - stopping 4 - stopped 5 - max training
@@ -428,13 +1214,15 @@ class EasyHutoma(object):
         except HutomaException as e:
             logging.warn('training_start: ' + e.message)
             raise
-        return response['neuralnetwork'], response['aiml']
+        self._invalidate_metadata(('current_status', aiid))
+        self._invalidate_chat_cache(aiid)
+        return TrainingStatus(response['neuralnetwork'], response['aiml'])
 
     def training_stop(self, aiid):
         """
         Stop training
         :param aiid: the AI id
-        :return: ({
+        :return: TrainingStatus({
                     trainingStatus (integer, optional): A numerical value indicating the status of the training
                                                         process 0 - request queued 1 - training in process 2 -
                                                         training completed 3 - stopping 4 - stopped 5 - max training
@@ -470,7 +1258,8 @@ class EasyHutoma(object):
         except HutomaException as e:
             logging.warn('training_stop: ' + e.message)
             raise
-        return response['neuralnetwork'], response['aiml']
+        self._invalidate_metadata(('current_status', aiid))
+        return TrainingStatus(response['neuralnetwork'], response['aiml'])
 
     def training_delete(self, aiid):
         """
@@ -488,62 +1277,146 @@ class EasyHutoma(object):
         except HutomaException as e:
             logging.warn('training_delete: ' + e.message)
             raise
+        self._invalidate_metadata(('current_status', aiid))
+        self._forget_uploads(aiid, 'training')
         return True
 
     def training_upload_source(self, aiid, file_path):
         """
-        Upload the source.txt file
+        Upload the source.txt file, the file is streamed from disk
         :param aiid: the AI id
-        :param file_path: path to the target.txt
+        :param file_path: path to the source.txt, or an open file object, bytes or an iterable of bytes
         :return: True or HutomaException
         """
         self._check_aiid(aiid)
-        if 'source.txt' not in file_path:
-            raise HutomaException('source filename: {0} should be source.txt'.format(file_path))
-        files = {'file': open(file_path, 'rb')}
+        filename = self._check_training_file(file_path, 'source.txt')
         try:
-            response = self._request(
-                    'POST',
-                    'ai/{aiid:s}/training',
-                    params={'aiid': aiid},
-                    files=files
-            )
+            with MultipartUpload(file_path, filename=filename) as upload:
+                response = self._request(
+                        'POST',
+                        'ai/{aiid:s}/training',
+                        params={'aiid': aiid},
+                        upload=upload
+                )
         except HutomaException as e:
             logging.warn('training_upload_source: ' + e.message)
             raise
+        self._invalidate_chat_cache(aiid)
+        self._forget_uploads(aiid, 'training')
         return True
 
     def training_upload_target(self, aiid, file_path):
         """
-        Upload the target.txt file
+        Upload the target.txt file, the file is streamed from disk
         :param aiid: the AI id
-        :param file_path: path to the source.txt
+        :param file_path: path to the target.txt, or an open file object, bytes or an iterable of bytes
         :return: True or HutomaException
         """
         self._check_aiid(aiid)
-        if 'target.txt' not in file_path:
-            raise HutomaException('source filename: {0} should be target.txt'.format(file_path))
-        files = {'file': open(file_path, 'rb')}
+        filename = self._check_training_file(file_path, 'target.txt')
         try:
-            response = self._request(
-                    'POST',
-                    'ai/{aiid:s}/training',
-                    params={'aiid': aiid},
-                    files=files
-            )
+            with MultipartUpload(file_path, filename=filename) as upload:
+                response = self._request(
+                        'POST',
+                        'ai/{aiid:s}/training',
+                        params={'aiid': aiid},
+                        upload=upload
+                )
         except HutomaException as e:
             logging.warn('training_upload_target: ' + e.message)
             raise
+        self._invalidate_chat_cache(aiid)
+        self._forget_uploads(aiid, 'training')
         return True
 
     def training_upload_files(self, aiid, source_file_path, target_file_path):
         """
         Upload the source and target files
         :param aiid: the AI id
-        :param source_file_path: path to the source.txt
-        :param target_file_path: path to the target.txt
+        :param source_file_path: path to the source.txt (or a file object, bytes or an iterable of bytes)
+        :param target_file_path: path to the target.txt (or a file object, bytes or an iterable of bytes)
         :return: True if both uploads were fine or HutomaException
         """
         self.training_upload_source(aiid, source_file_path)
         self.training_upload_target(aiid, target_file_path)
         return True
+
+    def training_deploy(self, aiid, source_file_path, target_file_path, force=False):
+        """
+        Upload the training files and start the training, skipping what is not needed: the upload is skipped if the
+        content hash of the files is the one last uploaded by training_deploy, the training is skipped (unless
+        force is True) if that corpus has already been trained
+        :param aiid: the AI id
+        :param source_file_path: path to the source.txt
+        :param target_file_path: path to the target.txt
+        :param force: if True start the training even if the corpus has already been trained
+        :return: the training_start response or, if the training was skipped, the current_status one
+        """
+        self._check_aiid(aiid)
+        self._check_training_file(source_file_path, 'source.txt')
+        self._check_training_file(target_file_path, 'target.txt')
+        corpus = '{0}:{1}'.format(file_digest(source_file_path), file_digest(target_file_path))
+        manifest = self._get_manifest()
+        state = manifest.get(aiid, 'training')
+        if state.get('uploaded') != corpus:
+            self.training_upload_files(aiid, source_file_path, target_file_path)
+            manifest.update(aiid, 'training', {'uploaded': corpus})
+        elif state.get('trained') == corpus and not force:
+            logging.info('training_deploy: {0} corpus unchanged, training skipped'.format(aiid))
+            return self.current_status(aiid, fresh=True)
+        status = self.training_start(aiid)
+        # not recorded if the training files were changed in the meantime (the uploaded hash was forgotten)
+        manifest.update(aiid, 'training', {'trained': corpus}, expected={'uploaded': corpus})
+        return status
+
+    def wait_for_training(self, aiid, timeout=None, on_progress=None, on_transition=None, min_interval=2,
+                          max_interval=120, backoff=2.0, jitter=0.2):
+        """
+        Poll current_status until the training reaches a terminal trainingStatus (see TRAINING_TERMINAL_STATUSES).
+        The polling interval adapts: it goes back to min_interval when trainingStatus changes, it is halved when
+        the score changes and it grows by backoff (up to max_interval) while nothing changes. Every interval is
+        jittered to spread the polls of many watchers
+        :param aiid: the AI id
+        :param timeout: (optional) max seconds to wait, None waits forever
+        :param on_progress: (optional) called with the neuralnetwork status after every poll
+        :param on_transition: (optional) called with (previous trainingStatus, trainingStatus, neuralnetwork status)
+                              when trainingStatus changes (previous is None at the first poll)
+        :param min_interval: (optional) min seconds between two polls
+        :param max_interval: (optional) max seconds between two polls
+        :param backoff: (optional) the interval growth factor while nothing changes
+        :param jitter: (optional) the interval is randomly changed by up to this fraction
+        :return: the last current_status response or raise HutomaException on timeout
+        """
+        self._check_aiid(aiid)
+        expires = None if timeout is None else time.time() + timeout
+        interval = min_interval
+        previous = None  # (trainingStatus, score)
+        while True:
+            status, aiml = self.current_status(aiid, fresh=True)
+            training_status = status.get('trainingStatus')
+            score = status.get('score')
+            if on_progress is not None:
+                on_progress(status)
+            if previous is None or training_status != previous[0]:
+                if on_transition is not None:
+                    on_transition(previous[0] if previous is not None else None, training_status, status)
+                interval = min_interval
+            elif score != previous[1]:
+                interval = max(min_interval, interval / backoff)
+            else:
+                interval = min(max_interval, interval * backoff)
+            previous = training_status, score
+            if training_status in self.TRAINING_TERMINAL_STATUSES:
+                return status, aiml
+
+            wait = interval * random.uniform(1 - jitter, 1 + jitter)
+            if expires is not None:
+                remaining = expires - time.time()
+                if remaining <= 0:
+                    raise HutomaException(
+                            error_type='Timeout',
+                            message='training of {0} still running after {1} seconds'.format(aiid, timeout),
+                            sender='wait_for_training'
+                    )
+                wait = min(wait, remaining)
+            time.sleep(wait)
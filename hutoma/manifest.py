@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
+
+def file_digest(path, chunk_size=64 * 1024):
+    """ Return the sha1 hex digest of a file, read in chunks
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file_object:
+        while True:
+            chunk = file_object.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest(object):
+    """ A local JSON file keeping, for every AI, the content hashes of what has been uploaded. The file can be shared
+    by many processes: every change is made under a lock file and merged with the content on disk
+    """
+
+    def __init__(self, path):
+        """
+        Create a Manifest object, the file is created with the first update
+        :param path: path of the JSON file
+        """
+        self._path = path
+        self._lock = threading.Lock()
+
+    def get(self, aiid, section):
+        """ Return a copy of the {name: hash} dictionary of a section of an AI
+        """
+        return dict(self._load().get(aiid, {}).get(section, {}))
+
+    def update(self, aiid, section, hashes, replace=False, expected=None):
+        """
+        Store hashes in a section of an AI and save the manifest
+        :param aiid: the AI id
+        :param section: the section name, for example 'folder/aiml'
+        :param hashes: a {name: hash} dictionary, a None hash removes the name
+        :param replace: if True the section is replaced instead of updated
+        :param expected: (optional) a {name: hash} dictionary, the section is changed only if it holds these hashes
+        :return: True if the section was changed
+        """
+        with self._locked():
+            data = self._load()
+            sections = data.setdefault(aiid, {})
+            if expected is not None:
+                current = sections.get(section, {})
+                if any(current.get(name) != value for name, value in expected.items()):
+                    return False
+            values = {} if replace else sections.get(section, {})
+            values.update(hashes)
+            sections[section] = dict((name, value) for name, value in values.items() if value is not None)
+            self._save(data)
+            return True
+
+    def forget(self, aiid, section=None):
+        """ Remove a section of an AI, or every section if section is None. The file is saved only if it changed
+        """
+        if not os.path.exists(self._path):
+            return
+        with self._locked():
+            data = self._load()
+            if section is None:
+                removed = data.pop(aiid, None) is not None
+            else:
+                removed = data.get(aiid, {}).pop(section, None) is not None
+            if removed:
+                self._save(data)
+
+    @contextmanager
+    def _locked(self):
+        """ Hold the lock of this object and an exclusive lock on the .lock file next to the manifest, shared with
+        the other processes
+        """
+        directory = os.path.dirname(os.path.abspath(self._path))
+        with self._lock:
+            try:
+                os.makedirs(directory)
+            except OSError:  # it exists, maybe just created by another thread or process
+                if not os.path.isdir(directory):
+                    raise
+            with open(self._path + '.lock', 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _load(self):
+        """ Read the manifest from disk, an empty dictionary if it does not exist. An unreadable or corrupt manifest
+        is logged and read as empty: the files are uploaded again and the next update overwrites it
+        """
+        try:
+            with open(self._path) as file_object:
+                data = json.load(file_object)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                logging.warn('manifest {0} not readable, ignored: {1}'.format(self._path, e))
+            return {}
+        except ValueError as e:
+            logging.warn('manifest {0} corrupt, ignored: {1}'.format(self._path, e))
+            return {}
+        if not isinstance(data, dict):
+            logging.warn('manifest {0} corrupt, ignored: not a JSON object'.format(self._path))
+            return {}
+        return data
+
+    def _save(self, data):
+        """ Write the manifest atomically, through a temporary file in the same directory
+        """
+        directory = os.path.dirname(os.path.abspath(self._path))
+        handle, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as file_object:
+            json.dump(data, file_object, indent=1, sort_keys=True)
+        if os.name == 'nt' and os.path.exists(self._path):
+            os.remove(self._path)  # rename does not overwrite on windows
+        os.rename(temporary_path, self._path)
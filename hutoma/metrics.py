@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import threading
+
+# upper bounds (seconds) of the latency histogram buckets, the last bucket (+Inf) is implicit
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _EndPointMetrics(object):
+    """ The counters of a single end point
+    """
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.errors = {}  # error code -> count
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.latency_sum = 0.0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+
+class MetricsRegistry(object):
+    """ Thread-safe request counts, errors by error code, latency histograms and body sizes by end point template
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Create a MetricsRegistry object
+        :param buckets: (optional) the sorted upper bounds, in seconds, of the latency histogram buckets
+        """
+        self._buckets = tuple(sorted(buckets))
+        self._end_points = {}  # end point -> _EndPointMetrics
+        self._lock = threading.Lock()
+
+    def observe(self, end_point, seconds, bytes_out=0, bytes_in=0, error=None):
+        """
+        Record a call
+        :param end_point: the end point template, for example 'ai/{aiid:s}/chat'
+        :param seconds: the call duration
+        :param bytes_out: size of the request body
+        :param bytes_in: size of the response body
+        :param error: (optional) the error code (or error type) if the call failed
+        """
+        with self._lock:
+            metrics = self._end_points.get(end_point)
+            if metrics is None:
+                metrics = self._end_points[end_point] = _EndPointMetrics(self._buckets)
+            metrics.requests += 1
+            if error is not None:
+                metrics.errors[error] = metrics.errors.get(error, 0) + 1
+            metrics.bucket_counts[bisect.bisect_left(self._buckets, seconds)] += 1
+            metrics.latency_sum += seconds
+            metrics.bytes_out += bytes_out
+            metrics.bytes_in += bytes_in
+
+    def reset(self):
+        """ Drop every recorded call
+        """
+        with self._lock:
+            self._end_points = {}
+
+    def snapshot(self):
+        """
+        Return a copy of the metrics
+        :return: {end point: {
+                    requests: number of calls,
+                    errors: {error code: number of failed calls},
+                    latency: {buckets: [(upper bound, cumulative count), ..., ('+Inf', count)], sum: seconds},
+                    bytes_out: request body bytes,
+                    bytes_in: response body bytes
+                 }}
+        """
+        bounds = list(self._buckets) + ['+Inf']
+        snapshot = {}
+        with self._lock:
+            for end_point, metrics in self._end_points.items():
+                cumulative, buckets = 0, []
+                for bound, count in zip(bounds, metrics.bucket_counts):
+                    cumulative += count
+                    buckets.append((bound, cumulative))
+                snapshot[end_point] = {
+                    'requests': metrics.requests,
+                    'errors': dict(metrics.errors),
+                    'latency': {'buckets': buckets, 'sum': metrics.latency_sum},
+                    'bytes_out': metrics.bytes_out,
+                    'bytes_in': metrics.bytes_in,
+                }
+        return snapshot
+
+    def prometheus(self, prefix='hutoma'):
+        """ Return the metrics in the Prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        end_points = sorted(snapshot)
+
+        def label(value):
+            return '{0}'.format(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = []
+
+        def family(name, kind, description):
+            lines.append('# HELP {0}_{1} {2}'.format(prefix, name, description))
+            lines.append('# TYPE {0}_{1} {2}'.format(prefix, name, kind))
+
+        family('requests_total', 'counter', 'API calls by end point.')
+        for end_point in end_points:
+            lines.append('{0}_requests_total{{end_point="{1}"}} {2}'.format(
+                    prefix, label(end_point), snapshot[end_point]['requests']))
+        family('errors_total', 'counter', 'Failed API calls by end point and error code.')
+        for end_point in end_points:
+            for error, count in sorted(snapshot[end_point]['errors'].items(), key=lambda item: str(item[0])):
+                lines.append('{0}_errors_total{{end_point="{1}",error_code="{2}"}} {3}'.format(
+                        prefix, label(end_point), label(error), count))
+        family('request_duration_seconds', 'histogram', 'API call latency by end point.')
+        for end_point in end_points:
+            latency = snapshot[end_point]['latency']
+            for bound, count in latency['buckets']:
+                lines.append('{0}_request_duration_seconds_bucket{{end_point="{1}",le="{2}"}} {3}'.format(
+                        prefix, label(end_point), bound, count))
+            lines.append('{0}_request_duration_seconds_sum{{end_point="{1}"}} {2!r}'.format(
+                    prefix, label(end_point), latency['sum']))
+            lines.append('{0}_request_duration_seconds_count{{end_point="{1}"}} {2}'.format(
+                    prefix, label(end_point), snapshot[end_point]['requests']))
+        for name, key, description in [('request_bytes_total', 'bytes_out', 'Request body bytes by end point.'),
+                                       ('response_bytes_total', 'bytes_in', 'Response body bytes by end point.')]:
+            family(name, 'counter', description)
+            for end_point in end_points:
+                lines.append('{0}_{1}{{end_point="{2}"}} {3}'.format(
+                        prefix, name, label(end_point), snapshot[end_point][key]))
+        return '\n'.join(lines) + '\n'
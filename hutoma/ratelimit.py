@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    """ A thread-safe token bucket whose rate adapts to server signals: it halves on errors and grows back slowly
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None, timer=time.time, sleep=time.sleep):
+        """
+        Create a TokenBucket object
+        :param rate: max calls per second
+        :param capacity: (optional) max burst size, default is rate (at least 1)
+        :param min_rate: (optional) lower bound of the adapted rate, default is rate / 10
+        :param timer: (optional) the clock
+        :param sleep: (optional) the function used to wait
+        """
+        self._max_rate = float(rate)
+        self._rate = float(rate)
+        self._min_rate = float(min_rate) if min_rate is not None else self._max_rate / 10
+        self._capacity = float(capacity) if capacity is not None else max(1.0, self._max_rate)
+        self._tokens = self._capacity
+        self._timer = timer
+        self._sleep = sleep
+        self._last = timer()
+        self._last_penalty = None
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        """ The current calls per second
+        """
+        return self._rate
+
+    def _refill(self, now):
+        self._tokens = min(self._capacity, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+    def acquire(self, block=True, timeout=None):
+        """
+        Take a token
+        :param block: if True wait for a token, otherwise return immediately
+        :param timeout: (optional) max seconds to wait
+        :return: True if a token was taken
+        """
+        deadline = None if timeout is None else self._timer() + timeout
+        while True:
+            with self._lock:
+                now = self._timer()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self._rate
+            if not block or (deadline is not None and now + wait > deadline):
+                return False
+            self._sleep(wait)
+
+    def release(self):
+        """ Give back a token taken with acquire and not used
+        """
+        with self._lock:
+            self._tokens = min(self._capacity, self._tokens + 1)
+
+    def penalize(self):
+        """ Halve the rate after a throttling signal (at most once per second)
+        """
+        with self._lock:
+            now = self._timer()
+            if self._last_penalty is not None and now - self._last_penalty < 1:
+                return
+            self._last_penalty = now
+            self._refill(now)
+            self._rate = max(self._min_rate, self._rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def reward(self):
+        """ Grow the rate back towards its max after a successful call
+        """
+        with self._lock:
+            if self._rate < self._max_rate:
+                self._refill(self._timer())
+                self._rate = min(self._max_rate, self._rate + self._max_rate / 20)
+
+
+class RateLimiter(object):
+    """ Token buckets per end point, the '*' bucket (if any) is shared by every end point
+    """
+
+    def __init__(self, rates, timer=time.time, sleep=time.sleep):
+        """
+        Create a RateLimiter object
+        :param rates: a dictionary end point -> calls per second (or a (calls per second, burst size) tuple)
+        :param timer: (optional) the clock
+        :param sleep: (optional) the function used to wait
+        """
+        self._timer = timer
+        self._buckets = {}
+        for end_point, rate in rates.items():
+            rate, capacity = rate if isinstance(rate, tuple) else (rate, None)
+            self._buckets[end_point] = TokenBucket(rate, capacity, timer=timer, sleep=sleep)
+
+    def buckets(self, end_point):
+        """ Return the buckets an end point call has to go through
+        """
+        return [self._buckets[key] for key in ('*', end_point) if key in self._buckets]
+
+    def acquire(self, end_point, block=True, timeout=None):
+        """
+        Take a token from every bucket of the end point
+        :param end_point: the end point template
+        :param block: if True wait for the tokens, otherwise return immediately
+        :param timeout: (optional) max seconds to wait for all the tokens
+        :return: True if every token was taken, otherwise False and no token is kept
+        """
+        deadline = None if timeout is None else self._timer() + timeout
+        taken = []
+        for bucket in self.buckets(end_point):
+            remaining = None if deadline is None else max(0.0, deadline - self._timer())
+            if not bucket.acquire(block, remaining):
+                for other in taken:
+                    other.release()
+                return False
+            taken.append(bucket)
+        return True
+
+    def penalize(self, end_point):
+        for bucket in self.buckets(end_point):
+            bucket.penalize()
+
+    def reward(self, end_point):
+        for bucket in self.buckets(end_point):
+            bucket.reward()
+
+    def rates(self):
+        """ Return the current rate of every bucket
+        """
+        return dict((end_point, bucket.rate) for end_point, bucket in self._buckets.items())
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import base64
+from operator import itemgetter
+
+# trainingStatus values after which a training is not running any more
+TRAINING_TERMINAL_STATUSES = frozenset([
+    2,  # training completed
+    3,  # stopping
+    4,  # stopped
+    5,  # max training time reached
+])
+
+
+class AIStatus(object):
+    """ The (neuralnetwork, aiml) status of an AI returned by current_status and change_status. It reads like the
+    2-tuple of the response dictionaries it replaces (it unpacks, indexes and compares like it) and has read-only
+    shortcuts to the common fields. A status read from the current_status cache shares the cached dictionaries and
+    copies them only when they are read: polling a field like training_status allocates nothing but this object
+    """
+
+    __slots__ = ('_neuralnetwork', '_aiml', '_shared')
+
+    def __init__(self, neuralnetwork, aiml, shared=False):
+        """
+        Create an AIStatus object
+        :param neuralnetwork: the neuralnetwork dictionary of the response
+        :param aiml: the aiml dictionary of the response
+        :param shared: (optional) if True the dictionaries belong to someone else, they are copied before being
+                       handed out
+        """
+        self._neuralnetwork = neuralnetwork
+        self._aiml = aiml
+        self._shared = shared
+
+    def _parts(self):
+        """ Return the (neuralnetwork, aiml) dictionaries the caller can change, copying the shared ones once
+        """
+        if self._shared:
+            self._neuralnetwork, self._aiml, self._shared = dict(self._neuralnetwork), dict(self._aiml), False
+        return self._neuralnetwork, self._aiml
+
+    @property
+    def neuralnetwork(self):
+        return self._parts()[0]
+
+    @property
+    def aiml(self):
+        return self._parts()[1]
+
+    @property
+    def training_status(self):
+        return self._neuralnetwork.get('trainingStatus')
+
+    @property
+    def runtime_status(self):
+        return self._neuralnetwork.get('runtimeStatus')
+
+    @property
+    def score(self):
+        return self._neuralnetwork.get('score')
+
+    @property
+    def compile_error(self):
+        return self._aiml.get('compileError')
+
+    def copy(self):
+        """ Return a status whose dictionaries can be changed without changing this one: they are copied when the
+        copy hands them out
+        """
+        return type(self)(self._neuralnetwork, self._aiml, shared=True)
+
+    def __getitem__(self, index):
+        return self._parts()[index]
+
+    def __iter__(self):
+        return iter(self._parts())
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        if isinstance(other, AIStatus):
+            return self._neuralnetwork == other._neuralnetwork and self._aiml == other._aiml
+        if isinstance(other, tuple):
+            return (self._neuralnetwork, self._aiml) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return type(self), (self._neuralnetwork, self._aiml)  # copy and pickle pass the two parts to __init__
+
+    def __repr__(self):
+        return '{0}(neuralnetwork={1!r}, aiml={2!r})'.format(type(self).__name__, self._neuralnetwork, self._aiml)
+
+
+class TrainingStatus(AIStatus):
+    """ The status returned by training_start and training_stop
+    """
+
+    __slots__ = ()
+
+    @property
+    def finished(self):
+        """ True if the training is not running any more
+        """
+        return self.training_status in TRAINING_TERMINAL_STATUSES
+
+
+class SpeakResult(object):
+    """ The answer of speak. It reads like the response dictionary (result['output'], result.get('tts'),
+    dict(**result)) and decodes the audio only when audio is read
+    """
+
+    __slots__ = ('_response', '_audio')
+
+    def __init__(self, response):
+        self._response = response
+        self._audio = None
+
+    input = property(lambda self: self._response.get('input'))
+    confidence = property(lambda self: self._response.get('confidence'))
+    output = property(lambda self: self._response.get('output'))
+    tts = property(lambda self: self._response.get('tts'))
+
+    @property
+    def audio(self):
+        """ The tts audio decoded from base64, None if there is no tts
+        """
+        if self._audio is None and self._response.get('tts'):
+            self._audio = base64.b64decode(self._response['tts'])
+        return self._audio
+
+    def __getitem__(self, key):
+        return self._response[key]
+
+    def get(self, key, default=None):
+        return self._response.get(key, default)
+
+    def keys(self):
+        return self._response.keys()
+
+    def items(self):
+        return self._response.items()
+
+    def values(self):
+        return self._response.values()
+
+    def __iter__(self):
+        return iter(self._response)
+
+    def __len__(self):
+        return len(self._response)
+
+    def __contains__(self, key):
+        return key in self._response
+
+    def __eq__(self, other):
+        if isinstance(other, SpeakResult):
+            other = other._response
+        return self._response == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        tts = self._response.get('tts')
+        fields = dict(self._response, tts='<{0} characters>'.format(len(tts))) if tts else self._response
+        return 'SpeakResult({0!r})'.format(fields)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from contextlib import contextmanager
+
+# priority classes, lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class PriorityScheduler(object):
+    """ Share a fixed number of request slots between interactive and background calls. Interactive calls are
+    served first, background calls never take more than their share of the slots
+    """
+
+    def __init__(self, slots, background_share=0.5):
+        """
+        Create a PriorityScheduler object
+        :param slots: max number of concurrent calls (usually the connection pool size)
+        :param background_share: fraction of the slots background calls can use (at least one slot)
+        """
+        self._slots = slots
+        self._background_slots = max(1, int(slots * background_share))
+        self._running = 0
+        self._running_background = 0
+        self._waiting_interactive = 0
+        self._condition = threading.Condition()
+
+    def _can_run(self, priority):
+        if self._running >= self._slots:
+            return False
+        if priority == INTERACTIVE:
+            return True
+        return self._waiting_interactive == 0 and self._running_background < self._background_slots
+
+    def acquire(self, priority=BACKGROUND, timeout=None):
+        """
+        Wait for a slot
+        :param priority: INTERACTIVE or BACKGROUND
+        :param timeout: (optional) max seconds to wait
+        :return: True if a slot was taken
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            if priority == INTERACTIVE:
+                self._waiting_interactive += 1
+            try:
+                while not self._can_run(priority):
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        self._condition.notify_all()  # background calls may be waiting for this one to give up
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                if priority == INTERACTIVE:
+                    self._waiting_interactive -= 1
+            self._running += 1
+            if priority != INTERACTIVE:
+                self._running_background += 1
+            return True
+
+    def release(self, priority=BACKGROUND):
+        """ Give back a slot taken with acquire
+        """
+        with self._condition:
+            self._running -= 1
+            if priority != INTERACTIVE:
+                self._running_background -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority=BACKGROUND):
+        """ Hold a slot for the duration of a with block
+        """
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self):
+        """ Return the number of running calls, running background calls and interactive calls waiting
+        """
+        with self._condition:
+            return {
+                'running': self._running,
+                'running_background': self._running_background,
+                'waiting_interactive': self._waiting_interactive,
+            }
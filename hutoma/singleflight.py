@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+
+class Expired(Exception):
+    """ Raised to a waiter whose timeout expired before the call in flight ended
+    """
+
+
+class _Call(object):
+    """ A call in flight, waiters block on done until the leader stores its result or error
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """ Coalesce concurrent identical calls: only the first caller runs, the others wait and share its outcome
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function, timeout=None):
+        """
+        Run function, unless a call with the same key is already in flight
+        :param key: identifies identical calls
+        :param function: the function to run, without arguments
+        :param timeout: (optional) max seconds to wait for a call in flight, then Expired is raised
+        :return: (the result, True if this caller run the function) or raise the function exception
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise Expired()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        try:
+            call.result = function()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, True
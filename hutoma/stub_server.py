@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+
+# A local stand-in for the Hutoma API, to test and load-test clients without a user key and without burning quota.
+# It keeps the AIs in memory and answers with the same envelopes as the real API. Run it with:
+#
+#   python -m hutoma.stub_server --port 8080 --latency 0.05 --error-rate 0.01
+#
+# and point EasyHutoma to it with base_url='http://127.0.0.1:8080/api/v1/'
+
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qsl, urlsplit
+except ImportError:  # python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qsl, unquote, urlsplit
+
+from .hooks import read_trace
+
+BASE_PATH = '/api/v1/'
+
+# (method, path regex, end point template as named by the client, handler name)
+ROUTES = [
+    ('GET', r'ai/$', 'ai/', 'list_ai'),
+    ('POST', r'ai/$', 'ai/', 'create_ai'),
+    ('GET', r'ai/(?P<aiid>[^/?]+)/chat$', 'ai/{aiid:s}/chat', 'chat'),
+    ('GET', r'ai/(?P<aiid>[^/?]+)/speak$', 'ai/{aiid:s}/speak', 'speak'),
+    ('PUT', r'ai/(?P<aiid>[^/?]+)/training$', 'ai/{aiid:s}/training', 'training_action'),
+    ('POST', r'ai/(?P<aiid>[^/?]+)/training$', 'ai/{aiid:s}/training', 'training_upload'),
+    ('DELETE', r'ai/(?P<aiid>[^/?]+)/training$', 'ai/{aiid:s}/training', 'training_delete'),
+    ('GET', r'ai/(?P<aiid>[^/?]+)/$', 'ai/{aiid:s}/', 'current_status'),
+    ('DELETE', r'ai/(?P<aiid>[^/?]+)/$', 'ai/{aiid:s}/', 'delete_ai'),
+    ('GET', r'ai/(?P<aiid>[^/?]+)$', 'ai/{aiid:s}', 'change_status'),
+    ('GET', r'ai/(?P<aiid>[^/?]+)/(?P<folder>[^/?]+)/$', 'ai/{aiid:s}/{folder:s}/', 'files_in_folder'),
+    ('POST', r'ai/(?P<aiid>[^/?]+)/(?P<folder>[^/?]+)/$', 'ai/{aiid:s}/{folder:s}/', 'upload_file_in_folder'),
+    ('DELETE', r'ai/(?P<aiid>[^/?]+)/(?P<folder>[^/?]+)/$', 'ai/{aiid:s}/{folder:s}/', 'delete_folder'),
+]
+
+TRAINING_DETAILS = {
+    0: 'request queued',
+    1: 'training in process',
+    2: 'training completed',
+    3: 'stopping',
+    4: 'stopped',
+}
+
+
+class StubError(Exception):
+    """ An api error, answered with a status envelope
+    """
+
+    def __init__(self, code, error_type, error_details, http_status=200):
+        super(StubError, self).__init__(error_details)
+        self.code = code
+        self.error_type = error_type
+        self.error_details = error_details
+        self.http_status = http_status
+
+    def envelope(self):
+        return {'status': {'code': self.code, 'errorType': self.error_type, 'errorDetails': self.error_details}}
+
+
+class _AI(object):
+    """ The in memory state of an AI
+    """
+
+    def __init__(self, aiid):
+        self.aiid = aiid
+        self.runtime_status = 0
+        self.training_status = 4
+        self.training_started = None
+        self.source = None  # uploaded training lines
+        self.target = None
+        self.answers = {}  # question -> answer, from the last completed training
+        self.folders = {}  # folder -> list of file names
+
+
+class StubApi(object):
+    """ The in memory Hutoma API: every handler receives the path parameters, the query and the request body and
+    returns a response dictionary or raises StubError
+    """
+
+    def __init__(self, training_seconds=5.0, cold_start=0.0, tts_bytes=1024):
+        """
+        Create a StubApi object
+        :param training_seconds: (optional) how long a training lasts
+        :param cold_start: (optional) extra seconds of the first chat/speak of an AI that is not running
+        :param tts_bytes: (optional) size of the audio returned by speak
+        """
+        self._training_seconds = training_seconds
+        self._cold_start = cold_start
+        self._tts = base64.b64encode(b'\0' * tts_bytes).decode('ascii')
+        self._ais = {}
+        self._lock = threading.Lock()
+
+    def _ai(self, aiid):
+        ai = self._ais.get(aiid)
+        if ai is None:
+            raise StubError(404, 'NotFound', 'AI {0} not found'.format(aiid))
+        self._update_training(ai)
+        return ai
+
+    def _update_training(self, ai):
+        """ Complete a running training once training_seconds are elapsed
+        """
+        if ai.training_status == 1 and time.time() - ai.training_started >= self._training_seconds:
+            ai.training_status = 2
+            ai.answers = dict(zip(ai.source, ai.target))
+
+    def _status(self, ai):
+        neuralnetwork = {
+            'trainingStatus': ai.training_status,
+            'trainingStatusDetails': TRAINING_DETAILS[ai.training_status],
+            'runtimeStatus': ai.runtime_status,
+            'runtimeStatusDetails': 'running' if ai.runtime_status else 'not running',
+        }
+        if ai.training_status == 1:
+            progress = (time.time() - ai.training_started) / max(self._training_seconds, 1e-6)
+            neuralnetwork['score'] = round(max(0.0, 1.0 - progress), 3)
+            neuralnetwork['sample'] = ai.target[0] if ai.target else ''
+        aiml = {
+            'runtimeStatus': ai.runtime_status,
+            'runtimeStatusDetails': 'running' if ai.runtime_status else 'not running',
+            'compileError': '',
+        }
+        return {'neuralnetwork': neuralnetwork, 'aiml': aiml}
+
+    def _load(self, ai):
+        """ Return the seconds the AI takes to answer its first query
+        """
+        if ai.runtime_status:
+            return 0.0
+        ai.runtime_status = 1
+        return self._cold_start
+
+    def list_ai(self, query, body):
+        with self._lock:
+            return {'AIs': sorted(self._ais)}
+
+    def create_ai(self, query, body):
+        with self._lock:
+            aiid = uuid.uuid4().hex
+            self._ais[aiid] = _AI(aiid)
+            return {'AIs': sorted(self._ais)}
+
+    def delete_ai(self, query, body, aiid):
+        with self._lock:
+            self._ai(aiid)
+            del self._ais[aiid]
+            return {'AIs': sorted(self._ais)}
+
+    def current_status(self, query, body, aiid):
+        with self._lock:
+            return self._status(self._ai(aiid))
+
+    def change_status(self, query, body, aiid):
+        with self._lock:
+            ai = self._ai(aiid)
+            action = query.get('action')
+            if action in ('start', 'reload'):
+                ai.runtime_status = 1
+            elif action == 'stop':
+                ai.runtime_status = 0
+            elif action != 'compile':
+                raise StubError(400, 'BadRequest', 'unknown action {0}'.format(action))
+            return self._status(ai)
+
+    def files_in_folder(self, query, body, aiid, folder):
+        with self._lock:
+            return {'files': list(self._ai(aiid).folders.get(folder, []))}
+
+    def upload_file_in_folder(self, query, body, aiid, folder):
+        filename = _multipart_filename(body)
+        with self._lock:
+            files = self._ai(aiid).folders.setdefault(folder, [])
+            if filename not in files:
+                files.append(filename)
+            return {}
+
+    def delete_folder(self, query, body, aiid, folder):
+        with self._lock:
+            self._ai(aiid).folders.pop(folder, None)
+            return {}
+
+    def chat(self, query, body, aiid):
+        with self._lock:
+            ai = self._ai(aiid)
+            q = query.get('q', '')
+            output = ai.answers.get(q, u'echo: {0}'.format(q))
+            delay = self._load(ai)
+        time.sleep(delay)
+        return {'output': output}
+
+    def speak(self, query, body, aiid):
+        size = len(_multipart_content(body))
+        with self._lock:
+            delay = self._load(self._ai(aiid))
+        time.sleep(delay)
+        # the speak envelope is flat: code and message next to the fields
+        return {'code': 200, 'message': 'OK', 'input': u'utterance of {0} bytes'.format(size),
+                'confidence': 0.9, 'output': u'echo: utterance of {0} bytes'.format(size), 'tts': self._tts}
+
+    def training_action(self, query, body, aiid):
+        with self._lock:
+            ai = self._ai(aiid)
+            action = query.get('action')
+            if action == 'start':
+                if ai.source is None or ai.target is None:
+                    raise StubError(400, 'TrainingFilesMissing', 'upload source.txt and target.txt first')
+                ai.training_status = 1
+                ai.training_started = time.time()
+            elif action == 'stop':
+                if ai.training_status == 1:
+                    ai.training_status = 4
+            else:
+                raise StubError(400, 'BadRequest', 'unknown action {0}'.format(action))
+            return self._status(ai)
+
+    def training_upload(self, query, body, aiid):
+        filename = _multipart_filename(body)
+        lines = _multipart_content(body).decode('utf-8', 'replace').splitlines()
+        with self._lock:
+            ai = self._ai(aiid)
+            if filename == 'source.txt':
+                ai.source = lines
+            elif filename == 'target.txt':
+                ai.target = lines
+            else:
+                raise StubError(400, 'BadRequest', 'unexpected training file {0}'.format(filename))
+            return {}
+
+    def training_delete(self, query, body, aiid):
+        with self._lock:
+            ai = self._ai(aiid)
+            ai.source = ai.target = None
+            ai.answers = {}
+            ai.training_status = 4
+            return {}
+
+
+def _multipart_filename(body):
+    match = re.search(br'filename="([^"]*)"', body[:4096])
+    return match.group(1).decode('utf-8') if match else 'file'
+
+
+def _multipart_content(body):
+    """ Return the content of the single file part of a multipart body
+    """
+    start = body.find(b'\r\n\r\n')
+    end = body.rfind(b'\r\n--')
+    return body[start + 4:end] if start >= 0 and end > start else b''
+
+
+class Replay(object):
+    """ The responses of a trace recorded with TraceRecorder(record_bodies=True), by method and path. The responses
+    of a path are served in the recorded order, cycling
+    """
+
+    def __init__(self, path, latency=False):
+        """
+        Create a Replay object
+        :param path: the trace file
+        :param latency: (optional) if True every response is delayed by its recorded latency
+        """
+        self._responses = {}  # (method, path) -> list of (status, body, latency)
+        self._next = {}
+        self._latency = latency
+        self._lock = threading.Lock()
+        for record in read_trace(path):
+            if 'body' in record and 'path' in record:
+                key = (record['method'], record['path'])
+                self._responses.setdefault(key, []).append((record['status'], record['body'], record['latency']))
+
+    def get(self, method, path):
+        """ Return the next (http status, body, seconds to wait) recorded for a call, None if there is none
+        """
+        with self._lock:
+            responses = self._responses.get((method, path))
+            if not responses:
+                return None
+            index = self._next.get((method, path), 0)
+            self._next[(method, path)] = (index + 1) % len(responses)
+        status, body, latency = responses[index]
+        return status, body, latency if self._latency else 0.0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1  # headers and body in a single write, flushed at the end of each request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # keep load tests quiet
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, http_status, body):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(http_status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        self.server.stub.handle(self)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class StubServer(object):
+    """ A threaded HTTP server answering like the Hutoma API, with injected latency and errors and an optional replay
+    of recorded responses, for example:
+        with StubServer(latency=0.05) as server:
+            hutoma = EasyHutoma('any key', base_url=server.base_url)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, error_codes=(503,),
+                 replay=None, replay_latency=False, training_seconds=5.0, cold_start=0.0, tts_bytes=1024,
+                 seed=None):
+        """
+        Create a StubServer object
+        :param host: (optional) the address to listen on
+        :param port: (optional) the port to listen on, 0 picks a free port
+        :param latency: (optional) seconds added to every response, or a dictionary by end point template where '*'
+                        is the default, for example {'*': 0.01, 'ai/{aiid:s}/chat': 0.2}
+        :param jitter: (optional) the latency varies randomly by this fraction
+        :param error_rate: (optional) fraction of the calls answered with an error, or a dictionary by end point
+                           template like latency
+        :param error_codes: (optional) the http status codes of the injected errors
+        :param replay: (optional) a trace file recorded with TraceRecorder(record_bodies=True): the recorded
+                       responses are served for the recorded calls, the other calls are simulated
+        :param replay_latency: (optional) if True replayed responses are delayed by their recorded latency
+        :param training_seconds: (optional) how long a training lasts
+        :param cold_start: (optional) extra seconds of the first chat/speak of an AI that is not running
+        :param tts_bytes: (optional) size of the audio returned by speak
+        :param seed: (optional) seed of the latency and error randomness
+        """
+        self._host = host
+        self._port = port
+        self._latency = latency if isinstance(latency, dict) else {'*': latency}
+        self._jitter = jitter
+        self._error_rate = error_rate if isinstance(error_rate, dict) else {'*': error_rate}
+        self._error_codes = tuple(error_codes)
+        self._replay = Replay(replay, replay_latency) if replay else None
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.api = StubApi(training_seconds, cold_start, tts_bytes)
+        self._routes = [(method, re.compile(pattern), end_point, getattr(self.api, handler))
+                        for method, pattern, end_point, handler in ROUTES]
+        self._server = None
+        self._thread = None
+        self._calls_lock = threading.Lock()
+        self.calls = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def base_url(self):
+        """ The base_url to pass to EasyHutoma
+        """
+        host, port = self._server.server_address[:2]
+        return 'http://{0}:{1}{2}'.format(host, port, BASE_PATH)
+
+    def start(self):
+        """ Serve on a daemon thread and return the base url
+        """
+        self._server = _ThreadingHTTPServer((self._host, self._port), _Handler)
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='hutoma-stub-server')
+        self._thread.daemon = True
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        """ Stop serving and close the listening socket
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def _by_end_point(self, values, end_point):
+        return values.get(end_point, values.get('*', 0))
+
+    def _delay(self, end_point):
+        latency = self._by_end_point(self._latency, end_point)
+        if latency and self._jitter:
+            with self._random_lock:
+                latency *= 1 + self._random.uniform(-self._jitter, self._jitter)
+        return latency
+
+    def _injected_error(self, end_point):
+        rate = self._by_end_point(self._error_rate, end_point)
+        if not rate:
+            return None
+        with self._random_lock:
+            if self._random.random() >= rate:
+                return None
+            code = self._random.choice(self._error_codes)
+        return StubError(code, 'Injected', 'error injected by the stub server', http_status=code)
+
+    def _route(self, method, path):
+        for route_method, pattern, end_point, handler in self._routes:
+            if route_method == method:
+                match = pattern.match(path)
+                if match:
+                    return end_point, handler, match.groupdict()
+        raise StubError(404, 'NotFound', 'no end point {0} {1}'.format(method, path), http_status=404)
+
+    def handle(self, request):
+        """ Answer a request of the http handler
+        """
+        body = request._read_body()
+        http_status, content = self.dispatch(request.command, request.path, request.headers, body)
+        request._send(http_status, content)
+
+    def dispatch(self, method, raw_path, headers, body):
+        """
+        Answer a request, without any http: the FakeTransport calls it directly
+        :param method: the http method
+        :param raw_path: the path with the query, as sent on the wire
+        :param headers: the request headers
+        :param body: the request body (bytes)
+        :return: (http status, response body)
+        """
+        with self._calls_lock:
+            self.calls += 1
+        if not headers.get('user_key'):
+            return 401, json.dumps(StubError(401, 'Unauthorized', 'missing user_key').envelope())
+        url = urlsplit(raw_path)
+        path = unquote(url.path[len(BASE_PATH):]) if url.path.startswith(BASE_PATH) else url.path
+        query = dict(parse_qsl(url.query))
+        try:
+            end_point, handler, params = self._route(method, path)
+            error = self._injected_error(end_point)
+            if error is not None:
+                raise error
+            delay = self._delay(end_point)
+            replayed = None
+            if self._replay is not None:
+                replayed = self._replay.get(method, unquote(raw_path[len(BASE_PATH):]))
+            if replayed is not None:
+                http_status, content, recorded_latency = replayed
+                time.sleep(delay + recorded_latency)
+                return http_status or 200, content
+            if delay:
+                time.sleep(delay)
+            response = handler(query, body, **params)
+            if 'code' not in response:
+                response['status'] = {'code': 200, 'info': 'OK'}
+            return 200, json.dumps(response)
+        except StubError as e:
+            return e.http_status, json.dumps(e.envelope())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local stand-in of the Hutoma API')
+    parser.add_argument('--host', default='127.0.0.1', help='the address to listen on (default=%(default)r)')
+    parser.add_argument('--port', type=int, default=8080, help='the port to listen on (default=%(default)r)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random fraction of latency variation')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of the calls failing')
+    parser.add_argument('--training-seconds', type=float, default=5.0, help='how long a training lasts')
+    parser.add_argument('--replay', default=None, help='a trace file recorded with response bodies')
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        replay=args.replay, training_seconds=args.training_seconds)
+    print('Serving the Hutoma API on {0}'.format(server.start()))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
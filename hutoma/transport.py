@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+import urllib3
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout, Timeout
+from requests.utils import requote_uri
+from urllib3.exceptions import ConnectTimeoutError, HTTPError, NewConnectionError, ReadTimeoutError, TimeoutError
+
+try:
+    from urlparse import urlsplit
+except ImportError:  # python 3
+    from urllib.parse import urlsplit
+
+
+class Response(object):
+    """ The http response returned by a transport
+    """
+
+    __slots__ = ('status_code', 'content')
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+
+def _preconnect(pool, connections):
+    """ Open up to connections connections of an urllib3 connection pool, return how many were opened
+    """
+    taken = [pool._get_conn() for _ in range(connections)]
+    opened = 0
+    try:
+        for connection in taken:
+            if connection.sock is None:
+                connection.connect()
+                opened += 1
+    finally:
+        for connection in taken:
+            pool._put_conn(connection)
+    return opened
+
+
+class Transport(object):
+    """ The interface between EasyHutoma and the wire. A transport is opened by EasyHutoma with the headers of every
+    request and the connection pool size, it must be thread safe. Timeouts are raised as requests Timeout and the
+    other connection errors as requests RequestException
+    """
+
+    def open(self, headers, pool_size):
+        """
+        Create the connection pool
+        :param headers: the headers sent with every request
+        :param pool_size: max number of keep-alive connections
+        """
+        raise NotImplementedError
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        """
+        Send a request
+        :param method: the http method
+        :param url: the full url
+        :param body: (optional) a MultipartUpload streamed as the request body
+        :param headers: (optional) headers added to the ones given to open
+        :param timeout: (optional) seconds or a (connect seconds, read seconds) tuple
+        :return: an object with status_code and content (bytes)
+        """
+        raise NotImplementedError
+
+    def preconnect(self, url, connections):
+        """ Open connections to the host of url ahead of the first requests, return how many were opened
+        """
+        return 0
+
+    def reset(self):
+        """ Replace the connection pool in a forked process: the inherited connections are dropped without being
+        closed, closing them would shut down the parent sockets
+        """
+
+    def close(self):
+        """ Close every pooled connection
+        """
+
+
+class RequestsTransport(Transport):
+    """ The default transport: a requests Session with a single connection pool
+    """
+
+    def open(self, headers, pool_size):
+        self._headers = headers
+        self._pool_size = pool_size
+        self._session = Session()
+        self._session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        return self._session.request(method=method, url=url, data=body, headers=headers, timeout=timeout)
+
+    def preconnect(self, url, connections):
+        return _preconnect(self._session.get_adapter(url).get_connection(url), connections)
+
+    def reset(self):
+        self.open(self._headers, self._pool_size)
+
+    def close(self):
+        self._session.close()
+
+
+class Urllib3Transport(Transport):
+    """ A leaner transport sending the requests directly on an urllib3 PoolManager: no session, cookies, hooks or
+    redirects handling
+    """
+
+    def open(self, headers, pool_size):
+        self._headers = dict(headers)
+        self._pool_size = pool_size
+        self._manager = urllib3.PoolManager(num_pools=4, maxsize=pool_size, headers=self._headers)
+
+    def _timeout(self, timeout):
+        if timeout is None:
+            return urllib3.Timeout(connect=None, read=None)
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return urllib3.Timeout(connect=connect, read=read)
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        all_headers = self._headers
+        chunked = False
+        if headers or body is not None:
+            all_headers = dict(self._headers, **(headers or {}))
+            if body is not None:
+                if hasattr(body, 'len'):
+                    all_headers['Content-Length'] = str(body.len)
+                else:
+                    chunked = True
+        try:
+            # quoted like requests does
+            response = self._manager.urlopen(method, requote_uri(url), body=body, headers=all_headers,
+                                             timeout=self._timeout(timeout), retries=False, redirect=False,
+                                             chunked=chunked)
+        # mapped like requests does: NewConnectionError (a refused connection) subclasses ConnectTimeoutError
+        except NewConnectionError as e:
+            raise ConnectionError(e)
+        except ConnectTimeoutError as e:
+            raise ConnectTimeout(e)
+        except ReadTimeoutError as e:
+            raise ReadTimeout(e)
+        except TimeoutError as e:
+            raise Timeout(e)
+        except HTTPError as e:
+            raise ConnectionError(e)
+        return Response(response.status, response.data)
+
+    def preconnect(self, url, connections):
+        return _preconnect(self._manager.connection_from_url(url), connections)
+
+    def reset(self):
+        self.open(self._headers, self._pool_size)
+
+    def close(self):
+        self._manager.clear()
+
+
+class FakeTransport(Transport):
+    """ An in-process transport without any network I/O: the requests are answered by the stand-in api of
+    hutoma.stub_server, to test code using EasyHutoma or to measure the client own overhead
+    """
+
+    def __init__(self, stub=None):
+        """
+        Create a FakeTransport object
+        :param stub: (optional) a StubServer (it does not need to be started) configuring the fake api, for example
+                     StubServer(latency=0.01, error_rate=0.05)
+        """
+        if stub is None:
+            from .stub_server import StubServer  # not imported by the production transports
+            stub = StubServer()
+        self.stub = stub
+
+    def open(self, headers, pool_size):
+        self._headers = headers
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        url = urlsplit(url)
+        path = url.path + ('?' + url.query if url.query else '')
+        content = b''.join(body) if body is not None else b''
+        status_code, response = self.stub.dispatch(method, path, dict(self._headers, **(headers or {})), content)
+        return Response(status_code, response.encode('utf-8') if not isinstance(response, bytes) else response)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import uuid
+
+try:
+    basestring
+except NameError:  # python 3
+    basestring = str
+
+
+class MultipartUpload(object):
+    """ A multipart/form-data body with a single file field, streamed in chunks instead of being loaded in memory.
+    The source can be a path, an open file object, bytes (a bytearray on python 2, where str is a path) or an
+    iterable of bytes chunks. Only files opened by this object are closed by close()
+    """
+
+    def __init__(self, source, filename=None, field='file', content_type='application/octet-stream',
+                 chunk_size=64 * 1024):
+        """
+        Create a MultipartUpload object
+        :param source: a path, a file object, bytes or an iterable of bytes
+        :param filename: (optional) the filename sent, default is the basename of the path (or file name)
+        :param field: (optional) the form field name
+        :param content_type: (optional) the content type of the file part
+        :param chunk_size: (optional) size of the chunks read from files
+        """
+        self._chunk_size = chunk_size
+        self._file = None
+        self._opened = False
+        self._chunks = None
+        length = None
+        if isinstance(source, basestring):
+            self._file = open(source, 'rb')
+            self._opened = True
+            filename = filename or os.path.basename(source)
+        elif hasattr(source, 'read'):
+            self._file = source
+            filename = filename or os.path.basename(getattr(source, 'name', '') or '') or None
+        elif isinstance(source, (bytes, bytearray)):
+            self._file = io.BytesIO(source)
+            self._opened = True
+        else:
+            self._chunks = iter(source)
+        if self._file is not None:
+            length = self._remaining_size(self._file)
+
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={0}'.format(self.boundary)
+        filename = filename or 'file'
+        if not isinstance(filename, bytes):
+            filename = filename.encode('utf-8')
+        self._header = b''.join([
+            '--{0}\r\n'.format(self.boundary).encode('ascii'),
+            'Content-Disposition: form-data; name="{0}"; filename="'.format(field).encode('ascii'),
+            filename.replace(b'"', b'%22'),
+            '"\r\nContent-Type: {0}\r\n\r\n'.format(content_type).encode('ascii'),
+        ])
+        self._footer = '\r\n--{0}--\r\n'.format(self.boundary).encode('ascii')
+        if length is not None:
+            # requests sends a Content-Length when the body has a len attribute, otherwise a chunked body
+            self.len = len(self._header) + length + len(self._footer)
+        self.sent = 0  # bytes of the body produced so far
+        self._iterator = None
+        self._buffer = b''
+        self._offset = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _remaining_size(self, file_object):
+        """ Return the bytes left in a file object or None if it can not be known
+        """
+        try:
+            position = file_object.tell()
+            file_object.seek(0, os.SEEK_END)
+            size = file_object.tell()
+            file_object.seek(position)
+            return size - position
+        except (AttributeError, IOError, OSError, ValueError):
+            return None
+
+    def _body_chunks(self):
+        if self._file is not None:
+            while True:
+                chunk = self._file.read(self._chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        else:
+            for chunk in self._chunks:
+                if not isinstance(chunk, bytes):
+                    chunk = bytes(chunk) if isinstance(chunk, bytearray) else chunk.encode('utf-8')
+                if chunk:
+                    yield chunk
+
+    def __iter__(self):
+        for chunk in self._chunks_with_header():
+            self.sent += len(chunk)
+            yield chunk
+
+    def _chunks_with_header(self):
+        yield self._header
+        for chunk in self._body_chunks():
+            yield chunk
+        yield self._footer
+
+    def read(self, size=-1):
+        """ File-like read used by http clients to stream the body
+        """
+        if self._iterator is None:
+            self._iterator = iter(self)
+        if size is None or size < 0:
+            data = self._buffer[self._offset:] + b''.join(self._iterator)
+            self._buffer, self._offset = b'', 0
+            return data
+        while len(self._buffer) - self._offset < size:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                break
+            self._buffer, self._offset = self._buffer[self._offset:] + chunk, 0
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def close(self):
+        """ Close the file, if it was opened by this object
+        """
+        if self._opened and self._file is not None:
+            self._file.close()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+
+from requests.exceptions import RequestException
+
+from .fleet import _run_pool
+from .hooks import Hook
+from .hutoma import HutomaException
+
+RUNTIME_RUNNING = 1  # runtimeStatus of an AI loaded in memory
+TRAINING_COMPLETED = 2  # trainingStatus of a completed training
+
+CHANGE_STATUS_END_POINT = 'ai/{aiid:s}'  # change_status, a GET changing the AI (current_status is 'ai/{aiid:s}/')
+
+
+class WarmPool(Hook):
+    """ Keep a set of AIs loaded in memory: start them ahead of the traffic, start them again when they are unloaded
+    and reload them when a training completes, so that the first user query does not pay the AI load time. The pool
+    is a hook of the EasyHutoma object (until stop is called): the statuses are cached reads, unless the AI has been
+    changed through the EasyHutoma object since the last check, and a training started with it is reloaded once
+    completed, even if it started and completed between two checks
+    """
+
+    def __init__(self, hutoma, aiids, interval=60, connections=None, max_workers=4):
+        """
+        Create a WarmPool object
+        :param hutoma: an EasyHutoma object
+        :param aiids: the AIs to keep warm
+        :param interval: (optional) seconds between two checks of the background thread
+        :param connections: (optional) number of pooled connections opened by warm(), default one per AI
+        :param max_workers: (optional) number of AIs checked at the same time
+        """
+        self._hutoma = hutoma
+        self._aiids = list(aiids)
+        self._interval = interval
+        self._connections = connections if connections is not None else len(self._aiids)
+        self._max_workers = max_workers
+        self._training_statuses = {}  # aiid -> last trainingStatus seen
+        self._trainings_started = {}  # aiid -> time a training was started through the EasyHutoma object
+        self._changed = set()  # AIs changed through the EasyHutoma object since their last check
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        hutoma.add_hook(self)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def after_response(self, call):
+        """ Remember the AIs changed and the trainings started through the EasyHutoma object
+        """
+        aiid = (call.params or {}).get('aiid')
+        if aiid is None or (call.method == 'GET' and call.end_point != CHANGE_STATUS_END_POINT):
+            return
+        with self._lock:
+            self._changed.add(aiid)
+            if call.method == 'PUT' and call.path.endswith('/training?action=start'):
+                self._trainings_started[aiid] = time.time()
+
+    def _check_one(self, aiid):
+        """ Return the action issued to keep an AI warm ('start', 'reload' or None) and the error, if any
+        """
+        with self._lock:
+            changed = aiid in self._changed
+            self._changed.discard(aiid)
+        try:
+            checked = time.time()
+            # a cached read is recent enough, unless the AI changed since it was cached
+            status, _ = self._hutoma.current_status(aiid, fresh=changed)
+            training_status = status.get('trainingStatus')
+            with self._lock:
+                previous = self._training_statuses.get(aiid)
+                self._training_statuses[aiid] = training_status
+                # a status read after the training started tells whether that training completed
+                started = self._trainings_started.get(aiid)
+                retrained = started is not None and started < checked and training_status == TRAINING_COMPLETED
+                if retrained:
+                    del self._trainings_started[aiid]  # the start or reload below loads the new network
+            action = None
+            if status.get('runtimeStatus') != RUNTIME_RUNNING:
+                action = 'start'
+            elif training_status == TRAINING_COMPLETED and (retrained or (previous is not None and
+                                                                          previous != TRAINING_COMPLETED)):
+                action = 'reload'  # load the network produced by the training that just completed
+            if action is not None:
+                logging.info('WarmPool: {0} {1}'.format(action, aiid))
+                self._hutoma.change_status(aiid, action)
+            return aiid, action, None
+        except (HutomaException, RequestException) as e:
+            logging.warn('WarmPool: {0} check failed: {1}'.format(aiid, e))
+            if changed:
+                with self._lock:
+                    self._changed.add(aiid)  # read it fresh at the next check
+            return aiid, None, e
+
+    def check(self):
+        """
+        Check every AI once and start/reload the ones that need it
+        :return: a list of (aiid, action issued or None, exception or None)
+        """
+        return _run_pool(self._check_one, self._aiids, self._max_workers)
+
+    def warm(self):
+        """
+        Open the pooled connections and check every AI, call it before the traffic starts
+        :return: see check
+        """
+        try:
+            self._hutoma.preconnect(self._connections)
+        except (HutomaException, RequestException, IOError) as e:
+            logging.warn('WarmPool: preconnect failed: {0}'.format(e))
+        return self.check()
+
+    def start(self):
+        """ Warm the AIs and keep checking them every interval seconds on a daemon thread
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.warm()
+        self._thread = threading.Thread(target=self._run, name='hutoma-warm-pool')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.check()
+
+    def stop(self):
+        """ Stop the background thread and remove the hook
+        """
+        self._hutoma.remove_hook(self)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
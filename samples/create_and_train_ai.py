@@ -4,6 +4,7 @@ import logging
 import time
 
 from hutoma import EasyHutoma
+from hutoma.fleet import delete_all
 
 logger = logging.getLogger()
 logger.setLevel(logging.ERROR)
@@ -21,7 +22,8 @@ def add_args():
                         help='the target training file (default=%(default)r)')
     parser.add_argument('--sleep',
                         default=60,
-                        help='seconds to wait in check status loop (default=%(default)r)')
+                        type=int,
+                        help='max seconds to wait in check status loop (default=%(default)r)')
     args = parser.parse_args()
     return args
 
@@ -38,9 +40,8 @@ def main():
     # get the list of available AIs
     ais = hutoma.list_ai()
     print 'AIs list: {0}'.format(ais)
-    for ai in ais:
-        print 'deleting {0}...'.format(ai)
-        hutoma.delete_ai(ai)
+    print 'deleting {0}...'.format(ais)
+    delete_all(hutoma, ais)
 
     ais = hutoma.create_ai()
     print 'New AI created: {0}'.format(ais)
@@ -51,7 +52,7 @@ def main():
     print 'Upload data files...'
     hutoma.training_upload_files(aiid, args.source_file, args.target_file)
 
-    print 'Training monitor (check every {0} secs):'.format(args.sleep)
+    print 'Training monitor (check at most every {0} secs):'.format(args.sleep)
 
     print 'Start training...'
     start_time = time.time()
@@ -60,13 +61,13 @@ def main():
     print '\tScore: {score:s}'.format(**response)
     print '\tAIid: {0}'.format(aiid)
 
-    while response.get('trainingStatus ', -1) < 3:
-        time.sleep(args.sleep)
-        response, _ = hutoma.current_status(aiid)
+    def on_progress(response):
         print
         print '\n\tStatus: {trainingStatusDetails:s}\n\tRuntime status: {runtimeStatusDetails:s}'.format(**response)
         print '\tScore: {score:s}'.format(**response)
         print '\tAIid: {0}'.format(aiid)
+
+    hutoma.wait_for_training(aiid, on_progress=on_progress, max_interval=args.sleep)
     print '{0} secs to train'.format(int(time.time() - start_time))
 
     print 'API calls: {0}'.format(hutoma.api_calls_count())
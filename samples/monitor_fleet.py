@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import argparse
+import logging
+
+from hutoma import EasyHutoma
+from hutoma.fleet import FleetMonitor
+
+logger = logging.getLogger()
+logger.setLevel(logging.ERROR)
+
+
+def add_args():
+    parser = argparse.ArgumentParser(description='Monitor the status of every AI')
+    parser.add_argument('--user_key',
+                        help='provide your Hutoma API user key')
+    parser.add_argument('--max_in_flight',
+                        default=8,
+                        type=int,
+                        help='max number of status requests at the same time (default=%(default)r)')
+    parser.add_argument('--sleep',
+                        default=60,
+                        type=int,
+                        help='seconds to wait between two sweeps (default=%(default)r)')
+    args = parser.parse_args()
+    return args
+
+
+def print_changes(changes):
+    for change in changes:
+        if change.error is not None:
+            print '{0}: status not available ({1})'.format(change.aiid, change.error)
+        elif change.current is None:
+            print '{0}: removed'.format(change.aiid)
+        else:
+            print '{0}: {1}'.format(change.aiid, change.current[0].get('trainingStatusDetails'))
+
+
+def main():
+    args = add_args()
+
+    hutoma = EasyHutoma(args.user_key, pool_size=args.max_in_flight * 2)
+
+    print 'Fleet monitor (sweep every {0} secs), hit Ctrl+C to quit...'.format(args.sleep)
+    with FleetMonitor(hutoma, max_in_flight=args.max_in_flight,
+                      fields=['trainingStatus', 'runtimeStatus', 'compileError']) as monitor:
+        monitor.watch(print_changes, interval=args.sleep)
+
+if __name__ == "__main__":
+    main()
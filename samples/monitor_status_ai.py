@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 import argparse
 import logging
-import time
 
 from hutoma import EasyHutoma
 
@@ -18,7 +17,8 @@ def add_args():
                         help='the AI id to be used, if None the first one will be used (default=%(default)r)')
     parser.add_argument('--sleep',
                         default=60,
-                        help='seconds to wait in check status loop (default=%(default)r)')
+                        type=int,
+                        help='max seconds to wait in check status loop (default=%(default)r)')
     args = parser.parse_args()
     return args
 
@@ -39,16 +39,15 @@ def main():
         aiid = ais[0]
     print 'AI id: {0}'.format(aiid)
 
-    print 'Training monitor (check every {0} secs):'.format(args.sleep)
-    while True:
-        response, _ = hutoma.current_status(aiid)
+    print 'Training monitor (check at most every {0} secs):'.format(args.sleep)
+
+    def on_progress(response):
         print '\tStatus: {trainingStatusDetails:s}\n\tRuntime status: {runtimeStatusDetails:s}'.format(**response)
         print '\tScore: {score:s}'.format(**response)
         print '\tAIid: {0}'.format(aiid)
-        if response.get('trainingStatus ', -1) < 3:
-            print 'Training ended...'
-            break
-        time.sleep(args.sleep)
+
+    hutoma.wait_for_training(aiid, on_progress=on_progress, max_interval=args.sleep)
+    print 'Training ended...'
 
     print 'API calls: {0}'.format(hutoma.api_calls_count())
 
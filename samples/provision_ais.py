@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import argparse
+import logging
+import time
+
+from hutoma import EasyHutoma
+from hutoma.fleet import delete_all, provision
+
+logger = logging.getLogger()
+logger.setLevel(logging.ERROR)
+
+
+def add_args():
+    parser = argparse.ArgumentParser(description='Create and train many AIs concurrently')
+    parser.add_argument('--user_key',
+                        help='provide your Hutoma API user key')
+    parser.add_argument('--corpus',
+                        action='append',
+                        default=[],
+                        help='name:source_file:target_file[:aiid], can be repeated. Without aiid a new AI is '
+                             'created, otherwise the AI is retrained')
+    parser.add_argument('--max_workers',
+                        default=4,
+                        type=int,
+                        help='number of AIs provisioned at the same time (default=%(default)r)')
+    parser.add_argument('--timeout',
+                        default=None,
+                        type=int,
+                        help='max seconds to wait for each training (default=%(default)r)')
+    parser.add_argument('--delete_existing',
+                        action='store_true',
+                        help='delete every existing AI first')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = add_args()
+
+    hutoma = EasyHutoma(args.user_key, pool_size=args.max_workers * 2)
+
+    if args.delete_existing:
+        input = raw_input('Attention! this will delete all existing AIs (type "quit" to exit): ')
+        if 'quit' in input:
+            return
+        ais = hutoma.list_ai()
+        print 'Deleting {0} AIs...'.format(len(ais))
+        for aiid, error in delete_all(hutoma, ais, max_workers=args.max_workers).items():
+            if error is not None:
+                print '\t{0}: {1}'.format(aiid, error)
+
+    def on_progress(name, aiid, step):
+        print '{0} ({1}): {2}'.format(name, aiid, step)
+
+    start_time = time.time()
+    corpora = [corpus.split(':') for corpus in args.corpus]
+    results = provision(hutoma, corpora, max_workers=args.max_workers, timeout=args.timeout,
+                        on_progress=on_progress)
+    print '{0} secs to provision {1} AIs'.format(int(time.time() - start_time), len(results))
+    for result in results:
+        if result.error is not None:
+            print '\t{0} ({1}): failed {2}'.format(result.name, result.aiid, result.error)
+        else:
+            print '\t{0} ({1}): {2}'.format(result.name, result.aiid, result.status[0].get('trainingStatusDetails'))
+
+    print 'API calls: {0}'.format(hutoma.api_calls_count())
+
+if __name__ == "__main__":
+    main()
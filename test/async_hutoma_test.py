@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from hutoma.hutoma import HutomaException
+from hutoma.stub_server import StubServer
+
+try:
+    import asyncio
+
+    from hutoma.async_hutoma import AsyncEasyHutoma
+except (ImportError, SyntaxError):  # python 2 or no aiohttp
+    AsyncEasyHutoma = None
+
+
+@unittest.skipIf(AsyncEasyHutoma is None, 'requires python 3.5+ and aiohttp')
+class AsyncEasyHutomaTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = StubServer()
+        self.server.start()
+        self.loop = asyncio.new_event_loop()
+        self.hutoma = AsyncEasyHutoma('key', base_url=self.server.base_url)
+        self.aiid = self._run(self.hutoma.create_ai())[0]
+
+    def tearDown(self):
+        self._run(self.hutoma.close())
+        self.loop.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_chat(self):
+        self.assertEqual(self._run(self.hutoma.chat(self.aiid, 1, 'hello there')), 'echo: hello there')
+        self.assertEqual(self.hutoma.api_calls_count(), 2)
+
+    def test_upload(self):
+        path = os.path.join(self.directory, 'source.txt')
+        with open(path, 'wb') as file_object:
+            file_object.write(b'hello\n')
+        self.assertTrue(self._run(self.hutoma.training_upload_source(self.aiid, path)))
+        self.assertEqual(self.server.api._ais[self.aiid].source, ['hello'])
+
+    def test_upload_file_object(self):
+        path = os.path.join(self.directory, 'target.txt')
+        with open(path, 'wb') as file_object:
+            file_object.write(b'hi there\n')
+        with open(path, 'rb') as file_object:
+            self.assertTrue(self._run(self.hutoma.training_upload_target(self.aiid, file_object)))
+            self.assertFalse(file_object.closed)  # not opened by the client
+        self.assertEqual(self.server.api._ais[self.aiid].target, ['hi there'])
+
+        self.assertTrue(self._run(self.hutoma.training_upload_source(self.aiid, io.BytesIO(b'hello\n'))))
+        self.assertEqual(self.server.api._ais[self.aiid].source, ['hello'])
+
+    def test_upload_bytes_and_iterable(self):
+        self._run(self.hutoma.upload_file_in_folder(self.aiid, 'aiml', bytearray(b'<aiml/>'), filename='a.aiml'))
+        self._run(self.hutoma.upload_file_in_folder(self.aiid, 'aiml', iter([b'<aiml>', b'</aiml>']),
+                                                    filename='b.aiml'))
+        self.assertEqual(self._run(self.hutoma.files_in_folder(self.aiid, 'aiml')), ['a.aiml', 'b.aiml'])
+        spoken = self._run(self.hutoma.speak(self.aiid, 1, bytearray(100)))
+        self.assertEqual(spoken['input'], 'utterance of 100 bytes')
+
+    def test_error(self):
+        with self.assertRaises(HutomaException) as raised:
+            self._run(self.hutoma.current_status('unknown'))
+        self.assertEqual(raised.exception.error_code, 404)
+        self._run(self.hutoma.close())
+        with self.assertRaises(HutomaException):
+            self._run(self.hutoma.list_ai())
+
+
+if __name__ == '__main__':
+    unittest.main()
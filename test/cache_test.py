@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from hutoma.cache import LRUCache
+from hutoma.hutoma import EasyHutoma
+from hutoma.stub_server import StubServer
+from hutoma.transport import FakeTransport
+
+
+class FakeTimer(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'b' is now the least recently used
+        cache.set('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {'hits': 3, 'misses': 1, 'size': 2, 'maxsize': 2})
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        cache = LRUCache(maxsize=10, ttl=5, timer=timer)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=20)
+        timer.now = 10
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('b'), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_invalidate(self):
+        cache = LRUCache()
+        cache.set(('ai1', 'hello'), 1)
+        cache.set(('ai2', 'hello'), 2)
+        self.assertEqual(cache.invalidate(lambda key: key[0] == 'ai1'), 1)
+        self.assertEqual(cache.get(('ai1', 'hello')), None)
+        self.assertEqual(cache.get(('ai2', 'hello')), 2)
+        self.assertEqual(cache.invalidate(), 1)
+        self.assertEqual(len(cache), 0)
+
+
+class MetadataCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.transport = FakeTransport(StubServer(latency={'ai/{aiid:s}/': 0.3}))
+        self.hutoma = EasyHutoma('key', base_url='http://localhost/api/v1/', transport=self.transport,
+                                 manifest_path=os.path.join(self.directory, 'manifest.json'))
+        self.aiid = self.hutoma.create_ai()[0]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _calls(self, function, *args, **kwargs):
+        """ Return how many api calls function made
+        """
+        calls = self.transport.stub.calls
+        function(*args, **kwargs)
+        return self.transport.stub.calls - calls
+
+    def test_list_ai(self):
+        self.assertEqual(self._calls(self.hutoma.list_ai), 1)
+        self.assertEqual(self._calls(self.hutoma.list_ai), 0)
+        self.assertEqual(self._calls(self.hutoma.list_ai, fresh=True), 1)
+        self.hutoma.create_ai()
+        self.assertEqual(self._calls(self.hutoma.list_ai), 1)
+        self.hutoma.delete_ai(self.aiid)
+        self.assertEqual(self.hutoma.list_ai(), self.transport.stub.api.list_ai({}, b'')['AIs'])
+
+    def test_current_status(self):
+        self.assertEqual(self._calls(self.hutoma.current_status, self.aiid), 1)
+        status = self.hutoma.current_status(self.aiid)
+        status[0]['runtimeStatus'] = 'changed by the caller'
+        self.assertEqual(self._calls(self.hutoma.current_status, self.aiid), 0)
+        self.assertEqual(self.hutoma.current_status(self.aiid)[0]['runtimeStatus'], 0)
+        self.hutoma.change_status(self.aiid, 'start')
+        self.assertEqual(self.hutoma.current_status(self.aiid)[0]['runtimeStatus'], 1)
+
+    def _read_during_change(self):
+        """ Start a current_status read, invalidate it with change_status while it is in flight
+        """
+        thread = threading.Thread(target=self.hutoma.current_status, args=(self.aiid,))
+        thread.start()
+        time.sleep(0.1)
+        self.hutoma.change_status(self.aiid, 'start')
+        return thread
+
+    def test_read_started_before_a_change_is_not_cached(self):
+        self._read_during_change().join()
+        self.assertEqual(self._calls(self.hutoma.current_status, self.aiid), 1)
+
+    def test_read_started_after_a_change_does_not_join_an_older_one(self):
+        thread = self._read_during_change()
+        self.assertEqual(self._calls(self.hutoma.current_status, self.aiid, fresh=True), 1)
+        thread.join()
+
+
+class ChatCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.transport = FakeTransport(StubServer(latency={'ai/{aiid:s}/chat': 0.3}))
+        self.hutoma = EasyHutoma('key', base_url='http://localhost/api/v1/', transport=self.transport,
+                                 chat_cache_size=10, manifest_path=os.path.join(self.directory, 'manifest.json'))
+        self.aiid = self.hutoma.create_ai()[0]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _calls(self, function, *args, **kwargs):
+        """ Return how many api calls function made
+        """
+        calls = self.transport.stub.calls
+        function(*args, **kwargs)
+        return self.transport.stub.calls - calls
+
+    def test_chat(self):
+        self.assertEqual(self._calls(self.hutoma.chat, self.aiid, 1, 'Hello there!'), 1)
+        self.assertEqual(self._calls(self.hutoma.chat, self.aiid, 2, 'hello  there'), 0)
+        self.hutoma.change_status(self.aiid, 'reload')
+        self.assertEqual(self._calls(self.hutoma.chat, self.aiid, 1, 'hello there'), 1)
+
+    def _chat_during_reload(self):
+        """ Start a chat, invalidate the chat cache with a reload while it is in flight
+        """
+        thread = threading.Thread(target=self.hutoma.chat, args=(self.aiid, 1, 'hello'))
+        thread.start()
+        time.sleep(0.1)
+        self.hutoma.change_status(self.aiid, 'reload')
+        return thread
+
+    def test_chat_started_before_a_reload_is_not_cached(self):
+        self._chat_during_reload().join()
+        self.assertEqual(self._calls(self.hutoma.chat, self.aiid, 1, 'hello'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from hutoma.hooks import Hook
+from hutoma.hutoma import EasyHutoma, HutomaException
+from hutoma.transport import FakeTransport
+
+
+class _OptionsRecorder(Hook):
+    """ Record the call options seen by the threads running the calls
+    """
+
+    def __init__(self, hutoma):
+        self.hutoma = hutoma
+        self.deadlines = []
+
+    def before_request(self, call):
+        self.deadlines.append(self.hutoma._call_option('deadline'))
+
+
+class ChatManyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.hutoma = EasyHutoma('key', base_url='http://localhost/api/v1/', transport=FakeTransport(), pool_size=4,
+                                 manifest_path=os.path.join(self.directory, 'manifest.json'))
+        self.aiid = self.hutoma.create_ai()[0]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ordered(self):
+        results = self.hutoma.chat_many(self.aiid, [(index, 'q{0}'.format(index)) for index in range(20)])
+        self.assertEqual([result.output for result in results], ['echo: q{0}'.format(index) for index in range(20)])
+        self.assertEqual([result.index for result in results], list(range(20)))
+        self.assertTrue(all(result.error is None for result in results))
+
+    def test_errors_are_per_item(self):
+        results = self.hutoma.chat_many('unknown', [(1, 'hello'), ('bad', 'hello'), (1, 'too', 'long')])
+        self.assertTrue(isinstance(results[0].error, HutomaException))
+        self.assertTrue(isinstance(results[1].error, ValueError))  # uid is not an integer
+        self.assertEqual(results[1].uid, 'bad')
+        self.assertTrue(isinstance(results[2].error, ValueError))  # not a (uid, q) pair
+        self.assertEqual(results[2].output, None)
+
+    def test_unordered(self):
+        threads = threading.active_count()
+        results = self.hutoma.chat_many(self.aiid, [(index, 'q') for index in range(10)], ordered=False)
+        self.assertEqual(threading.active_count(), threads)  # no pool until the results are consumed
+        self.assertEqual(sorted(result.index for result in results), list(range(10)))
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_call_options_are_inherited(self):
+        recorder = _OptionsRecorder(self.hutoma)
+        self.hutoma.add_hook(recorder)
+        with self.hutoma.call_options(deadline=30):
+            self.hutoma.chat_many(self.aiid, [(index, 'q') for index in range(8)])
+        self.assertEqual(recorder.deadlines, [30] * 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from hutoma.corpus import CorpusBuilder, HashSet, csv_pairs, jsonl_pairs
+
+
+class CorpusTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'source.txt')
+        self.target = os.path.join(self.directory, 'target.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with io.open(path, 'w', encoding='utf-8') as file_object:
+            file_object.write(text)
+        return path
+
+    def _read(self, path):
+        with io.open(path, encoding='utf-8') as file_object:
+            return file_object.read()
+
+    def test_csv(self):
+        path = self._write('pairs.csv', u'q,a\nhello,hi\n"how  are\nyou",I am fine\nhello,hi\nbroken\n,empty\n')
+        report = CorpusBuilder().build(csv_pairs(path, question='q', answer='a'), self.source, self.target)
+        self.assertEqual(self._read(self.source), u'hello\nhow are you\n')
+        self.assertEqual(self._read(self.target), u'hi\nI am fine\n')
+        self.assertEqual((report.read, report.written, report.duplicates, report.rejected_count), (5, 2, 1, 2))
+        self.assertEqual(report.rejected, [(6, 'malformed'), (7, 'empty')])
+
+    def test_jsonl(self):
+        path = self._write('pairs.jsonl', u'{"question": "What Is The Sky", "answer": "blue"}\n'
+                                          u'not json\n'
+                                          u'\n'
+                                          u'{"question": "caffè", "answer": 42}\n')
+        report = CorpusBuilder(lowercase=True).build(jsonl_pairs(path), self.source, self.target)
+        self.assertEqual(self._read(self.source), u'what is the sky\ncaffè\n')
+        self.assertEqual(self._read(self.target), u'blue\n42\n')
+        self.assertEqual(report.rejected, [(2, 'malformed')])
+
+    def test_plain_pairs(self):
+        report = CorpusBuilder(max_length=5).build([(u'hello', u'hi'), (u'hello there', u'hi')],
+                                                   self.source, self.target)
+        self.assertEqual(report.written, 1)
+        self.assertEqual(report.rejected, [(2, 'too long')])
+
+
+class HashSetTest(unittest.TestCase):
+    def test_add_and_grow(self):
+        hashes = HashSet(capacity=4)
+        keys = [index * 7919 - 50000 or 1 for index in range(1000)]  # negative and positive keys
+        self.assertTrue(all(hashes.add(key) for key in keys))
+        self.assertFalse(any(hashes.add(key) for key in keys))
+        self.assertEqual(len(hashes), 1000)
+        self.assertTrue(hashes.add(2 ** 62))
+
+
+if __name__ == '__main__':
+    unittest.main()
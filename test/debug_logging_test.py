@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import logging
+import unittest
+
+from hutoma.hutoma import BaseHutoma
+
+
+class DebugLoggingTest(unittest.TestCase):
+    def setUp(self):
+        self.level = logging.getLogger().level
+        self.hutoma = BaseHutoma('key', 'http://localhost/', 1, debug_sampling={'*': 0, 'ai/{aiid:s}/chat': 1})
+
+    def tearDown(self):
+        logging.getLogger().setLevel(self.level)
+
+    def test_sampling(self):
+        logging.getLogger().setLevel(logging.INFO)
+        self.assertFalse(self.hutoma._debug_sampled('ai/{aiid:s}/chat'))
+        logging.getLogger().setLevel(logging.DEBUG)
+        self.assertTrue(self.hutoma._debug_sampled('ai/{aiid:s}/chat'))
+        self.assertFalse(self.hutoma._debug_sampled('ai/'))
+
+    def test_body(self):
+        self.assertEqual(self.hutoma._debug_body('ai/{aiid:s}/speak', b'x' * 10), '<10 bytes redacted>')
+        self.assertEqual(self.hutoma._debug_body('ai/', b'{}'), u'{}')
+        body = self.hutoma._debug_body('ai/', b'x' * (BaseHutoma.DEBUG_BODY_LIMIT + 5))
+        self.assertTrue(body.endswith(u'... <5 more characters>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from hutoma.fleet import FleetMonitor
+from hutoma.hutoma import EasyHutoma, HutomaException
+from hutoma.stub_server import StubServer
+from hutoma.transport import FakeTransport
+
+
+class FleetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.transport = FakeTransport(StubServer(training_seconds=0))
+        self.hutoma = EasyHutoma('key', base_url='http://localhost/api/v1/', transport=self.transport,
+                                 manifest_path=os.path.join(self.directory, 'manifest.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_monitor(self):
+        for _ in range(3):
+            aiids = self.hutoma.create_ai()
+        with FleetMonitor(self.hutoma, max_in_flight=2, fields=['runtimeStatus']) as monitor:
+            changes = monitor.sweep()
+            self.assertEqual(sorted(change.aiid for change in changes), sorted(aiids))
+            self.assertTrue(all(change.previous is None for change in changes))
+            self.assertEqual(monitor.sweep(), [])
+
+            self.hutoma.change_status(aiids[0], 'start')
+            self.hutoma.delete_ai(aiids[1])
+            changes = dict((change.aiid, change) for change in monitor.sweep())
+            self.assertEqual(sorted(changes), sorted(aiids[:2]))
+            self.assertEqual(changes[aiids[0]].current[0]['runtimeStatus'], 1)
+            self.assertEqual(changes[aiids[1]].current, None)
+            self.assertEqual(sorted(monitor.snapshot()), sorted([aiids[0], aiids[2]]))
+
+    def test_list_error_keeps_the_snapshot(self):
+        self.hutoma.create_ai()
+        with FleetMonitor(self.hutoma) as monitor:
+            monitor.sweep()
+            snapshot = monitor.snapshot()
+            self.transport.stub._error_rate = {'ai/': 1}
+            self.assertEqual(monitor.sweep(), [])
+            self.assertEqual(monitor.snapshot(), snapshot)
+
+    def test_status_error_is_reported_once(self):
+        aiid = self.hutoma.create_ai()[0]
+        with FleetMonitor(self.hutoma) as monitor:
+            monitor.sweep()
+            self.transport.stub._error_rate = {'ai/{aiid:s}/': 1}
+            changes = monitor.sweep()
+            self.assertEqual([(change.aiid, change.current) for change in changes], [(aiid, None)])
+            self.assertTrue(isinstance(changes[0].error, HutomaException))
+            for _ in range(3):
+                self.assertEqual(monitor.sweep(), [])
+            self.assertEqual(list(monitor.errors()), [aiid])
+
+            self.transport.stub._error_rate = {}
+            changes = monitor.sweep()  # cleared, even if the status is the same as before the errors
+            self.assertEqual([(change.aiid, change.error) for change in changes], [(aiid, None)])
+            self.assertEqual(changes[0].current, changes[0].previous)
+            self.assertEqual((monitor.sweep(), monitor.errors()), ([], {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
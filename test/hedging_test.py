@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from hutoma.hedging import LatencyTracker, hedged_call
+from hutoma.hutoma import EasyHutoma
+from hutoma.stub_server import StubServer
+from hutoma.transport import FakeTransport
+
+
+class LatencyTrackerTest(unittest.TestCase):
+    def test_percentile(self):
+        tracker = LatencyTracker(window=100, min_samples=10)
+        for latency in range(5):
+            tracker.record(latency)
+        self.assertEqual(tracker.percentile(95), None)
+        for latency in range(5, 100):
+            tracker.record(latency)
+        self.assertEqual(tracker.percentile(50), 50)
+        self.assertEqual(tracker.percentile(95), 95)
+        self.assertEqual(tracker.percentile(100), 99)
+
+
+class HedgedCallTest(unittest.TestCase):
+    def test_fast_call_is_not_hedged(self):
+        self.assertEqual(hedged_call(lambda: 1, delay=1), (1, False, False))
+
+    def test_slow_call_is_hedged(self):
+        calls = []
+        lock = threading.Lock()
+
+        def function():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            if first:
+                time.sleep(0.5)
+                return 'first'
+            return 'second'
+
+        self.assertEqual(hedged_call(function, delay=0.05), ('second', True, True))
+
+    def test_hedge_not_allowed(self):
+        def function():
+            time.sleep(0.1)
+            return 'first'
+
+        self.assertEqual(hedged_call(function, delay=0.01, allow_hedge=lambda: False), ('first', False, False))
+
+    def test_error_only_if_both_fail(self):
+        calls = []
+
+        def function():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                raise ValueError('first')
+            time.sleep(0.2)
+            return 'second'
+
+        self.assertEqual(hedged_call(function, delay=0.05), ('second', True, True))
+        self.assertRaises(ValueError, hedged_call, self._fail, 1)
+
+    def test_failed_result_waits_for_the_other_call(self):
+        calls = []
+
+        def function():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                return 503
+            time.sleep(0.2)
+            return 200
+
+        self.assertEqual(hedged_call(function, delay=0.05, failed=lambda status: status >= 400), (200, True, True))
+        self.assertEqual(hedged_call(lambda: time.sleep(0.1) or 503, delay=0.05, failed=lambda status: status >= 400),
+                         (503, True, False))
+
+    def _fail(self):
+        raise ValueError('boom')
+
+
+class EasyHutomaHedgingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # GET and DELETE ai/{aiid:s}/ share the end point template and its latency
+        self.transport = FakeTransport(StubServer(latency={'ai/{aiid:s}/': 0.2}))
+        self.hutoma = EasyHutoma('key', base_url='http://localhost/api/v1/', transport=self.transport, hedge=True,
+                                 metadata_ttl={'current_status': 0},
+                                 manifest_path=os.path.join(self.directory, 'manifest.json'))
+        self.aiid = self.hutoma.create_ai()[0]
+        for _ in range(20):
+            self.hutoma._latencies['ai/{aiid:s}/'].record(0.01)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_slow_get_is_hedged(self):
+        self.hutoma.current_status(self.aiid)
+        self.assertEqual(self.hutoma.hedge_stats()['hedged'], 1)
+        self.assertEqual(self.transport.stub.calls, 3)
+
+    def test_delete_is_not_hedged(self):
+        self.hutoma.delete_ai(self.aiid)
+        self.assertEqual(self.hutoma.hedge_stats()['hedged'], 0)
+        self.assertEqual(self.transport.stub.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
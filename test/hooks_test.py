@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from hutoma.hooks import CallInfo, Hook, TraceRecorder, analyze_trace, read_trace
+from hutoma.hutoma import EasyHutoma
+from hutoma.transport import Response, Transport
+
+
+def _call(end_point, params, started, elapsed, error=None):
+    call = CallInfo('GET', end_point, end_point.format(**params), params)
+    call.started, call.elapsed, call.error = started, elapsed, error
+    call.status_code, call.content, call.bytes_in = 200, b'{"status": {"code": 200}}', 25
+    return call
+
+
+class TraceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'trace.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_record_and_analyze(self):
+        with TraceRecorder(self.path, record_bodies=True) as recorder:
+            recorder.after_response(_call('ai/{aiid:s}/', {'aiid': 'a'}, 100, 0.1))
+            recorder.after_response(_call('ai/{aiid:s}/', {'aiid': 'a'}, 102, 0.3))
+            recorder.after_response(_call('ai/{aiid:s}/', {'aiid': 'a'}, 200, 0.2))
+            recorder.on_error(_call('ai/', {}, 100, 1.5, error=503), None)
+        records = list(read_trace(self.path))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0]['body'], u'{"status": {"code": 200}}')
+        analysis = analyze_trace(records)
+        status = analysis['end_points']['ai/{aiid:s}/']
+        self.assertEqual((status['calls'], status['errors'], status['repeats']), (3, 0, 1))
+        self.assertEqual((status['p50'], status['max']), (0.2, 0.3))
+        self.assertEqual(analysis['end_points']['ai/']['errors'], 1)
+        self.assertEqual(analysis['repeats'], [(1, 'GET', 'ai/{aiid:s}/', {'aiid': 'a'})])
+
+
+class _NotJsonTransport(Transport):
+    def open(self, headers, pool_size):
+        pass
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        return Response(200, b'<html>maintenance</html>')
+
+
+class _Recorder(Hook):
+    def __init__(self):
+        self.events = []
+
+    def before_request(self, call):
+        self.events.append('before_request')
+
+    def after_response(self, call):
+        self.events.append('after_response')
+
+    def on_error(self, call, exception):
+        self.events.append(('on_error', call.error))
+
+
+class HooksTest(unittest.TestCase):
+    def test_unexpected_body_closes_the_call(self):
+        recorder = _Recorder()
+        hutoma = EasyHutoma('key', transport=_NotJsonTransport(), hooks=[recorder])
+        with self.assertRaises(ValueError) as raised:
+            hutoma.list_ai()
+        error = type(raised.exception).__name__  # JSONDecodeError on python 3
+        self.assertEqual(recorder.events, ['before_request', ('on_error', error)])
+        self.assertEqual(hutoma.metrics()['ai/']['errors'], {error: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
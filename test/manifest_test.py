@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from hutoma.manifest import Manifest, file_digest
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'nested', 'manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_file_digest(self):
+        path = os.path.join(self.directory, 'source.txt')
+        with open(path, 'wb') as file_object:
+            file_object.write(b'hello\n' * 1000)
+        self.assertEqual(file_digest(path, chunk_size=7), hashlib.sha1(b'hello\n' * 1000).hexdigest())
+
+    def test_update_and_reload(self):
+        manifest = Manifest(self.path)
+        self.assertEqual(manifest.get('ai1', 'folder/aiml'), {})
+        manifest.update('ai1', 'folder/aiml', {'a.aiml': '1', 'b.aiml': '2'})
+        manifest.update('ai1', 'folder/aiml', {'b.aiml': None, 'c.aiml': '3'})
+        self.assertEqual(Manifest(self.path).get('ai1', 'folder/aiml'), {'a.aiml': '1', 'c.aiml': '3'})
+        manifest.update('ai1', 'folder/aiml', {'d.aiml': '4'}, replace=True)
+        self.assertEqual(Manifest(self.path).get('ai1', 'folder/aiml'), {'d.aiml': '4'})
+        manifest.forget('ai1')
+        self.assertEqual(Manifest(self.path).get('ai1', 'folder/aiml'), {})
+
+    def test_changes_are_merged(self):
+        first, second = Manifest(self.path), Manifest(self.path)
+        first.update('ai1', 'training', {'uploaded': '1'})
+        second.update('ai2', 'training', {'uploaded': '2'})
+        first.forget('ai1')
+        self.assertEqual(second.get('ai1', 'training'), {})
+        self.assertEqual(first.get('ai2', 'training'), {'uploaded': '2'})
+
+    def test_concurrent_updates(self):
+        def update(index):
+            manifest = Manifest(self.path)
+            for aiid in range(20):
+                manifest.update('ai{0}'.format(aiid), 'folder/{0}'.format(index), {'a.aiml': str(index)})
+
+        threads = [threading.Thread(target=update, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        manifest = Manifest(self.path)
+        for aiid in range(20):
+            for index in range(4):
+                self.assertEqual(manifest.get('ai{0}'.format(aiid), 'folder/{0}'.format(index)),
+                                 {'a.aiml': str(index)})
+
+    def test_expected(self):
+        manifest = Manifest(self.path)
+        manifest.update('ai1', 'training', {'uploaded': '1'})
+        self.assertTrue(manifest.update('ai1', 'training', {'trained': '1'}, expected={'uploaded': '1'}))
+        manifest.forget('ai1', 'training')
+        self.assertFalse(manifest.update('ai1', 'training', {'trained': '1'}, expected={'uploaded': '1'}))
+        self.assertEqual(manifest.get('ai1', 'training'), {})
+
+    def test_corrupt(self):
+        os.makedirs(os.path.dirname(self.path))
+        for content in ('{not json', '[]'):
+            with open(self.path, 'w') as file_object:
+                file_object.write(content)
+            manifest = Manifest(self.path)
+            self.assertEqual(manifest.get('ai1', 'training'), {})
+            manifest.forget('ai1')
+            self.assertTrue(manifest.update('ai1', 'training', {'uploaded': '1'}))  # overwrites the corrupt file
+            self.assertEqual(Manifest(self.path).get('ai1', 'training'), {'uploaded': '1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
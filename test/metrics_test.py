@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from hutoma.metrics import MetricsRegistry
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_snapshot(self):
+        registry = MetricsRegistry(buckets=(0.1, 1))
+        registry.observe('ai/{aiid:s}/chat', 0.05, bytes_in=100)
+        registry.observe('ai/{aiid:s}/chat', 0.5, bytes_in=50, error=404)
+        registry.observe('ai/{aiid:s}/chat', 2, error=404)
+        registry.observe('ai/', 0.01, bytes_out=10)
+        chat = registry.snapshot()['ai/{aiid:s}/chat']
+        self.assertEqual(chat['requests'], 3)
+        self.assertEqual(chat['errors'], {404: 2})
+        self.assertEqual(chat['latency']['buckets'], [(0.1, 1), (1, 2), ('+Inf', 3)])
+        self.assertAlmostEqual(chat['latency']['sum'], 2.55)
+        self.assertEqual((chat['bytes_out'], chat['bytes_in']), (0, 150))
+        registry.reset()
+        self.assertEqual(registry.snapshot(), {})
+
+    def test_prometheus(self):
+        registry = MetricsRegistry(buckets=(1,))
+        registry.observe('ai/{aiid:s}/chat', 0.5, error='Timeout')
+        text = registry.prometheus()
+        self.assertIn('# TYPE hutoma_request_duration_seconds histogram', text)
+        self.assertIn('hutoma_requests_total{end_point="ai/{aiid:s}/chat"} 1', text)
+        self.assertIn('hutoma_errors_total{end_point="ai/{aiid:s}/chat",error_code="Timeout"} 1', text)
+        self.assertIn('hutoma_request_duration_seconds_bucket{end_point="ai/{aiid:s}/chat",le="+Inf"} 1', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
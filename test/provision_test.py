@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from hutoma.fleet import delete_all, provision
+from hutoma.hutoma import EasyHutoma, HutomaException
+from hutoma.stub_server import StubServer
+from hutoma.transport import FakeTransport
+
+
+class ProvisionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.hutoma = EasyHutoma('key', base_url='http://localhost/api/v1/',
+                                 transport=FakeTransport(StubServer(training_seconds=0)),
+                                 manifest_path=os.path.join(self.directory, 'manifest.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as file_object:
+            file_object.write(content)
+        return path
+
+    def test_provision_and_delete_all(self):
+        source = self._write('source.txt', b'hello\n')
+        target = self._write('target.txt', b'hi there\n')
+        steps = []
+        results = provision(self.hutoma, [('first', source, target), ('second', source, target),
+                                          ('broken', source, os.path.join(self.directory, 'missing', 'target.txt'))],
+                            on_progress=lambda name, aiid, step: steps.append((name, step)))
+        self.assertEqual([result.name for result in results], ['first', 'second', 'broken'])
+        for result in results[:2]:
+            self.assertEqual(result.error, None)
+            self.assertEqual(result.status[0]['trainingStatus'], 2)
+        self.assertTrue(isinstance(results[2].error, IOError))
+        self.assertTrue(('first', 'done') in steps and ('broken', 'failed') in steps)
+        aiids = [result.aiid for result in results]
+        self.assertEqual(sorted(self.hutoma.list_ai(fresh=True)), sorted(aiids))
+
+        deleted = delete_all(self.hutoma, aiids + ['unknown'])
+        self.assertEqual([deleted[aiid] for aiid in aiids], [None] * 3)
+        self.assertTrue(isinstance(deleted['unknown'], HutomaException))
+        self.assertEqual(self.hutoma.list_ai(fresh=True), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from hutoma.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, timer=clock.time, sleep=clock.sleep)
+        self.assertTrue(bucket.acquire())
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire(block=False))
+        self.assertTrue(bucket.acquire())
+        self.assertAlmostEqual(clock.slept, 0.5)
+
+    def test_timeout(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, timer=clock.time, sleep=clock.sleep)
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire(timeout=0.5))
+        self.assertTrue(bucket.acquire(timeout=1))
+
+    def test_adaptive_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=8, min_rate=2, timer=clock.time, sleep=clock.sleep)
+        bucket.penalize()
+        bucket.penalize()  # ignored, less than a second from the previous one
+        self.assertEqual(bucket.rate, 4)
+        clock.now += 1
+        bucket.penalize()
+        clock.now += 1
+        bucket.penalize()
+        self.assertEqual(bucket.rate, 2)
+        for _ in range(100):
+            bucket.reward()
+        self.assertEqual(bucket.rate, 8)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_shared_and_end_point_buckets(self):
+        clock = FakeClock()
+        limiter = RateLimiter({'*': 3, 'ai/{aiid:s}/chat': 1}, timer=clock.time, sleep=clock.sleep)
+        self.assertTrue(limiter.acquire('ai/{aiid:s}/chat', block=False))
+        self.assertFalse(limiter.acquire('ai/{aiid:s}/chat', block=False))  # the '*' token is given back
+        self.assertTrue(limiter.acquire('ai/', block=False))
+        self.assertTrue(limiter.acquire('ai/', block=False))
+        self.assertFalse(limiter.acquire('ai/', block=False))
+        self.assertEqual(limiter.rates(), {'*': 3, 'ai/{aiid:s}/chat': 1})
+
+    def test_timeout_is_shared_by_the_buckets(self):
+        clock = FakeClock()
+        limiter = RateLimiter({'*': 1, 'ai/': 0.5}, timer=clock.time, sleep=clock.sleep)
+        self.assertTrue(limiter.acquire('ai/'))
+        # '*' has a token after 1 second, 'ai/' after 2 seconds: more than the timeout
+        self.assertFalse(limiter.acquire('ai/', timeout=1.5))
+        self.assertAlmostEqual(clock.now, 1)
+        self.assertTrue(limiter.buckets('ai/')[0].acquire(block=False))  # the '*' token was given back
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import base64
+import copy
+import pickle
+import unittest
+
+from hutoma import fastjson
+from hutoma.results import AIStatus, SpeakResult, TrainingStatus
+
+
+class AIStatusTest(unittest.TestCase):
+    def test_tuple_compatibility(self):
+        status = AIStatus({'trainingStatus': 1, 'runtimeStatus': 0, 'score': 0.5}, {'compileError': ''})
+        neuralnetwork, aiml = status
+        self.assertEqual(neuralnetwork['trainingStatus'], 1)
+        self.assertEqual(status, ({'trainingStatus': 1, 'runtimeStatus': 0, 'score': 0.5}, {'compileError': ''}))
+        self.assertEqual((status.training_status, status.runtime_status, status.score), (1, 0, 0.5))
+        self.assertEqual(status.compile_error, '')
+        self.assertFalse(hasattr(status, '__dict__'))
+
+    def test_copy(self):
+        status = TrainingStatus({'trainingStatus': 2}, {})
+        for copied in [status.copy(), copy.deepcopy(status), pickle.loads(pickle.dumps(status, 2))]:
+            self.assertEqual(type(copied), TrainingStatus)
+            self.assertEqual(copied, status)
+        copied = status.copy()
+        copied.neuralnetwork['trainingStatus'] = 1
+        self.assertTrue(status.finished)
+        self.assertFalse(copied.finished)
+
+    def test_copy_on_write(self):
+        status = AIStatus({'trainingStatus': 1}, {'compileError': ''})
+        copied = status.copy()
+        self.assertEqual((copied.training_status, copied.compile_error), (1, ''))
+        self.assertIs(copied._neuralnetwork, status._neuralnetwork)  # reading a field does not copy
+        neuralnetwork, aiml = copied
+        neuralnetwork['trainingStatus'] = 2
+        self.assertEqual((status.training_status, copied.training_status), (1, 2))
+        self.assertEqual(len(copied), 2)
+        self.assertNotEqual(copied, status)
+        self.assertEqual(copied, ({'trainingStatus': 2}, {'compileError': ''}))
+
+
+class SpeakResultTest(unittest.TestCase):
+    def test_mapping(self):
+        result = SpeakResult({'input': 'hi', 'output': 'hello', 'tts': base64.b64encode(b'wave').decode('ascii')})
+        self.assertEqual(result['output'], 'hello')
+        self.assertEqual(result.get('confidence', 0), 0)
+        self.assertEqual(dict(**result), dict(result))
+        self.assertEqual(sorted(result.keys()), ['input', 'output', 'tts'])
+        self.assertEqual((result.input, result.audio), ('hi', b'wave'))
+        self.assertFalse(hasattr(result, '__dict__'))
+
+
+class FastJsonTest(unittest.TestCase):
+    def test_use(self):
+        backend = fastjson.backend
+        try:
+            fastjson.use('json')
+            self.assertEqual(fastjson.loads('{"a": [1]}'), {'a': [1]})
+            fastjson.use(lambda content: {'decoded': content})
+            self.assertEqual(fastjson.loads('x'), {'decoded': 'x'})
+        finally:
+            fastjson.use(backend)
+
+
+if __name__ == '__main__':
+    unittest.main()
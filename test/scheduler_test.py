@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from hutoma.scheduler import BACKGROUND, INTERACTIVE, PriorityScheduler
+
+
+class PrioritySchedulerTest(unittest.TestCase):
+    def test_background_share(self):
+        scheduler = PriorityScheduler(slots=4, background_share=0.5)
+        self.assertTrue(scheduler.acquire(BACKGROUND, timeout=0))
+        self.assertTrue(scheduler.acquire(BACKGROUND, timeout=0))
+        self.assertFalse(scheduler.acquire(BACKGROUND, timeout=0))
+        self.assertTrue(scheduler.acquire(INTERACTIVE, timeout=0))
+        self.assertTrue(scheduler.acquire(INTERACTIVE, timeout=0))
+        self.assertFalse(scheduler.acquire(INTERACTIVE, timeout=0))
+        scheduler.release(BACKGROUND)
+        self.assertTrue(scheduler.acquire(INTERACTIVE, timeout=0))
+
+    def test_interactive_first(self):
+        scheduler = PriorityScheduler(slots=1)
+        scheduler.acquire(INTERACTIVE)
+        order = []
+
+        def run(priority):
+            with scheduler.slot(priority):
+                order.append(priority)
+
+        background = threading.Thread(target=run, args=(BACKGROUND,))
+        background.start()
+        time.sleep(0.1)
+        interactive = threading.Thread(target=run, args=(INTERACTIVE,))
+        interactive.start()
+        time.sleep(0.1)
+        scheduler.release(INTERACTIVE)
+        background.join()
+        interactive.join()
+        self.assertEqual(order, [INTERACTIVE, BACKGROUND])
+        self.assertEqual(scheduler.stats(), {'running': 0, 'running_background': 0, 'waiting_interactive': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from hutoma.hutoma import EasyHutoma, HutomaException
+from hutoma.singleflight import Expired, SingleFlight
+from hutoma.stub_server import StubServer
+
+
+class SingleFlightTest(unittest.TestCase):
+    def _run_concurrently(self, single_flight, key, function, started, release, count=5):
+        """ Start a leader, then count - 1 followers while the leader is blocked, then release it
+        """
+        outcomes = []
+        threads = [threading.Thread(target=lambda: outcomes.append(self._do(single_flight, key, function)))
+                   for _ in range(count)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.2)  # let the followers block on the call in flight
+        release.set()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def _do(self, single_flight, key, function):
+        try:
+            return single_flight.do(key, function)
+        except ValueError as e:
+            return e
+
+    def test_coalesce(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def function():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 42
+
+        outcomes = self._run_concurrently(single_flight, 'key', function, started, release)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(outcomes), [(42, False)] * 4 + [(42, True)])
+
+    def test_error_is_shared(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        error = ValueError('boom')
+
+        def function():
+            started.set()
+            release.wait(5)
+            raise error
+
+        outcomes = self._run_concurrently(single_flight, 'key', function, started, release, count=3)
+        self.assertEqual(len(outcomes), 3)
+        self.assertTrue(all(outcome is error for outcome in outcomes))
+
+    def test_waiter_timeout(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def function():
+            started.set()
+            release.wait(5)
+            return 42
+
+        leader = threading.Thread(target=single_flight.do, args=('key', function))
+        leader.start()
+        started.wait(5)
+        waited = time.time()
+        self.assertRaises(Expired, single_flight.do, 'key', function, 0.1)
+        self.assertLess(time.time() - waited, 1)
+        release.set()
+        leader.join()
+
+    def test_sequential_calls_are_not_coalesced(self):
+        single_flight = SingleFlight()
+        self.assertEqual(single_flight.do('key', lambda: 1), (1, True))
+        self.assertEqual(single_flight.do('key', lambda: 2), (2, True))
+
+
+class EasyHutomaCoalescingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = StubServer(latency={'ai/{aiid:s}/': 0.5})
+        self.hutoma = EasyHutoma('key', base_url=self.server.start(),
+                                 manifest_path=os.path.join(self.directory, 'manifest.json'))
+        self.aiid = self.hutoma.create_ai()[0]
+
+    def tearDown(self):
+        self.hutoma.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def _start_status(self):
+        thread = threading.Thread(target=self.hutoma.current_status, args=(self.aiid, True))
+        thread.start()
+        time.sleep(0.1)
+        return thread
+
+    def test_identical_calls_are_coalesced(self):
+        thread = self._start_status()
+        self.hutoma.current_status(self.aiid, fresh=True)
+        thread.join()
+        self.assertEqual(self.server.calls, 2)
+
+    def test_deadline_is_not_extended_by_a_call_in_flight(self):
+        thread = self._start_status()
+        started = time.time()
+        with self.assertRaises(HutomaException) as raised:
+            with self.hutoma.call_options(deadline=0.1):
+                self.hutoma.current_status(self.aiid, fresh=True)
+        self.assertEqual(raised.exception.error_type, 'Timeout')
+        self.assertLess(time.time() - started, 0.35)
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
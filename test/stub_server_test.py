@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from hutoma.hooks import TraceRecorder
+from hutoma.hutoma import EasyHutoma, HutomaException
+from hutoma.manifest import Manifest, file_digest
+from hutoma.stub_server import StubServer
+
+
+class StubServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = StubServer(training_seconds=0.2)
+        self.server.start()
+        self.hutoma = self._client(self.server)
+
+    def tearDown(self):
+        self.hutoma.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def _client(self, server, **kwargs):
+        return EasyHutoma('key', base_url=server.base_url,
+                          manifest_path=os.path.join(self.directory, 'manifest.json'), **kwargs)
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as file_object:
+            file_object.write(content)
+        return path
+
+    def test_ai_lifecycle(self):
+        hutoma = self.hutoma
+        self.assertEqual(hutoma.list_ai(), [])
+        aiid = hutoma.create_ai()[0]
+        neuralnetwork, aiml = hutoma.change_status(aiid, 'start')
+        self.assertEqual(neuralnetwork['runtimeStatus'], 1)
+        self.assertEqual(hutoma.chat(aiid, 1, 'hello'), 'echo: hello')
+
+        source = self._write('source.txt', b'hello\nbye\n')
+        target = self._write('target.txt', b'hi there\nsee you\n')
+        hutoma.training_deploy(aiid, source, target)
+        neuralnetwork, aiml = hutoma.wait_for_training(aiid, timeout=10, min_interval=0.05, max_interval=0.1)
+        self.assertEqual(neuralnetwork['trainingStatus'], 2)
+        self.assertEqual(hutoma.chat(aiid, 1, 'bye'), 'see you')
+
+        hutoma.upload_file_in_folder(aiid, 'aiml', self._write('a.aiml', b'<aiml/>'))
+        self.assertEqual(hutoma.files_in_folder(aiid, 'aiml'), ['a.aiml'])
+        hutoma.delete_folder(aiid, 'aiml')
+        self.assertEqual(hutoma.files_in_folder(aiid, 'aiml'), [])
+
+        spoken = hutoma.speak(aiid, 1, bytearray(100))
+        self.assertEqual(spoken['input'], 'utterance of 100 bytes')
+        self.assertTrue(spoken['tts'])
+
+        self.assertEqual(hutoma.delete_ai(aiid), [])
+        with self.assertRaises(HutomaException) as raised:
+            hutoma.current_status(aiid, fresh=True)
+        self.assertEqual(raised.exception.error_code, 404)
+
+    def test_training_deploy_skips_unchanged_corpus(self):
+        aiid = self.hutoma.create_ai()[0]
+        source = self._write('source.txt', b'hello\n')
+        target = self._write('target.txt', b'hi there\n')
+        calls = self.server.calls
+        self.hutoma.training_deploy(aiid, source, target)
+        self.assertEqual(self.server.calls - calls, 3)  # two uploads and the training start
+
+        calls = self.server.calls
+        neuralnetwork, aiml = self.hutoma.training_deploy(aiid, source, target)
+        self.assertEqual(self.server.calls - calls, 1)  # only the current status
+        self.assertEqual(neuralnetwork['trainingStatus'], 1)
+
+        calls = self.server.calls
+        self.hutoma.training_deploy(aiid, source, target, force=True)
+        self.assertEqual(self.server.calls - calls, 1)  # only the training start
+
+        self._write('target.txt', b'hi\n')
+        calls = self.server.calls
+        self.hutoma.training_deploy(aiid, source, target)
+        self.assertEqual(self.server.calls - calls, 3)
+
+    def test_sync_folder_uploads_only_changes(self):
+        aiid = self.hutoma.create_ai()[0]
+        local_dir = os.path.join(self.directory, 'aiml')
+        os.mkdir(local_dir)
+        for name in ('a.aiml', 'b.aiml', 'c.aiml'):
+            self._write(os.path.join('aiml', name), name.encode('ascii'))
+        calls = self.server.calls
+        report = self.hutoma.sync_folder(aiid, 'aiml', local_dir)
+        self.assertEqual((report['uploaded'], report['skipped'], report['failed']),
+                         (['a.aiml', 'b.aiml', 'c.aiml'], [], {}))
+        self.assertEqual(self.server.calls - calls, 4)  # the listing and three uploads
+
+        self._write(os.path.join('aiml', 'b.aiml'), b'changed')
+        self._write(os.path.join('aiml', 'd.aiml'), b'new')
+        os.remove(os.path.join(local_dir, 'c.aiml'))
+        calls = self.server.calls
+        report = self.hutoma.sync_folder(aiid, 'aiml', local_dir)
+        self.assertEqual((report['uploaded'], report['skipped']), (['b.aiml', 'd.aiml'], ['a.aiml']))
+        self.assertEqual(self.server.calls - calls, 3)
+        self.assertEqual(sorted(self.server.api._ais[aiid].folders['aiml']), ['a.aiml', 'b.aiml', 'c.aiml', 'd.aiml'])
+
+        known = Manifest(os.path.join(self.directory, 'manifest.json')).get(aiid, 'folder/aiml')
+        self.assertEqual(sorted(known), ['a.aiml', 'b.aiml', 'd.aiml'])
+        self.assertEqual(known['b.aiml'], file_digest(os.path.join(local_dir, 'b.aiml')))
+
+        calls = self.server.calls
+        report = self.hutoma.sync_folder(aiid, 'aiml', local_dir)
+        self.assertEqual((report['uploaded'], report['skipped']), ([], ['a.aiml', 'b.aiml', 'd.aiml']))
+        self.assertEqual(self.server.calls - calls, 1)  # only the listing
+
+    def test_sync_folder_with_a_corrupt_manifest(self):
+        aiid = self.hutoma.create_ai()[0]
+        local_dir = os.path.join(self.directory, 'aiml')
+        os.mkdir(local_dir)
+        self._write(os.path.join('aiml', 'a.aiml'), b'a')
+        self.hutoma.sync_folder(aiid, 'aiml', local_dir)
+        self._write('manifest.json', b'{not json')
+        report = self.hutoma.sync_folder(aiid, 'aiml', local_dir)
+        self.assertEqual((report['uploaded'], report['skipped'], report['failed']), (['a.aiml'], [], {}))
+        report = self.hutoma.sync_folder(aiid, 'aiml', local_dir)  # the manifest has been rewritten
+        self.assertEqual((report['uploaded'], report['skipped']), ([], ['a.aiml']))
+
+    def test_corrupt_manifest(self):
+        self._write('manifest.json', b'{not json')
+        aiid = self.hutoma.create_ai()[0]
+        self.assertTrue(self.hutoma.training_upload_source(aiid, bytearray(b'hello\n')))
+        self.assertEqual(self.hutoma.delete_ai(aiid), [])
+
+        aiid = self.hutoma.create_ai()[0]
+        self._write('manifest.json', b'{not json')
+        source = self._write('source.txt', b'hello\n')
+        target = self._write('target.txt', b'hi there\n')
+        calls = self.server.calls
+        self.hutoma.training_deploy(aiid, source, target)  # read as an empty manifest, then overwritten
+        self.assertEqual(self.server.calls - calls, 3)
+        calls = self.server.calls
+        self.hutoma.training_deploy(aiid, source, target)
+        self.assertEqual(self.server.calls - calls, 1)
+
+    def test_error_injection(self):
+        with StubServer(error_rate={'ai/': 1}, error_codes=(503,)) as server:
+            hutoma = self._client(server)
+            with self.assertRaises(HutomaException) as raised:
+                hutoma.list_ai()
+            self.assertEqual(raised.exception.error_code, 503)
+            hutoma.close()
+
+    def test_replay(self):
+        trace = os.path.join(self.directory, 'trace.jsonl')
+        aiid = self.hutoma.create_ai()[0]
+        with TraceRecorder(trace, record_bodies=True) as recorder:
+            self.hutoma.add_hook(recorder)
+            self.hutoma.chat(aiid, 1, 'recorded')
+        with StubServer(replay=trace) as server:
+            hutoma = self._client(server)
+            self.assertEqual(hutoma.chat(aiid, 1, 'recorded'), 'echo: recorded')
+            with self.assertRaises(HutomaException):
+                hutoma.chat(aiid, 1, 'not recorded')  # simulated: the AI does not exist on this server
+            hutoma.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
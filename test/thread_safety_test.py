@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import unittest
+from multiprocessing.pool import ThreadPool
+
+from hutoma.hooks import Hook
+from hutoma.hutoma import EasyHutoma
+from hutoma.stub_server import StubServer
+
+
+class ThreadSafetyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = StubServer()
+        self.server.start()
+        self.hutoma = EasyHutoma('key', base_url=self.server.base_url, pool_size=4,
+                                 manifest_path=os.path.join(self.directory, 'manifest.json'))
+        self.aiid = self.hutoma.create_ai()[0]
+
+    def tearDown(self):
+        self.hutoma.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_shared_by_threads(self):
+        calls = self.hutoma.api_calls_count()
+        pool = ThreadPool(8)
+        answers = pool.map(lambda index: self.hutoma.chat(self.aiid, index, 'q{0}'.format(index)), range(200))
+        pool.close()
+        pool.join()
+        self.assertEqual(answers, ['echo: q{0}'.format(index) for index in range(200)])
+        self.assertEqual(self.hutoma.api_calls_count(), calls + 200)
+        self.assertEqual(self.hutoma.metrics()['ai/{aiid:s}/chat']['requests'], 200)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_fork(self):
+        self.hutoma.chat(self.aiid, 1, 'before fork')  # the parent has a pooled connection
+        session = self.hutoma._transport._session
+        pid = os.fork()
+        if pid == 0:
+            try:
+                ok = self.hutoma.chat(self.aiid, 2, 'child') == 'echo: child' \
+                     and self.hutoma._transport._session is not session and self.hutoma.api_calls_count() == 1
+                self.hutoma.close()
+            except Exception:
+                ok = False
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertIs(self.hutoma._transport._session, session)
+        self.assertEqual(self.hutoma.chat(self.aiid, 1, 'after fork'), 'echo: after fork')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_concurrent_first_calls_after_fork(self):
+        self.hutoma.chat(self.aiid, 1, 'before fork')
+        pid = os.fork()
+        if pid == 0:
+            try:
+                ok = self.hutoma.api_calls_count() == 0  # the parent calls are not counted
+                self.hutoma._pid = -1  # force a new re-initialization, raced by every thread
+                start = threading.Event()
+                answers = []
+
+                def chat(index):
+                    start.wait()
+                    answers.append(self.hutoma.chat(self.aiid, index, 'child'))
+
+                threads = [threading.Thread(target=chat, args=(index,)) for index in range(8)]
+                for thread in threads:
+                    thread.start()
+                start.set()
+                for thread in threads:
+                    thread.join()
+                ok = ok and answers == ['echo: child'] * 8 and self.hutoma._scheduler._running == 0 \
+                    and self.hutoma.api_calls_count() == 8
+                self.hutoma.close()
+            except Exception:
+                ok = False
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+
+    def _in_child(self, check):
+        """ Run check in a forked child, killed after 10 seconds if it hangs, and return its exit status
+        """
+        pid = os.fork()
+        if pid == 0:
+            signal.alarm(10)
+            try:
+                ok = check()
+            except Exception:
+                ok = False
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        return status
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_fork_with_warm_caches(self):
+        hutoma = EasyHutoma('key', base_url=self.server.base_url, chat_cache_size=10,
+                            manifest_path=os.path.join(self.directory, 'manifest.json'))
+        hutoma.chat(self.aiid, 1, 'cached')
+        hutoma.list_ai()
+        hutoma.current_status(self.aiid)
+        self.assertEqual(hutoma.chat_cache_stats()['size'], 1)
+
+        def check():
+            # every read goes to the server: the parent caches are not inherited
+            ok = hutoma.chat(self.aiid, 1, 'cached') == 'echo: cached' and hutoma.list_ai() == [self.aiid] \
+                and hutoma.current_status(self.aiid)[0]['runtimeStatus'] == 1 and hutoma.api_calls_count() == 3
+            hutoma.close()
+            return ok
+        self.assertEqual(self._in_child(check), 0)
+        hutoma.close()
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_fork_while_a_lock_is_held(self):
+        hutoma = EasyHutoma('key', base_url=self.server.base_url, chat_cache_size=10,
+                            manifest_path=os.path.join(self.directory, 'manifest.json'))
+        hutoma.chat(self.aiid, 1, 'warm up')
+        locks = [hutoma._chat_cache._lock, hutoma._metadata_cache._lock, hutoma._metadata_lock,
+                 hutoma._hooks_lock, hutoma._manifest_lock]
+        for lock in locks:  # held by this thread at fork time, they stay held forever in the child
+            lock.acquire()
+        try:
+            def check():
+                ok = hutoma.chat(self.aiid, 1, 'child') == 'echo: child' and hutoma.list_ai() == [self.aiid] \
+                    and hutoma.current_status(self.aiid)[0]['runtimeStatus'] == 1
+                hutoma.add_hook(Hook())
+                hutoma._get_manifest()
+                hutoma.close()
+                return ok
+            status = self._in_child(check)
+        finally:
+            for lock in locks:
+                lock.release()
+        self.assertEqual(status, 0)
+        hutoma.close()
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from requests.exceptions import ConnectionError
+
+from hutoma.hutoma import EasyHutoma, HutomaException
+from hutoma.stub_server import StubServer
+from hutoma.transport import FakeTransport
+
+
+class TransportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = StubServer(latency={'ai/{aiid:s}/': 0.5})
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def _check(self, hutoma):
+        aiid = hutoma.create_ai()[0]
+        self.assertEqual(hutoma.chat(aiid, 1, 'hello there'), 'echo: hello there')
+        self.assertTrue(hutoma.training_upload_source(aiid, bytearray(b'hello\n')))
+        self.assertTrue(hutoma.training_upload_target(aiid, iter([b'hi\n'])))  # chunked, without a length
+        self.assertEqual(hutoma.speak(aiid, 1, bytearray(10))['input'], 'utterance of 10 bytes')
+        with self.assertRaises(HutomaException) as raised:
+            with hutoma.call_options(timeout=0.1):
+                hutoma.current_status(aiid, fresh=True)
+        self.assertEqual(raised.exception.error_type, 'Timeout')
+        hutoma.close()
+
+    def _client(self, base_url, transport):
+        return EasyHutoma('key', base_url=base_url, transport=transport,
+                          manifest_path=os.path.join(self.directory, 'manifest.json'))
+
+    def test_requests(self):
+        self._check(self._client(self.server.base_url, 'requests'))
+
+    def test_urllib3(self):
+        hutoma = self._client(self.server.base_url, 'urllib3')
+        self.assertEqual(hutoma.preconnect(2), 2)
+        self._check(hutoma)
+
+    def test_connection_refused(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        base_url = 'http://127.0.0.1:{0}/api/v1/'.format(listener.getsockname()[1])
+        listener.close()  # nothing listens on the port any more
+        for transport in ('requests', 'urllib3'):
+            hutoma = self._client(base_url, transport)
+            with self.assertRaises(ConnectionError):  # the same error for every transport, not a timeout
+                hutoma.list_ai()
+            hutoma.close()
+
+    def test_fake(self):
+        transport = FakeTransport(StubServer(latency={'ai/{aiid:s}/': 0.5}))
+        hutoma = self._client('http://localhost/api/v1/', transport)
+        aiid = hutoma.create_ai()[0]
+        self.assertEqual(hutoma.chat(aiid, 1, 'hello there'), 'echo: hello there')
+        self.assertTrue(hutoma.training_upload_source(aiid, bytearray(b'hello\n')))
+        self.assertEqual(hutoma.speak(aiid, 1, bytearray(10))['input'], 'utterance of 10 bytes')
+        self.assertEqual(transport.stub.calls, 4)
+
+    def test_stub_server_is_not_imported(self):
+        code = 'import sys, hutoma.hutoma; sys.exit(\'hutoma.stub_server\' in sys.modules)'
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        self.assertEqual(subprocess.call([sys.executable, '-c', code], cwd=root), 0)
+
+    def test_unknown(self):
+        with self.assertRaises(HutomaException):
+            self._client(self.server.base_url, 'curl')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import tempfile
+import unittest
+
+from hutoma.upload import MultipartUpload
+
+
+class MultipartUploadTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='source.txt')
+        os.write(handle, b'hello\nhow are you\n')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _body(self, upload):
+        chunks = []
+        while True:
+            chunk = upload.read(5)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def test_path(self):
+        with MultipartUpload(self.path, chunk_size=4) as upload:
+            body = self._body(upload)
+            self.assertEqual(len(body), upload.len)
+            self.assertTrue(body.startswith('--{0}\r\n'.format(upload.boundary).encode('ascii')))
+            self.assertTrue('filename="{0}"'.format(os.path.basename(self.path)).encode('ascii') in body)
+            self.assertTrue(b'\r\n\r\nhello\nhow are you\n\r\n--' in body)
+            self.assertTrue(body.endswith('--{0}--\r\n'.format(upload.boundary).encode('ascii')))
+        self.assertTrue(upload._file.closed)
+
+    def test_file_object_is_not_closed(self):
+        with open(self.path, 'rb') as file_object:
+            with MultipartUpload(file_object) as upload:
+                self.assertEqual(len(self._body(upload)), upload.len)
+            self.assertFalse(file_object.closed)
+
+    def test_bytes_and_iterable(self):
+        upload = MultipartUpload(bytearray(b'hello'), filename='source.txt')
+        self.assertTrue(b'filename="source.txt"' in upload.read())
+        upload = MultipartUpload(iter([b'hel', u'lo']))
+        self.assertFalse(hasattr(upload, 'len'))
+        self.assertTrue(b'\r\n\r\nhello\r\n--' in b''.join(upload))
+
+    def test_read_all(self):
+        upload = MultipartUpload(io.BytesIO(b'x' * 100))
+        self.assertEqual(len(upload.read(10)) + len(upload.read()), upload.len)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+
+import hutoma.hutoma
+from hutoma.hutoma import EasyHutoma, HutomaException
+from hutoma.results import AIStatus
+from hutoma.transport import FakeTransport
+
+
+class FakeClock(object):
+    """ Stands for the time module in hutoma.hutoma: sleep advances the clock instead of waiting
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeRandom(object):
+    """ Stands for the random module in hutoma.hutoma, recording the uniform bounds
+    """
+
+    def __init__(self, seed):
+        self.bounds = []
+        self._random = random.Random(seed)
+
+    def uniform(self, low, high):
+        self.bounds.append((low, high))
+        return self._random.uniform(low, high)
+
+
+class ScriptedHutoma(EasyHutoma):
+    """ current_status answers the scripted (trainingStatus, score) pairs, repeating the last one
+    """
+
+    def __init__(self, script):
+        super(ScriptedHutoma, self).__init__('key', base_url='http://localhost/api/v1/', transport=FakeTransport())
+        self.script = list(script)
+        self.polls = 0
+
+    def current_status(self, aiid, fresh=False):
+        training_status, score = self.script[min(self.polls, len(self.script) - 1)]
+        self.polls += 1
+        return AIStatus({'trainingStatus': training_status, 'score': score}, {})
+
+
+class WaitForTrainingTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.random = FakeRandom(seed=1)
+        self._time, self._random = hutoma.hutoma.time, hutoma.hutoma.random
+        hutoma.hutoma.time, hutoma.hutoma.random = self.clock, self.random
+
+    def tearDown(self):
+        hutoma.hutoma.time, hutoma.hutoma.random = self._time, self._random
+
+    def _wait(self, script, **kwargs):
+        client = ScriptedHutoma(script)
+        kwargs.setdefault('jitter', 0)
+        try:
+            return client.wait_for_training('aiid', min_interval=2, max_interval=10, **kwargs)
+        finally:
+            client.close()
+
+    def test_backoff_up_to_max_interval(self):
+        status, aiml = self._wait([(1, 0.5)] * 6 + [(2, 0.9)])
+        self.assertEqual(status['trainingStatus'], 2)
+        self.assertEqual(self.clock.sleeps, [2, 4, 8, 10, 10, 10])
+
+    def test_score_change_halves_the_interval(self):
+        self._wait([(1, 0.1), (1, 0.1), (1, 0.1), (1, 0.2), (1, 0.3), (1, 0.3), (3, 0.3)])
+        self.assertEqual(self.clock.sleeps, [2, 4, 8, 4, 2, 4])
+
+    def test_transition_resets_the_interval(self):
+        transitions = []
+        progress = []
+        self._wait([(0, None), (0, None), (1, 0.1), (1, 0.1), (1, 0.1), (2, 0.5)],
+                   on_progress=lambda status: progress.append(status['trainingStatus']),
+                   on_transition=lambda previous, current, status: transitions.append((previous, current)))
+        self.assertEqual(self.clock.sleeps, [2, 4, 2, 4, 8])
+        self.assertEqual(transitions, [(None, 0), (0, 1), (1, 2)])
+        self.assertEqual(progress, [0, 0, 1, 1, 1, 2])
+
+    def test_terminal_at_first_poll(self):
+        status, aiml = self._wait([(4, None)])
+        self.assertEqual(status['trainingStatus'], 4)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_jitter_bounds(self):
+        self._wait([(1, 0.5)] * 20 + [(2, 0.5)], jitter=0.25)
+        self.assertEqual(set(self.random.bounds), set([(0.75, 1.25)]))
+        intervals = [2, 4, 8] + [10] * 17
+        self.assertEqual(len(self.clock.sleeps), len(intervals))
+        for wait, interval in zip(self.clock.sleeps, intervals):
+            self.assertTrue(interval * 0.75 <= wait <= interval * 1.25, (wait, interval))
+        self.assertGreater(len(set(self.clock.sleeps[3:])), 1)  # jittered, not all equal to max_interval
+
+    def test_timeout(self):
+        with self.assertRaises(HutomaException) as raised:
+            self._wait([(1, 0.5)], timeout=5)
+        self.assertEqual(raised.exception.error_type, 'Timeout')
+        self.assertEqual(self.clock.sleeps, [2, 3])  # the second wait is cut to the remaining time
+
+
+if __name__ == '__main__':
+    unittest.main()
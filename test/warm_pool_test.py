@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from hutoma.hooks import CallInfo
+from hutoma.hutoma import EasyHutoma
+from hutoma.stub_server import StubServer
+from hutoma.transport import FakeTransport
+from hutoma.warm_pool import WarmPool
+
+
+class FakeHutoma(object):
+    def __init__(self, statuses):
+        self.statuses = statuses  # aiid -> list of (runtimeStatus, trainingStatus), one per read
+        self.actions = []
+        self.preconnected = 0
+        self.hooks = []
+        self.fresh = []  # the fresh argument of every current_status
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def preconnect(self, connections=1):
+        self.preconnected = connections
+        return connections
+
+    def current_status(self, aiid, fresh=False):
+        self.fresh.append(fresh)
+        runtime_status, training_status = self.statuses[aiid].pop(0)
+        return {'runtimeStatus': runtime_status, 'trainingStatus': training_status}, {}
+
+    def change_status(self, aiid, action):
+        self.actions.append((aiid, action))
+
+
+class WarmPoolTest(unittest.TestCase):
+    def test_warm_starts_stopped_ais(self):
+        hutoma = FakeHutoma({'a': [(0, 2)], 'b': [(1, 2)]})
+        results = WarmPool(hutoma, ['a', 'b']).warm()
+        self.assertEqual(hutoma.preconnected, 2)
+        self.assertEqual(hutoma.actions, [('a', 'start')])
+        self.assertEqual(results, [('a', 'start', None), ('b', None, None)])
+
+    def test_reload_after_training(self):
+        hutoma = FakeHutoma({'a': [(1, 1), (1, 1), (1, 2), (1, 2)]})
+        pool = WarmPool(hutoma, ['a'])
+        for _ in range(4):
+            pool.check()
+        self.assertEqual(hutoma.actions, [('a', 'reload')])
+
+    def test_reload_after_training_started_between_checks(self):
+        hutoma = FakeHutoma({'a': [(1, 2), (1, 2), (1, 2)]})
+        pool = WarmPool(hutoma, ['a'])
+        pool.check()
+        call = CallInfo('PUT', 'ai/{aiid:s}/training', 'ai/a/training?action=start', {'aiid': 'a'})
+        hutoma.hooks[0].after_response(call)
+        time.sleep(0.01)
+        pool.check()  # the training started and completed since the previous check
+        pool.check()
+        self.assertEqual(hutoma.actions, [('a', 'reload')])
+        pool.stop()
+        self.assertEqual(hutoma.hooks, [])
+
+    def test_fresh_read_only_after_a_change(self):
+        hutoma = FakeHutoma({'a': [(0, 2), (1, 2), (1, 2), (1, 2)]})
+        pool = WarmPool(hutoma, ['a'])
+        pool.check()  # starts the AI
+        hutoma.hooks[0].after_response(CallInfo('GET', 'ai/{aiid:s}', 'ai/a?action=start', {'aiid': 'a'}))
+        pool.check()
+        hutoma.hooks[0].after_response(CallInfo('GET', 'ai/{aiid:s}/chat', 'ai/a/chat?q=hi', {'aiid': 'a'}))
+        pool.check()
+        hutoma.hooks[0].after_response(CallInfo('POST', 'ai/{aiid:s}/training', 'ai/a/training', {'aiid': 'a'}))
+        pool.check()
+        self.assertEqual(hutoma.fresh, [False, True, False, True])
+
+    def test_reload_with_stub(self):
+        directory = tempfile.mkdtemp()
+        try:
+            hutoma = EasyHutoma('key', base_url='http://localhost/api/v1/',
+                                transport=FakeTransport(StubServer(training_seconds=0)),
+                                manifest_path=os.path.join(directory, 'manifest.json'))
+            aiid = hutoma.create_ai()[0]
+            pool = WarmPool(hutoma, [aiid])
+            self.assertEqual(pool.check(), [(aiid, 'start', None)])
+            hutoma.training_upload_files(aiid, bytearray(b'hello\n'), bytearray(b'hi\n'))
+            hutoma.training_start(aiid)
+            time.sleep(0.01)
+            self.assertEqual(pool.check(), [(aiid, 'reload', None)])
+            self.assertEqual(pool.check(), [(aiid, None, None)])
+            calls = hutoma.api_calls_count()
+            self.assertEqual(pool.check(), [(aiid, None, None)])
+            self.assertEqual(hutoma.api_calls_count(), calls)  # a cached read
+            pool.stop()
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()